@@ -0,0 +1,72 @@
+from flask import request, jsonify, url_for, send_file
+
+from app.utils.job_queue import (
+    submit_job,
+    get_job,
+    job_result,
+    job_kinds,
+    JobQueueFull,
+    STATUS_DONE,
+    STATUS_FAILED
+)
+
+from config import VALID_FILE_EXTENSIONS
+
+
+# Validate extension
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in VALID_FILE_EXTENSIONS
+
+def _job_response(job):
+    response = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': round(job['progress'], 3),
+        'stages': job['stages'],
+        'status_url': url_for('job_status_route', job_id=job['id']),
+    }
+    if job['status'] == STATUS_DONE:
+        response['download_url'] = url_for('job_download_route', job_id=job['id'])
+    if job['status'] == STATUS_FAILED:
+        response['error'] = job['error']
+    return response
+
+def job_submit(kind):
+    """Accepts an upload for a background job and returns its id right away."""
+    if kind not in job_kinds():
+        return jsonify({'error': f"Unknown job kind: {kind}"}), 404
+
+    file = request.files.get('file') or request.files.get(kind)
+    if file is None:
+        return jsonify({'error': 'No file in the request'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file extension'}), 400
+
+    try:
+        job_id = submit_job(kind, file)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(_job_response(get_job(job_id))), 202
+
+def job_status(job_id):
+    """Returns the status and per-stage progress of a job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job))
+
+def job_download(job_id):
+    """Sends the result of a finished job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    result = job_result(job_id)
+    if result is None:
+        return jsonify(_job_response(job)), 409
+
+    path, filename, mimetype = result
+    return send_file(path, mimetype=mimetype, as_attachment=True, attachment_filename=filename)
@@ -0,0 +1,19 @@
+from flask import Response
+
+from app.utils.metrics import render, gauge_lines
+from app.utils.job_queue import queue_depth
+from app.routes.scs_tool.core.result_cache import cache_stats
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics():
+    """Serves the metrics of every worker process in the Prometheus text format."""
+    # Shared state, read directly at scrape time
+    cache = cache_stats()
+    lines = gauge_lines('frame_job_queue_depth', 'Background jobs waiting or running, by status.',
+                        [({'status': status}, jobs) for status, jobs in sorted(queue_depth().items())])
+    lines += gauge_lines('frame_result_cache_entries', 'Reports in the SCS result cache.', [({}, cache['entries'])])
+    lines += gauge_lines('frame_result_cache_bytes', 'Size of the SCS result cache.', [({}, cache['bytes'])])
+
+    return Response(render(lines), content_type=METRICS_CONTENT_TYPE)
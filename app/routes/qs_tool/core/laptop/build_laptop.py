@@ -4,33 +4,53 @@ from app.routes.qs_tool.core.laptop.tables.tables import table_section
 from app.routes.qs_tool.core.format.format import format_document
 
 from docx import Document
+from io import BytesIO
 from zipfile import ZipFile
-from config import QS_DOCX_FILE_PATH, QS_ZIP_FILE_PATH, QS_IMAGE_PATH
+from config import QS_ZIP_FILE_PATH, QS_IMAGE_PATH
 
 
 imgs_path = QS_IMAGE_PATH
 #imgs_path = "./imgs/"
 
-def create_docx(file):
+# Stages reported to the progress callback of create_docx, in order
+QS_STAGES = ('overview', 'tech specs', 'tables', 'format', 'zip')
+
+def _report_progress(progress, stage):
+    if progress is not None:
+        progress(stage, QS_STAGES.index(stage), len(QS_STAGES))
+
+def create_docx(file, output=QS_ZIP_FILE_PATH, progress=None):
+    """
+    Builds the QuickSpecs document of an uploaded file and zips it.
+
+    The document is rendered in memory, so concurrent requests never share
+    a file on disk.
+
+    Args:
+        file: Uploaded file
+        output: Path or binary file-like object the zip is written to
+        progress: Optional progress(stage, step, total) callback
+    """
     doc = Document()
 
     # Quickspecs sections
+    _report_progress(progress, 'overview')
     overview_section(doc, file)
+    _report_progress(progress, 'tech specs')
     tech_specs_section(doc, file)
+    _report_progress(progress, 'tables')
     table_section(doc, file)
 
+    _report_progress(progress, 'format')
     format_document(doc, file, imgs_path)
-    docx_file = QS_DOCX_FILE_PATH
-    #docx_file = 'quickspecs.docx'
 
+    docx_file = BytesIO()
     doc.save(docx_file)
 
     # Convert DOCX to PDF using docx2pdf
     #convert(docx_file)
 
     # Create a zip file and add specific files to it
-    zip_file_name = QS_ZIP_FILE_PATH
-    #zip_file_name = 'quickspecs.zip'
-
-    with ZipFile(zip_file_name, 'w') as zipf:
-        zipf.write(docx_file, arcname='quickspecs.docx')
\ No newline at end of file
+    _report_progress(progress, 'zip')
+    with ZipFile(output, 'w') as zipf:
+        zipf.writestr('quickspecs.docx', docx_file.getvalue())
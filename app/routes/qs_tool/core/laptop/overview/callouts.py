@@ -6,7 +6,6 @@ import pandas as pd
 import requests
 from io import BytesIO
 from app.routes.qs_tool.core.format.hr import insert_horizontal_line
-import os
 
 def download_image(url):
     """Download image from URL and return the image data."""
@@ -31,11 +30,6 @@ def download_image(url):
         print(f"Error downloading image from {url}: {e}")
         return None
 
-def get_temp_filename(counter, suffix=".png"):
-    """Generate a fixed temporary file name with a three-digit counter."""
-    return f"image{counter:03d}{suffix}"
-
-
 def callout_section(doc, file, prod_name, df):
     """Add Callout Section"""
     print("inside callout section...")
@@ -52,44 +46,27 @@ def callout_section(doc, file, prod_name, df):
     print("Read Callouts sheet...")
     df = pd.read_excel(file.stream, sheet_name='Callouts', engine='openpyxl')
 
-    # Set the target directory for saving images
-    target_directory = '/home/garciagi/qs'
-    #target_directory = '.'
-
     # Get image URLs from the DataFrame
     img_url1 = df.iloc[4, 0]
     img_url2 = df.iloc[11, 0]
 
-    # Initialize image counter
-    img_counter = 1
-
     # Download images
     img_data1 = download_image(img_url1)
     img_data2 = download_image(img_url2)
 
     # --- Image 1 Handling ---
     if img_data1:
-        img_filename1 = get_temp_filename(img_counter)
-        img_filepath1 = os.path.join(target_directory, img_filename1)
-        
         try:
-            # Save image to the specified directory
-            with open(img_filepath1, "wb") as img_file1:
-                img_file1.write(img_data1.getvalue())
-            print(f"Saved image 1 to {img_filepath1}")
-
-            # Add image to the document
+            # Add the downloaded image to the document straight from memory
             paragraph_with_image = doc.add_paragraph()
             run = paragraph_with_image.add_run()
-            run.add_picture(img_filepath1, width=Inches(5))
+            run.add_picture(img_data1, width=Inches(5))
             paragraph_with_image.alignment = WD_ALIGN_PARAGRAPH.CENTER
         except Exception as e:
-            print(f"Error saving or adding image 1: {e}")
+            print(f"Error adding image 1: {e}")
     else:
         print("Skipping image 1 because download failed or URL was invalid.")
     
-    img_counter += 1
-
     # Add Front subtitle
     paragraph = doc.add_paragraph()
     run = paragraph.add_run("Front")
@@ -118,22 +95,14 @@ def callout_section(doc, file, prod_name, df):
     
     # --- Image 2 Handling ---
     if img_data2:
-        img_filename2 = get_temp_filename(img_counter)
-        img_filepath2 = os.path.join(target_directory, img_filename2)
-        
         try:
-            # Save image to the specified directory
-            with open(img_filepath2, "wb") as img_file2:
-                img_file2.write(img_data2.getvalue())
-            print(f"Saved image 2 to {img_filepath2}")
-
-            # Add image to the document
+            # Add the downloaded image to the document straight from memory
             paragraph_with_image = doc.add_paragraph()
             run = paragraph_with_image.add_run()
-            run.add_picture(img_filepath2, width=Inches(5))
+            run.add_picture(img_data2, width=Inches(5))
             paragraph_with_image.alignment = WD_ALIGN_PARAGRAPH.CENTER
         except Exception as e:
-            print(f"Error saving or adding image 2: {e}")
+            print(f"Error adding image 2: {e}")
     else:
         print("Skipping image 2 because download failed or URL was invalid.")
 
@@ -16,8 +16,7 @@ from app.routes.qs_tool.core.laptop.tech_specs.dimensions import dimensions_sect
 from app.routes.qs_tool.core.laptop.tech_specs.ports import ports_section
 from app.routes.qs_tool.core.laptop.tech_specs.service import service_section
 from app.routes.qs_tool.core.laptop.tech_specs.certification_compliance import certification_section 
-from config import QS_TECHSPECS_PATH
-
+from io import BytesIO
 
 from docx.shared import RGBColor
 
@@ -83,9 +82,11 @@ def tech_specs_section(doc, file):
         # Filter out rows where the "Value" column (assumed to be column 2, index 1) is empty
         df_filtered = df.dropna(subset=[df.columns[1]])
 
-        # Save the filtered DataFrame to a new Excel file
-        output_file = QS_TECHSPECS_PATH
+        # Round-trip the filtered DataFrame through an in-memory workbook so
+        # cell values are typed exactly as before, without a shared file
+        output_file = BytesIO()
         df_filtered.to_excel(output_file, index=False)
+        output_file.seek(0)
 
         # Read the filtered DataFrame
         df = pd.read_excel(output_file, sheet_name='Sheet1', engine='openpyxl')
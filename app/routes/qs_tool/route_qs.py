@@ -1,11 +1,12 @@
-from flask import Flask, request, render_template, send_from_directory
+from flask import Flask, request, render_template, send_file
+from werkzeug.datastructures import FileStorage
+from io import BytesIO
 
 from app.routes.qs_tool.core.laptop.build_laptop import create_docx
+from app.utils.job_queue import register_job_kind
 
 import config
 
-from config import QS_APP_PATH
-
 # Create a Flask app
 app = Flask(__name__)
 app.use_static_for = 'static'
@@ -17,14 +18,24 @@ app.config.from_object(config)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['VALID_FILE_EXTENSIONS']
 
+def run_qs_job(upload_path, filename, result_path, progress):
+    """Background job version of the QuickSpecs build."""
+    with open(upload_path, 'rb') as stream:
+        create_docx(FileStorage(stream=stream, filename=filename), result_path, progress=progress)
+
+register_job_kind('qs', run_qs_job, 'qs_file.zip', 'application/zip')
+
 def qs_tool():
     if request.method == 'POST':
         if 'qs_file' in request.files:
             file = request.files['qs_file']
             try:
                 if allowed_file(file.filename):  # Check if the file has a valid extension
-                    create_docx(file)  # Process the file
-                    return send_from_directory(QS_APP_PATH, filename='qs_file.zip', as_attachment=True)  # Serve file for download
+                    output = BytesIO()  # Private to this request
+                    create_docx(file, output)  # Process the file
+                    output.seek(0)
+                    return send_file(output, mimetype='application/zip', as_attachment=True,
+                                     attachment_filename='qs_file.zip')  # Serve file for download
                 else:
                     return render_template('error.html', error_message='Invalid file extension'), 400
             except Exception as e:
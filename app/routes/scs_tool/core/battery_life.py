@@ -1,47 +1,52 @@
 import pandas as pd
 from config import SCS_BATTERY_FILE_PATH
 
-def battery_life(file, file2):
-    df = pd.read_excel(file.stream, engine='openpyxl') 
-    
-    # Create a new DataFrame       
-    battery_life_df = pd.DataFrame(columns=['SKU', 'displaybright', 'displaymet', 'displaycolorgamut',
-                                       'facet_maxres', 'graphicseg_01header', 'processorname',
-                                       'filter_storagetype', 'storage_acceleration', 
-                                       'graphicseg_01card_01', 'graphicseg_02card_01', 'facet_graphics'])
-    try:
-        # Group by SKU
-        grouped = df.groupby('SKU')
-
-        for sku, group_df in grouped:
-            # Define a dictionary to store the data for the current SKU
-            sku_data = {'SKU': sku}
-            
-            # Populate the dictionary with data from each ContainerName
-            for header in ['displaybright', 'displaymet', 'displaycolorgamut',
+# Containers reported for every SKU, in column order
+BATTERY_LIFE_CONTAINERS = ['displaybright', 'displaymet', 'displaycolorgamut',
                            'facet_maxres', 'graphicseg_01header', 'processorname',
-                           'filter_storagetype', 'storage_acceleration', 
-                           'graphicseg_01card_01', 'graphicseg_02card_01', 'facet_graphics']:
-                container_value = group_df.loc[group_df['ContainerName'] == header, 'ContainerValue'].reset_index(drop=True)
-                if not container_value.empty:
-                    sku_data[header] = container_value[0]  # Take the first value if multiple values exist
+                           'filter_storagetype', 'storage_acceleration',
+                           'graphicseg_01card_01', 'graphicseg_02card_01', 'facet_graphics']
+
+def battery_life(file, file2, output=SCS_BATTERY_FILE_PATH):
+    """
+    Builds the battery life report: one row per SKU with the first value of
+    each of BATTERY_LIFE_CONTAINERS, merged with the battery life rows of
+    the second file.
+
+    Args:
+        file: Uploaded SCS report
+        file2: Uploaded file with the battery life containers
+        output: Path or binary file-like object the report is written to
+    """
+    df = pd.read_excel(file.stream, engine='openpyxl')
+
+    # Create a new DataFrame
+    battery_life_df = pd.DataFrame(columns=['SKU'] + BATTERY_LIFE_CONTAINERS)
+    try:
+        # One row per SKU, sorted like groupby; SKUs without any of the containers are kept
+        rows = df[df['SKU'].notna()]
+        skus = pd.Index(rows['SKU'].unique(), name='SKU').sort_values()
 
-            # Append the data for the current SKU to battery_life_df
-            battery_life_df = battery_life_df.append(sku_data, ignore_index=True)
+        # First value of each container per SKU, in a single pivot
+        first_values = rows[rows['ContainerName'].isin(BATTERY_LIFE_CONTAINERS)].drop_duplicates(['SKU', 'ContainerName'])
+        battery_life_df = first_values.pivot(index='SKU', columns='ContainerName', values='ContainerValue').reindex(
+            index=skus, columns=BATTERY_LIFE_CONTAINERS).astype(object)
+        battery_life_df.columns.name = None
+        battery_life_df = battery_life_df.reset_index()
 
         # Read the second DataFrame
         df2 = pd.read_excel(file2.stream, engine='openpyxl')
-        
+
         # Filter rows from df2 based on "Container" column
         filtered_df2 = df2[df2['Container'].isin(['batterylife', 'maxbatterylifevideo'])]
-        
+
         # Merge the filtered data from df2 to battery_life_df based on "SKU" column
         battery_life_df = pd.merge(battery_life_df, filtered_df2, on='SKU', how='left')
-        
+
         # Save battery_life_df to an Excel file
-        battery_life_df.to_excel(SCS_BATTERY_FILE_PATH, index=False)
-        
+        battery_life_df.to_excel(output, index=False)
+
     except Exception as e:
         print(e)
-    
+
     return battery_life_df
@@ -32,24 +32,30 @@ def check_missing_fields(df, json_rules_path):
     # Add the new column for the check results, default to 'OK'
     df['Missing Fields'] = 'OK'
 
-    # Group the DataFrame by 'Component' and 'SCSGroup' to check each one
-    grouped = df.groupby(['Component', 'SCSGroup'])
-
-    for (component, scs_group), group_df in grouped:
-        if scs_group not in component_rules:
-            # Skip components whose group is not defined in the rules file
-            continue
+    # Required tags per SCSGroup as an exploded (SCSGroup, Tag) frame, in rules order
+    required_tags = pd.DataFrame(
+        [(scs_group, tag) for scs_group, tags in component_rules.items() for tag in dict.fromkeys(tags)],
+        columns=['SCSGroup', 'Granular Container Tag']
+    )
+
+    # Components whose group is not defined in the rules file are skipped by the inner merge
+    components = df[['Component', 'SCSGroup']].dropna().drop_duplicates().astype(object)
+    if components.empty or required_tags.empty:
+        print("Missing fields check complete.")
+        return df
+    required = components.merge(required_tags, on='SCSGroup')
 
-        required_tags = set(component_rules[scs_group])
-        present_tags = set(group_df['Granular Container Tag'])
+    # Anti-join the required (Component, SCSGroup, Tag) triples against the present ones
+    present = df[['Component', 'SCSGroup', 'Granular Container Tag']].drop_duplicates().astype(object)
+    required = required.merge(present, how='left', indicator=True)
+    missing = required[required['_merge'] == 'left_only']
 
-        # Find the tags that are required but are not present for this component
-        missing_tags = required_tags - present_tags
+    missing_tags = missing.groupby(['Component', 'SCSGroup'], sort=False)['Granular Container Tag'].agg(', '.join)
 
-        # If there are any missing tags, record them in the new column for all rows of that component
-        if missing_tags:
-            missing_tags_str = ', '.join(missing_tags)
-            df.loc[group_df.index, 'Missing Fields'] = missing_tags_str
+    # Record the missing tags for all rows of each component in one assignment
+    keys = pd.MultiIndex.from_arrays([df['Component'], df['SCSGroup']])
+    missing_fields = pd.Series(missing_tags.reindex(keys).to_numpy(), index=df.index)
+    df['Missing Fields'] = missing_fields.fillna('OK')
 
     print("Missing fields check complete.")
-    return df
\ No newline at end of file
+    return df
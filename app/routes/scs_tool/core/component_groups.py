@@ -0,0 +1,63 @@
+import json
+import os
+
+import pandas as pd
+
+# Allowed (ComponentGroup, ContainerName) pairs per rules file: {path: (mtime, MultiIndex)}
+_pairs_cache = {}
+
+
+def load_allowed_pairs(json_path):
+    """
+    Flattens a component groups JSON file into the set of allowed
+    (ComponentGroup, ContainerName) pairs.
+
+    The result is cached per file and only rebuilt when the file changes.
+
+    Args:
+        json_path: Path of component_groups.json or component_groups_granular.json
+
+    Returns:
+        pd.MultiIndex of unique (ComponentGroup, ContainerName) pairs
+    """
+    mtime = os.path.getmtime(json_path)
+    cached = _pairs_cache.get(json_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(json_path, 'r', encoding='utf-8') as json_file:
+        groups = json.load(json_file)['Groups']
+
+    component_groups = []
+    container_names = []
+    for group in groups:
+        for container_name in group['ContainerName']:
+            component_groups.append(group['ComponentGroup'])
+            container_names.append(container_name)
+
+    allowed = pd.MultiIndex.from_arrays(
+        [component_groups, container_names],
+        names=['ComponentGroup', 'ContainerName']
+    ).unique()
+
+    _pairs_cache[json_path] = (mtime, allowed)
+    return allowed
+
+
+def filter_component_groups(df, json_path, group_col='ComponentGroup', container_col='ContainerName'):
+    """
+    Keeps only the rows whose (group, container) pair is listed in the
+    component groups file, with a single vectorized MultiIndex lookup.
+
+    Args:
+        df: Report DataFrame
+        json_path: Path of the component groups JSON file
+        group_col: Column holding the component group ('SCSGroup' for granular reports)
+        container_col: Column holding the container name ('Granular Container Tag' for granular reports)
+
+    Returns:
+        Filtered copy of df
+    """
+    allowed = load_allowed_pairs(json_path)
+    keys = pd.MultiIndex.from_arrays([df[group_col], df[container_col]])
+    return df[keys.isin(allowed)].copy()
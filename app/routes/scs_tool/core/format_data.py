@@ -1,65 +1,146 @@
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill,Font
 
-from config import SCS_REGULAR_FILE_PATH, SCS_GRANULAR_FILE_PATH
-
 import openpyxl
 
-def format_data():
-    """This function is used to format the data in the Excel file, bold headers, adjust the column width, and highlight errors."""
-
-    # Load Workbook and get the active sheet
-    wb = openpyxl.load_workbook(SCS_REGULAR_FILE_PATH)  # Server
-    worksheet = wb.active
-
-    # Bold and color the headers
-    header_fill = PatternFill(start_color='0072C6', end_color='0072C6', fill_type='solid')
-    for cell in worksheet[1]:
-        cell.fill = header_fill
-
-    # Find the column index for the header "Accuracy"
-    accuracy_column = None
-    for idx, cell in enumerate(worksheet[1], 1):
-        if cell.value == "Accuracy":
-            accuracy_column = idx
-            break
-
-    if accuracy_column is not None:
-        # Loop over all the cells in the "Accuracy" column.
-        for cell in worksheet.iter_cols(min_col=accuracy_column, max_col=accuracy_column, min_row=2):
-            for c in cell:
-                if 'ERROR' in str(c.value):
-                    font = c.font
-                    c.font = Font(color='FF0000', name=font.name, size=font.size)
-
-    # Save the workbook
-    wb.save(SCS_REGULAR_FILE_PATH)  # Server
-    
-def format_data_granular():
-    """This function is used to format the data in the Excel file, bold headers, adjust the column width, and highlight errors."""
-
-    # Load Workbook and get the active sheet
-    wb = openpyxl.load_workbook(SCS_GRANULAR_FILE_PATH)  # Server
-    worksheet = wb.active
-
-    # Bold and color the headers
-    header_fill = PatternFill(start_color='0072C6', end_color='0072C6', fill_type='solid')
-    for cell in worksheet[1]:
-        cell.fill = header_fill
-
-    # Find the column index for the header "Accuracy"
-    accuracy_column = None
-    for idx, cell in enumerate(worksheet[1], 1):
-        if cell.value == "Accuracy":
-            accuracy_column = idx
-            break
-
-    if accuracy_column is not None:
-        # Loop over all the cells in the "Accuracy" column.
-        for cell in worksheet.iter_cols(min_col=accuracy_column, max_col=accuracy_column, min_row=2):
-            for c in cell:
-                if 'ERROR' in str(c.value):
-                    font = c.font
-                    c.font = Font(color='FF0000', name=font.name, size=font.size)
-
-    # Save the workbook to a file`.
-    wb.save(SCS_GRANULAR_FILE_PATH)  # Server
\ No newline at end of file
+try:
+    import xlsxwriter
+except ImportError:  # Fall back to openpyxl's write-only mode
+    xlsxwriter = None
+
+HEADER_COLOR = '0072C6'
+ERROR_COLOR = 'FF0000'
+
+
+class StyledReportWriter:
+    """
+    Writes report sheets in a single pass, with the header fill and the red
+    'ERROR' highlighting of the Accuracy column applied while the rows are
+    written.
+
+    Rows are streamed to disk as they are appended: xlsxwriter runs in
+    constant_memory mode (or openpyxl in write-only mode if xlsxwriter is not
+    installed), so the workbook is never held in memory or reopened.
+    Sheets must be written one after the other.
+
+    Usage:
+        with StyledReportWriter(path_or_buffer) as writer:
+            writer.write_sheet('qa', df)
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self._sheets = {}
+        if xlsxwriter is not None:
+            self.workbook = xlsxwriter.Workbook(output, {
+                'constant_memory': True,
+                'strings_to_formulas': False,
+                'strings_to_urls': False,
+                'strings_to_numbers': False,
+                'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+            })
+            self._header_format = self.workbook.add_format(
+                {'bold': True, 'border': 1, 'bg_color': '#' + HEADER_COLOR})
+            self._plain_header_format = self.workbook.add_format({'bold': True, 'border': 1})
+            self._error_format = self.workbook.add_format({'font_color': '#' + ERROR_COLOR})
+        else:
+            self.workbook = openpyxl.Workbook(write_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_sheet(self, name, columns, styled=True):
+        """
+        Creates a sheet and writes its header row.
+
+        Args:
+            name: Sheet name
+            columns: Column names
+            styled: Fill the header and highlight errors in the 'Accuracy' column
+
+        Returns:
+            Sheet handle to pass to append()
+        """
+        columns = list(columns)
+        header = [str(column) for column in columns]
+        accuracy_idx = header.index('Accuracy') if styled and 'Accuracy' in header else None
+
+        if xlsxwriter is not None:
+            worksheet = self.workbook.add_worksheet(name)
+            worksheet.write_row(0, 0, header, self._header_format if styled else self._plain_header_format)
+        else:
+            worksheet = self.workbook.create_sheet(name)
+            header_fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type='solid')
+            cells = []
+            for column in header:
+                cell = WriteOnlyCell(worksheet, value=column)
+                cell.font = Font(bold=True)
+                if styled:
+                    cell.fill = header_fill
+                cells.append(cell)
+            worksheet.append(cells)
+
+        sheet = {'worksheet': worksheet, 'columns': columns, 'accuracy_idx': accuracy_idx, 'rows': 0}
+        self._sheets[name] = sheet
+        return sheet
+
+    def append(self, sheet, df):
+        """Appends the rows of a DataFrame to a sheet created with add_sheet."""
+        worksheet = sheet['worksheet']
+        accuracy_idx = sheet['accuracy_idx']
+        values = df.astype(object).where(df.notna(), None)
+
+        if xlsxwriter is not None:
+            row_idx = sheet['rows'] + 1
+            for row in values.itertuples(index=False, name=None):
+                worksheet.write_row(row_idx, 0, row)
+                row_idx += 1
+        else:
+            error_font = Font(color=ERROR_COLOR)
+            for row in values.itertuples(index=False, name=None):
+                if accuracy_idx is not None and 'ERROR' in str(row[accuracy_idx]):
+                    row = list(row)
+                    cell = WriteOnlyCell(worksheet, value=row[accuracy_idx])
+                    cell.font = error_font
+                    row[accuracy_idx] = cell
+                worksheet.append(row)
+
+        sheet['rows'] += len(df)
+
+    def write_sheet(self, name, df, styled=True):
+        """Writes a whole DataFrame as a new sheet."""
+        sheet = self.add_sheet(name, df.columns, styled=styled)
+        self.append(sheet, df)
+        return sheet
+
+    def close(self):
+        if xlsxwriter is not None:
+            # Errors are highlighted with a conditional format over the whole Accuracy column
+            for sheet in self._sheets.values():
+                if sheet['accuracy_idx'] is not None and sheet['rows']:
+                    col = sheet['accuracy_idx']
+                    sheet['worksheet'].conditional_format(1, col, sheet['rows'], col, {
+                        'type': 'text',
+                        'criteria': 'containing',
+                        'value': 'ERROR',
+                        'format': self._error_format
+                    })
+            self.workbook.close()
+        else:
+            self.workbook.save(self.output)
+
+
+def write_report(output, sheets):
+    """
+    Writes a formatted report in one pass. Only the first sheet is styled.
+
+    Args:
+        output: Path or binary file-like object
+        sheets: List of (sheet name, DataFrame)
+    """
+    with StyledReportWriter(output) as writer:
+        for position, (name, df) in enumerate(sheets):
+            writer.write_sheet(name, df, styled=position == 0)
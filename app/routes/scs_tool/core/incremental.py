@@ -0,0 +1,233 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import SCS_APP_PATH, SCS_REGULAR_FILE_PATH
+from app.routes.scs_tool.core.process_data import clear_json_cache
+from app.routes.scs_tool.core.qa_data import (
+    REPORT_STAGES,
+    report_progress,
+    prepare_report,
+    process_report,
+    save_report
+)
+from app.routes.scs_tool.core.result_cache import rules_version
+from app.routes.scs_tool.core.stage_stats import stage_stats, finish_stages
+from app.routes.scs_tool.core.workbook import ReportWorkbook
+
+# Last run of each report identity, one pickle per identity
+INCREMENTAL_DIR = os.path.join(SCS_APP_PATH, 'cache', 'runs')
+
+# Bump when the pickled snapshot layout changes
+INCREMENTAL_FORMAT = 1
+
+# Least recently used runs are evicted past this total size, and runs not
+# used for INCREMENTAL_MAX_AGE_SECONDS are evicted whatever the size
+INCREMENTAL_MAX_BYTES = 1024 * 1024 * 1024
+INCREMENTAL_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Rows are matched between runs by this key and the hash of the whole row
+ROW_KEY = ['SKU', 'ContainerName', 'Component']
+
+# Past this fraction of changed rows the whole report is processed again
+INCREMENTAL_MAX_CHANGED_FRACTION = 0.5
+
+# Stands in for a missing SKU, so rows without one are grouped together
+_NO_SKU = '\x00no sku'
+
+_evict_lock = threading.Lock()
+
+
+def _snapshot_path(identity):
+    digest = hashlib.sha1(str(identity).encode('utf-8')).hexdigest()
+    return os.path.join(INCREMENTAL_DIR, f"run_{digest}.pickle")
+
+
+def load_snapshot(identity):
+    """Returns the last run of a report identity, or None."""
+    path = _snapshot_path(identity)
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        # Mark the run as recently used
+        os.utime(path)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('format') != INCREMENTAL_FORMAT:
+        return None
+    return snapshot
+
+
+def save_snapshot(identity, snapshot):
+    """Persists the run of a report identity atomically."""
+    path = _snapshot_path(identity)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(INCREMENTAL_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not save incremental snapshot of {identity}: {e}")
+        return
+    _evict_snapshots()
+
+
+def _evict_snapshots(max_bytes=None, max_age=None):
+    """
+    Removes the runs not used for max_age seconds, then the least recently
+    used ones until the rest fits in max_bytes.
+    """
+    max_bytes = INCREMENTAL_MAX_BYTES if max_bytes is None else max_bytes
+    max_age = INCREMENTAL_MAX_AGE_SECONDS if max_age is None else max_age
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(INCREMENTAL_DIR):
+            if entry.name.endswith('.pickle') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        oldest_kept = time.time() - max_age
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= max_bytes and mtime >= oldest_kept:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def row_signatures(df):
+    """
+    Identifies every row of a prepared report.
+
+    Returns:
+        DataFrame indexed like df with the row's SKU, the hash of its
+        ROW_KEY, the hash of the whole row, and its occurrence number among
+        identical rows
+    """
+    signatures = pd.DataFrame({
+        'sku': df['SKU'].astype(object).where(df['SKU'].notna(), _NO_SKU),
+        'key': pd.util.hash_pandas_object(df[ROW_KEY], index=False).to_numpy(),
+        'row': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+    }, index=df.index)
+    signatures['occurrence'] = signatures.groupby(['key', 'row']).cumcount()
+    return signatures
+
+
+def diff_report(previous, current):
+    """
+    Diffs the row signatures of two runs by row key and content.
+
+    Returns:
+        (changed_skus, reused) where changed_skus is the set of SKUs with
+        an added, removed or modified row, and reused maps the index of every
+        row of an unchanged SKU to its index in the previous run
+    """
+    merged = current.reset_index().merge(
+        previous.reset_index(),
+        how='outer',
+        on=['key', 'row', 'occurrence'],
+        suffixes=('', '_previous'),
+        indicator=True
+    )
+    added = merged['_merge'] == 'left_only'
+    removed = merged['_merge'] == 'right_only'
+    changed_skus = set(merged.loc[added, 'sku']) | set(merged.loc[removed, 'sku_previous'])
+
+    # The outer merge turns both indexes to float, they are restored to the dtype of their run
+    both = merged[(merged['_merge'] == 'both') & ~merged['sku'].isin(changed_skus)]
+    reused = pd.Series(both['index_previous'].astype(previous.index.dtype).to_numpy(),
+                       index=both['index'].astype(current.index.dtype).to_numpy())
+    return changed_skus, reused
+
+
+def _merge_runs(df, previous_output, changed, reused):
+    """Processes the rows of the changed SKUs and merges them with the previous results of the others."""
+    # Previous results of the reused rows that survived the filters, relabelled to the new index
+    kept = reused[reused.isin(previous_output.index)]
+    carried = previous_output.loc[kept.to_numpy()]
+    carried.index = kept.index
+
+    if not changed.any():
+        return carried.sort_index()
+
+    fresh = process_report(df[changed].copy())
+    result = pd.concat([carried, fresh])
+    result = result.loc[np.sort(result.index.to_numpy())]
+    return result[previous_output.columns]
+
+
+def clean_report_incremental(file, identity, output=SCS_REGULAR_FILE_PATH, progress=None):
+    """
+    Processes a standard report, reusing the previous run of the same report.
+
+    The rows of the upload are diffed against the last run of identity by
+    (SKU, ContainerName, Component) and the content of the whole row. The
+    product line and NPU checks look at every row of a SKU, so only the SKUs
+    with an added, removed or modified row are processed again; the other
+    rows keep their previous results. The output is the same as clean_report.
+
+    The whole report is processed when there is no previous run, when the
+    columns or the rules changed since, or when more than
+    INCREMENTAL_MAX_CHANGED_FRACTION of the rows changed.
+
+    Args:
+        file: Uploaded file
+        identity: Name the runs of a report are kept under (e.g. its file name)
+        output: Path or binary file-like object the report is written to
+        progress: Optional progress(stage, step, total) callback
+
+    Returns:
+        Processed DataFrame, or None on error
+    """
+    progress = stage_stats('incremental', REPORT_STAGES, progress)
+    try:
+        report_progress(progress, REPORT_STAGES, 'parse')
+        workbook = ReportWorkbook(file)
+        df = prepare_report(workbook)
+
+        version = rules_version('regular')
+        signatures = row_signatures(df)
+        previous = load_snapshot(identity)
+
+        result = None
+        if (previous is not None and previous['rules_version'] == version
+                and previous['columns'] == df.columns.tolist()):
+            changed_skus, reused = diff_report(previous['signatures'], signatures)
+            changed = signatures['sku'].isin(changed_skus).to_numpy()
+            if changed.mean() <= INCREMENTAL_MAX_CHANGED_FRACTION:
+                print(f"Incremental run of {identity}: {len(changed_skus)} changed SKUs, "
+                      f"{int(changed.sum())} of {len(df)} rows processed")
+                report_progress(progress, REPORT_STAGES, 'validation', df)
+                result = _merge_runs(df, previous['output'], changed, reused)
+
+        if result is None:
+            result = process_report(df.copy(), progress)
+
+        save_report(workbook, result, output, progress)
+        workbook.close()
+
+        save_snapshot(identity, {
+            'format': INCREMENTAL_FORMAT,
+            'rules_version': version,
+            'columns': df.columns.tolist(),
+            'signatures': signatures,
+            'output': result
+        })
+
+        clear_json_cache()
+        return result
+
+    except Exception as e:
+        print(f"An error occurred in clean_report_incremental: {e}")
+        finish_stages(progress)
+        clear_json_cache()
+        return None
@@ -1,67 +1,274 @@
+import atexit
 import json
 import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, the thread lock still applies
+    fcntl = None
+
 from config import SCS_JSON_PATH, SCS_JSON_PATH_AV
 
-def process_json_input(tag, component, value):
-    # Construct the file path using the tag as the file name
-    file_path = os.path.join(SCS_JSON_PATH, f"{tag}.json")
+# Pending writes of '<tag>.json' are appended to '<tag>.json.journal'
+JOURNAL_SUFFIX = '.journal'
+LOCK_SUFFIX = '.lock'
+
+# A journal is compacted into its JSON file once it holds this many entries
+# or bytes, and when the store is closed
+RULES_JOURNAL_MAX_ENTRIES = 1000
+RULES_JOURNAL_MAX_BYTES = 1024 * 1024
+
+# Stores already opened by this process: {(json_dir, key_field): RulesStore}
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _FileLock:
+    """Exclusive lock shared by every thread and process writing a container."""
+
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.handle = open(self.path, 'a')
+            if fcntl is not None:
+                fcntl.flock(self.handle, fcntl.LOCK_EX)
+        except Exception:
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        finally:
+            self.thread_lock.release()
+
+
+class RulesStore:
+    """
+    Container JSON files of one folder, with an in-memory
+    (key, ContainerValue) set per container for O(1) duplicate checks.
+
+    New entries are appended to the container's journal, which is the
+    commit point, so an edit costs a small append instead of a rewrite. The
+    journal is compacted into the JSON file with an atomic rename once it
+    passes RULES_JOURNAL_MAX_ENTRIES or RULES_JOURNAL_MAX_BYTES, and when
+    the store is closed. Until then readers replay it after the JSON file
+    (see read_journal), as does the next load of any process. Every read
+    and write holds a file lock, so concurrent threads and processes never
+    lose an update or see a partial file.
+    """
+
+    def __init__(self, json_dir, key_field):
+        self.json_dir = json_dir
+        self.key_field = key_field
+        # {tag: {'signature', 'journal_offset', 'journal_entries', 'data', 'pairs'}}
+        self._containers = {}
+        self._thread_locks = {}
+        self._thread_locks_lock = threading.Lock()
+
+    def _path(self, tag):
+        return os.path.join(self.json_dir, f"{tag}.json")
+
+    def _lock(self, tag):
+        with self._thread_locks_lock:
+            thread_lock = self._thread_locks.setdefault(tag, threading.Lock())
+        return _FileLock(self._path(tag) + LOCK_SUFFIX, thread_lock)
+
+    def _load(self, tag):
+        """Brings the cached container up to date with its file and journal. Call with the lock held."""
+        path = self._path(tag)
+        if not os.path.exists(path):
+            self._containers.pop(tag, None)
+            raise FileNotFoundError("JSON file not found. Please ensure the file exists before attempting to update it.")
+
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        container = self._containers.get(tag)
+        if container is None or container['signature'] != signature:
+            with open(path, 'r', encoding='utf-8') as json_file:
+                data = json.load(json_file)
+            entries = data.setdefault(tag, [])
+            container = {
+                'signature': signature,
+                'journal_offset': 0,
+                'journal_entries': 0,
+                'data': data,
+                'pairs': {(entry.get(self.key_field), entry.get('ContainerValue')) for entry in entries}
+            }
+            self._containers[tag] = container
+
+        # Replay journal entries written since the last load
+        journal_path = path + JOURNAL_SUFFIX
+        if os.path.exists(journal_path) and os.path.getsize(journal_path) > container['journal_offset']:
+            with open(journal_path, 'r', encoding='utf-8') as journal:
+                journal.seek(container['journal_offset'])
+                for line in journal:
+                    if not line.endswith('\n'):
+                        break  # Partial line of an interrupted append
+                    container['journal_offset'] += len(line.encode('utf-8'))
+                    container['journal_entries'] += 1
+                    self._apply(container, tag, json.loads(line))
+        return container
+
+    def _apply(self, container, tag, entry):
+        pair = (entry.get(self.key_field), entry.get('ContainerValue'))
+        if pair in container['pairs']:
+            return False
+        container['pairs'].add(pair)
+        container['data'][tag].append(entry)
+        return True
+
+    def _compact(self, tag, container):
+        """Writes the container to its JSON file atomically and clears the journal. Call with the lock held."""
+        path = self._path(tag)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as json_file:
+            json.dump(container['data'], json_file, indent=4)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+        os.replace(tmp_path, path)
 
-    # Check if the JSON file exists
-    if os.path.exists(file_path):
-        with open(file_path, 'r+', encoding='utf-8') as json_file:
-            data = json.load(json_file)
+        journal_path = path + JOURNAL_SUFFIX
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        stat = os.stat(path)
+        container['signature'] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        container['journal_offset'] = 0
+        container['journal_entries'] = 0
 
-            # The root key of the JSON is the same as the tag
-            root_key = tag
+    def compact(self, tag):
+        """Folds the journal of a container into its JSON file, if it has one."""
+        with self._lock(tag):
+            container = self._load(tag)
+            if container['journal_entries']:
+                self._compact(tag, container)
 
-            # Check if the component and value are already present
-            for entry in data.get(root_key, []):
-                if entry.get('PhwebDescription') == component and entry.get('ContainerValue') == value:
-                    raise ValueError("Value already in JSON")  # Raise an error if the component and value are already in the file
+    def close(self):
+        """Compacts the journal of every container loaded by this store."""
+        for tag in list(self._containers):
+            try:
+                self.compact(tag)
+            except (OSError, ValueError) as e:
+                print(f"Could not compact the journal of {tag}: {e}")
 
-            # If not present, add the new component and value
-            data[root_key].append({
-                'PhwebDescription': component,
-                'ContainerValue': value
-            })
+    def contains(self, tag, key, value):
+        with self._lock(tag):
+            return (key, value) in self._load(tag)['pairs']
 
-            # Move the cursor to the beginning and truncate the file before writing
-            json_file.seek(0)
-            json_file.truncate()
-            json.dump(data, json_file, indent=4)
+    def add_entries(self, tag, pairs):
+        """
+        Adds (key, ContainerValue) entries to a container.
 
-    else:
-        # If the file doesn't exist, raise an error
-        raise FileNotFoundError("JSON file not found. Please ensure the file exists before attempting to update it.")
+        Args:
+            tag: Container name, i.e. the JSON file name and its root key
+            pairs: Iterable of (key, ContainerValue)
+
+        Returns:
+            List of the pairs that were skipped because the container
+            already had them
+        """
+        with self._lock(tag):
+            container = self._load(tag)
+
+            new_entries = []
+            skipped = []
+            batch = set()
+            for key, value in pairs:
+                pair = (key, value)
+                if pair in container['pairs'] or pair in batch:
+                    skipped.append(pair)
+                    continue
+                batch.add(pair)
+                new_entries.append({self.key_field: key, 'ContainerValue': value})
+
+            if not new_entries:
+                return skipped
+
+            journal_path = self._path(tag) + JOURNAL_SUFFIX
+            if os.path.exists(journal_path) and os.path.getsize(journal_path) > container['journal_offset']:
+                # Drop the partial line of an interrupted append before writing after it
+                os.truncate(journal_path, container['journal_offset'])
+            with open(journal_path, 'a', encoding='utf-8') as journal:
+                journal.write(''.join(json.dumps(entry) + '\n' for entry in new_entries))
+                journal.flush()
+                os.fsync(journal.fileno())
+
+            for entry in new_entries:
+                self._apply(container, tag, entry)
+            container['journal_offset'] = os.path.getsize(journal_path)
+            container['journal_entries'] += len(new_entries)
+
+            if (container['journal_entries'] >= RULES_JOURNAL_MAX_ENTRIES
+                    or container['journal_offset'] >= RULES_JOURNAL_MAX_BYTES):
+                self._compact(tag, container)
+            return skipped
+
+    def add_entry(self, tag, key, value):
+        """Adds one entry, raising ValueError if the container already has it."""
+        if self.add_entries(tag, [(key, value)]):
+            raise ValueError("Value already in JSON")  # Raise an error if the component and value are already in the file
+
+
+def read_journal(json_path):
+    """
+    Returns the entries of the journal of a container JSON file that are
+    not compacted yet, in order. A partial last line is ignored.
+    """
+    try:
+        with open(json_path + JOURNAL_SUFFIX, 'r', encoding='utf-8') as journal:
+            return [json.loads(line) for line in journal if line.endswith('\n')]
+    except FileNotFoundError:
+        return []
+
+
+def get_rules_store(json_dir, key_field):
+    """Returns the RulesStore of a folder, shared by the whole process."""
+    with _stores_lock:
+        store = _stores.get((json_dir, key_field))
+        if store is None:
+            store = RulesStore(json_dir, key_field)
+            _stores[(json_dir, key_field)] = store
+        return store
+
+
+def close_rules_stores():
+    """Compacts the journals of every store opened by this process."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_rules_stores)
+
+
+def process_json_input(tag, component, value):
+    """Adds a PhwebDescription -> ContainerValue entry to a container of SCS_JSON_PATH."""
+    get_rules_store(SCS_JSON_PATH, 'PhwebDescription').add_entry(tag, component, value)
+
+def process_json_batch(tag, entries):
+    """
+    Adds many (PhwebDescription, ContainerValue) entries to a container of
+    SCS_JSON_PATH with a single journal append. Returns the entries already present.
+    """
+    return get_rules_store(SCS_JSON_PATH, 'PhwebDescription').add_entries(tag, entries)
 
 def update_json_av(tag_av, component_av, value_av):
-    # Construct the file path using the tag as the file name
-    file_path = os.path.join(SCS_JSON_PATH_AV, f"{tag_av}.json")
-
-    # Check if the JSON file exists
-    if os.path.exists(file_path):
-        with open(file_path, 'r+', encoding='utf-8') as json_file:
-            data = json.load(json_file)
-
-            # The root key of the JSON is the same as the tag
-            root_key = tag_av
-
-            # Check if the component and value are already present
-            for entry in data.get(root_key, []):
-                if entry.get('Component') == component_av and entry.get('ContainerValue') == value_av:
-                    raise ValueError("Value already in JSON")  # Raise an error if the component and value are already in the file
-
-            # If not present, add the new component and value
-            data[root_key].append({
-                'Component': component_av,
-                'ContainerValue': value_av
-            })
-
-            # Move the cursor to the beginning and truncate the file before writing
-            json_file.seek(0)
-            json_file.truncate()
-            json.dump(data, json_file, indent=4)
-
-    else:
-        # If the file doesn't exist, raise an error
-        raise FileNotFoundError("JSON file not found. Please ensure the file exists before attempting to update it.")
+    """Adds a Component -> ContainerValue entry to a container of SCS_JSON_PATH_AV."""
+    get_rules_store(SCS_JSON_PATH_AV, 'Component').add_entry(tag_av, component_av, value_av)
+
+def update_json_av_batch(tag_av, entries):
+    """
+    Adds many (Component, ContainerValue) entries to a container of
+    SCS_JSON_PATH_AV with a single journal append. Returns the entries already present.
+    """
+    return get_rules_store(SCS_JSON_PATH_AV, 'Component').add_entries(tag_av, entries)
@@ -4,21 +4,59 @@ import json
 
 from config import SCS_COMPONENT_GROUPS_PATH
 
-def search_json_files(value, container_names):
-    json_folder = "json"  # Folder containing JSON files
+# Folder containing the container JSON files
+MATRIX_JSON_FOLDER = "json"
+
+def build_token_index(json_folder=MATRIX_JSON_FOLDER):
+    """
+    Builds an inverted index of the words of every ContainerValue.
+
+    Files are read once, in directory order, and every entry gets a scan
+    position, so a lookup returns the same entry the file-by-file scan
+    would find first.
+
+    Returns:
+        {word: {container: (position, ContainerValue)}} with the first
+        entry of each container containing the word
+    """
+    token_index = {}
+    position = 0
     for filename in os.listdir(json_folder):  # Iterate through files in the JSON folder
-        if filename.endswith(".json") and filename.split(".")[0] in container_names:
+        if not filename.endswith(".json"):
+            continue
+        container = filename.split(".")[0]
+        try:
             with open(os.path.join(json_folder, filename), encoding="utf-8") as json_file:
                 data = json.load(json_file)  # Load JSON data
-                for item in data:  # Iterate through items in the JSON data
-                    for entry in data[item]:  # Iterate through entries in each item
-                        container_value = entry.get("ContainerValue", "")  # Get the container value
-                        if isinstance(container_value, str):
-                            container_words = container_value.lower().split()  # Split into words
-                            value_words = value.lower().split()  # Split search value into words
-                            if any(word in container_words for word in value_words):
-                                return filename.split(".")[0], container_value  # Return matching file and value
-    return None, None  # Return None if no match is found
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping {filename}: {e}")
+            continue
+        for item in data:  # Iterate through items in the JSON data
+            for entry in data[item]:  # Iterate through entries in each item
+                position += 1
+                container_value = entry.get("ContainerValue", "") if isinstance(entry, dict) else None
+                if not isinstance(container_value, str):
+                    continue
+                for word in set(container_value.lower().split()):
+                    # setdefault keeps the first entry of the container with this word
+                    token_index.setdefault(word, {}).setdefault(container, (position, container_value))
+    return token_index
+
+def search_json_files(value, container_names, token_index=None):
+    """
+    Returns (container, ContainerValue) of the first entry, among the given
+    containers, sharing a word with value, or (None, None).
+    """
+    if token_index is None:
+        token_index = build_token_index()
+    best = None
+    for word in set(value.lower().split()):  # Split search value into words
+        for container, (position, container_value) in token_index.get(word, {}).items():
+            if container in container_names and (best is None or position < best[0]):
+                best = (position, container, container_value)
+    if best is None:
+        return None, None  # Return None if no match is found
+    return best[1], best[2]  # Return matching file and value
 
 def load_component_groups():
     with open(SCS_COMPONENT_GROUPS_PATH, 'r', encoding='utf-8') as json_file:
@@ -43,29 +81,36 @@ def matrix_file():
         # Clean the "Characteristic" column
         df["Characteristic"] = df["Characteristic"].apply(clean_characteristic)
 
-        group_data = {group: [] for group in component_groups}  # Dictionary to store data for each group
-
-        # Search for data in JSON files and add new columns
-        for index, row in df.iterrows():
-            scs_group = row["SCS Component Group"]  # Get the SCS component group
-            if scs_group in component_groups:
-                container_names = component_groups[scs_group]  # Get the container names for the group
-                json_name, container_value = search_json_files(row["Characteristic"], container_names)
-                if json_name is not None and container_value is not None:
-                    # If found, create a dictionary with the row data and the found value
-                    found_row = {
-                        "Component": row["Component"],
-                        "SCSGroup": scs_group,
-                        "ContainerType": "Prism",
-                        json_name: container_value
-                    }
-                    group_data[scs_group].append(found_row)  # Append to the list of found data
+        # Word -> first (container, value) of every container JSON, built once
+        token_index = build_token_index()
+        container_sets = {group: set(names) for group, names in component_groups.items()}
+
+        # Resolve each distinct (group, characteristic) pair once
+        df = df[df["SCS Component Group"].isin(component_groups)]
+        pairs = df[["SCS Component Group", "Characteristic"]].drop_duplicates()
+        matches = {
+            (group, characteristic): search_json_files(characteristic, container_sets[group], token_index)
+            for group, characteristic in pairs.itertuples(index=False, name=None)
+        }
+        found = [matches[key] for key in zip(df["SCS Component Group"], df["Characteristic"])]
+        df = df.assign(
+            json_name=pd.Series([json_name for json_name, _ in found], index=df.index, dtype=object),
+            container_value=pd.Series([value for _, value in found], index=df.index, dtype=object)
+        ).dropna(subset=["json_name", "container_value"])
 
         # Create a Pandas Excel writer object
         with pd.ExcelWriter("matrix_output.xlsx", engine='openpyxl') as writer:
-            for group, data in group_data.items():
-                if data:
-                    group_df = pd.DataFrame(data)  # Convert the list of dictionaries to a DataFrame for each group
+            for group in component_groups:
+                data = df[df["SCS Component Group"] == group]
+                if not data.empty:
+                    # One column per matched container, in order of first match
+                    group_df = pd.DataFrame({
+                        "Component": data["Component"],
+                        "SCSGroup": group,
+                        "ContainerType": "Prism"
+                    })
+                    for json_name in data["json_name"].unique():
+                        group_df[json_name] = data["container_value"].where(data["json_name"] == json_name)
                 else:
                     group_df = pd.DataFrame(columns=["Component", "SCSGroup", "ContainerType"])  # Create an empty DataFrame with the specified columns if no data is found
                 group_df.to_excel(writer, sheet_name=group, index=False)  # Write each DataFrame to a different sheet named after the ComponentGroup
@@ -1,6 +1,8 @@
 import json
 import pandas as pd
 
+NPU_CONTAINERS = ['processorname', 'npu', 'a_processor_nputops']
+
 def npu_check(df, npu_json_path):
     #print("\n--- [NPU CHECK] Starting NPU & NPU TOPS Validation ---")
     
@@ -9,7 +11,7 @@ def npu_check(df, npu_json_path):
             npu_data = json.load(f).get("processor", {})
     except (FileNotFoundError, json.JSONDecodeError) as e:
         #print(f"[NPU CHECK] ERROR: Failed to load or parse NPU JSON: {e}")
-        error_mask = df['ContainerName'].isin(['processorname', 'npu', 'a_processor_nputops'])
+        error_mask = df['ContainerName'].isin(NPU_CONTAINERS)
         df.loc[error_mask, 'Additional Information'] = 'NPU FAIL - JSON Error'
         return df
 
@@ -17,46 +19,40 @@ def npu_check(df, npu_json_path):
         #print("[NPU CHECK] WARNING: 'processor' key not found or empty in NPU JSON.")
         return df
 
-    processor_map = {
-        proc_obj['processorname']: {
-            'npu': npu_type,
-            'a_processor_nputops': proc_obj['a_processor_nputops']
-        }
-        for npu_type, proc_list in npu_data.items()
-        for proc_obj in proc_list
-    }
-
-    for sku, group in df.groupby('SKU'):
-        
-        processor_rows = group[group['ContainerName'] == 'processorname']
-        if processor_rows.empty:
-            continue
-
-        # Added .strip() to remove whitespace
-        processor_value = processor_rows['ContainerValue'].iloc[0].strip()
-        
-        expected_values = processor_map.get(processor_value)
-        
-        if expected_values:
-            # The processor was found. Now, we MUST validate its related fields.
-            npu_rows = group[group['ContainerName'] == 'npu']
-            a_proc_tops_rows = group[group['ContainerName'] == 'a_processor_nputops']
-
-            actual_npu_value = npu_rows['ContainerValue'].iloc[0].strip() if not npu_rows.empty else None
-            actual_a_proc_tops_value = a_proc_tops_rows['ContainerValue'].iloc[0].strip() if not a_proc_tops_rows.empty else None
-
-            npu_ok = actual_npu_value == expected_values['npu']
-            a_proc_tops_ok = actual_a_proc_tops_value == expected_values['a_processor_nputops']
-            
-            status = "NPU OK" if npu_ok and a_proc_tops_ok else "ERROR: NPU"
-            
-            indices_to_update = processor_rows.index.union(npu_rows.index).union(a_proc_tops_rows.index)
-            df.loc[indices_to_update, 'Accuracy'] = status
-        
-        else:
-
-            #print(f" [NPU CHECK] Skipping SKU {sku}: Processor '{processor_value[:40]}...' not found in validation list.")
-            continue
+    # Expected NPU values per processor; a processor listed twice keeps its last entry
+    processor_map = pd.DataFrame(
+        [
+            (proc_obj['processorname'], npu_type, proc_obj['a_processor_nputops'])
+            for npu_type, proc_list in npu_data.items()
+            for proc_obj in proc_list
+        ],
+        columns=['processorname', 'expected_npu', 'expected_nputops']
+    ).drop_duplicates('processorname', keep='last').set_index('processorname')
+
+    npu_rows = df[df['ContainerName'].isin(NPU_CONTAINERS) & df['SKU'].notna()]
+    if npu_rows.empty:
+        return df
+
+    # One row per SKU with the first value of each NPU container (whitespace removed)
+    first_values = npu_rows.drop_duplicates(['SKU', 'ContainerName'])
+    sku_values = pd.DataFrame({
+        'SKU': first_values['SKU'],
+        'ContainerName': first_values['ContainerName'],
+        'ContainerValue': first_values['ContainerValue'].astype(str).str.strip()
+    }).pivot(index='SKU', columns='ContainerName', values='ContainerValue').reindex(columns=NPU_CONTAINERS).astype(object)
+
+    # SKUs whose processor is not in the validation list are skipped
+    sku_values = sku_values.join(processor_map, on='processorname', how='inner')
+    if sku_values.empty:
+        return df
+
+    npu_ok = sku_values['npu'] == sku_values['expected_npu']
+    a_proc_tops_ok = sku_values['a_processor_nputops'] == sku_values['expected_nputops']
+    status = pd.Series('ERROR: NPU', index=sku_values.index).where(~(npu_ok & a_proc_tops_ok), 'NPU OK')
+
+    # Every processorname, npu and a_processor_nputops row of a validated SKU gets its status
+    rows_to_update = npu_rows[npu_rows['SKU'].isin(status.index)]
+    df.loc[rows_to_update.index, 'Accuracy'] = rows_to_update['SKU'].map(status)
 
     #print("\n--- [NPU CHECK] Finished Processing ---")
-    return df
\ No newline at end of file
+    return df
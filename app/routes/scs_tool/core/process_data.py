@@ -4,6 +4,8 @@ import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 
+from app.routes.scs_tool.core.rules_index import load_rules_index
+
 # Global cache for JSON data to avoid repeated file reads
 _json_cache = {}
 
@@ -22,32 +24,25 @@ def load_json_with_cache(json_path):
 def clear_json_cache():
     """
     Clear the JSON cache. Call this if memory becomes an issue.
+    The compiled rules index is kept, it is refreshed when its files change.
     """
     global _json_cache
     _json_cache.clear()
 
-def process_data(json_path, container_name, df):
+def process_data(json_path, container_name, df, rules_index=None):
     """
     Processes a standard report, checks accuracy, and provides the correct value on error.
-    Optimized version with caching and vectorized operations.
+    Optimized version with the compiled rules index and vectorized operations.
     """
-    json_data = load_json_with_cache(json_path)
-    
-    if json_data is None:
+    if rules_index is None:
+        rules_index = load_rules_index(os.path.dirname(json_path))
+    component_to_value_map = rules_index.container_rules(container_name)
+
+    if component_to_value_map is None:
         mask = df['ContainerName'] == container_name
         df.loc[mask, 'Accuracy'] = f'ERROR: {container_name} JSON not found or invalid'
         return df
 
-    container_data = json_data.get(container_name, {})
-    
-    # Create an inverted map for very fast lookups of the correct value.
-    # Maps each component to its one correct container value.
-    component_to_value_map = {
-        component: value
-        for value, components in container_data.items()
-        for component in components
-    }
-
     # Create a boolean mask for the rows that match the current container
     mask = df['ContainerName'] == container_name
     
@@ -87,27 +82,20 @@ def process_data(json_path, container_name, df):
     return df
 
 
-def process_data_granular(json_path, container_name, df_g):
+def process_data_granular(json_path, container_name, df_g, rules_index=None):
     """
     Processes a granular report, checks accuracy, and provides the correct value on error.
-    Optimized version with caching and vectorized operations.
+    Optimized version with the compiled rules index and vectorized operations.
     """
-    json_data = load_json_with_cache(json_path)
-    
-    if json_data is None:
+    if rules_index is None:
+        rules_index = load_rules_index(os.path.dirname(json_path))
+    component_to_value_map = rules_index.container_rules(container_name)
+
+    if component_to_value_map is None:
         mask = df_g['Granular Container Tag'] == container_name
         df_g.loc[mask, 'Accuracy'] = f'ERROR: {container_name} JSON not found or invalid'
         return df_g
 
-    container_data = json_data.get(container_name, {})
-    
-    # Create the inverted map for fast lookups.
-    component_to_value_map = {
-        component: value
-        for value, components in container_data.items()
-        for component in components
-    }
-    
     mask = df_g['Granular Container Tag'] == container_name
     
     # Only process if there are relevant rows
@@ -162,25 +150,19 @@ def process_multiple_containers_parallel(df, json_dir, container_col='ContainerN
     # Get unique container names that exist in the DataFrame
     containers_in_df = df[container_col].unique()
     
-    # Get list of JSON files
-    json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
-    
-    # Pre-load all JSON files into cache
-    for json_file in json_files:
-        json_path = os.path.join(json_dir, json_file)
-        load_json_with_cache(json_path)
+    # Compile (or refresh) the rules index of the folder once
+    rules_index = load_rules_index(json_dir)
     
     # Create tasks for containers that exist in both DataFrame and JSON files
     tasks = []
-    for json_file in json_files:
-        container_name = os.path.splitext(json_file)[0]
+    for container_name in rules_index.rules:
         if container_name in containers_in_df:
-            json_path = os.path.join(json_dir, json_file)
+            json_path = os.path.join(json_dir, f"{container_name}.json")
             tasks.append((json_path, container_name))
     
     # Process in parallel
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_data, json_path, container_name, df): container_name 
+        futures = {executor.submit(process_data, json_path, container_name, df, rules_index): container_name 
                    for json_path, container_name in tasks}
         
         for future in as_completed(futures):
@@ -209,25 +191,19 @@ def process_multiple_containers_parallel_granular(df_g, json_dir, container_col=
     # Get unique container names that exist in the DataFrame
     containers_in_df = df_g[container_col].unique()
     
-    # Get list of JSON files
-    json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
-    
-    # Pre-load all JSON files into cache
-    for json_file in json_files:
-        json_path = os.path.join(json_dir, json_file)
-        load_json_with_cache(json_path)
+    # Compile (or refresh) the rules index of the folder once
+    rules_index = load_rules_index(json_dir)
     
     # Create tasks for containers that exist in both DataFrame and JSON files
     tasks = []
-    for json_file in json_files:
-        container_name = os.path.splitext(json_file)[0]
+    for container_name in rules_index.rules:
         if container_name in containers_in_df:
-            json_path = os.path.join(json_dir, json_file)
+            json_path = os.path.join(json_dir, f"{container_name}.json")
             tasks.append((json_path, container_name))
     
     # Process in parallel
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_data_granular, json_path, container_name, df_g): container_name 
+        futures = {executor.submit(process_data_granular, json_path, container_name, df_g, rules_index): container_name 
                    for json_path, container_name in tasks}
         
         for future in as_completed(futures):
@@ -238,3 +214,98 @@ def process_multiple_containers_parallel_granular(df_g, json_dir, container_col=
                 print(f"Error processing {container_name}: {e}")
     
     return df_g
+
+
+# Lookup frames built from the rules indexes: {json_dir: (version, DataFrame)}
+_lookup_frames = {}
+
+def get_lookup_frame(rules_index):
+    """
+    Concatenates every container map of a rules index into a single lookup
+    frame with one row per (container, component) and its correct value.
+    The frame is rebuilt only when the index version changes.
+    """
+    cached = _lookup_frames.get(rules_index.json_dir)
+    if cached is not None and cached[0] == rules_index.version:
+        return cached[1]
+
+    containers = []
+    components = []
+    values = []
+    for container_name, rules in rules_index.rules.items():
+        if not rules:
+            continue
+        containers.extend([container_name] * len(rules))
+        components.extend(rules.keys())
+        values.extend(rules.values())
+
+    lookup = pd.DataFrame({
+        'container': pd.Series(containers, dtype=object),
+        'component': pd.Series(components, dtype=object),
+        'correct_value': pd.Series(values, dtype=object)
+    })
+    _lookup_frames[rules_index.json_dir] = (rules_index.version, lookup)
+    return lookup
+
+
+def validate_containers(df, json_dir, container_col='ContainerName', value_col='ContainerValue', rules_index=None):
+    """
+    Checks the accuracy of every row against the rules index in a single pass.
+
+    All container maps are looked up at once with one left merge on
+    (container, Component), producing the same 'Accuracy' and 'Correct Value'
+    labels as process_data / process_data_granular.
+
+    Args:
+        df: DataFrame to process
+        json_dir: Directory containing JSON files, or a rules database (see rules_db)
+        container_col: Column name for container identification
+        value_col: Column holding the value to validate
+        rules_index: Optional, already loaded RulesIndex of json_dir
+
+    Returns:
+        Updated DataFrame
+    """
+    if rules_index is None:
+        rules_index = load_rules_index(json_dir)
+
+    container_names = df[container_col]
+
+    # Containers whose JSON could not be read are flagged as a whole
+    invalid = container_names.isin(rules_index.invalid)
+    if invalid.any():
+        df.loc[invalid, 'Accuracy'] = 'ERROR: ' + container_names[invalid].astype(str) + ' JSON not found or invalid'
+
+    known = container_names.isin(rules_index.containers)
+    if not known.any():
+        return df
+
+    relevant_indices = df.index[known]
+    names = container_names[known].astype(str)
+    current_values = df.loc[relevant_indices, value_col]
+
+    # One hash join for every container at once; a left merge keeps the row order
+    keys = pd.DataFrame({
+        'container': container_names[known].astype(object).to_numpy(),
+        'component': df.loc[relevant_indices, 'Component'].astype(object).to_numpy()
+    })
+    correct_values = keys.merge(get_lookup_frame(rules_index), how='left', on=['container', 'component'])['correct_value']
+    correct_values = pd.Series(correct_values.to_numpy(), index=relevant_indices)
+
+    matches = current_values == correct_values
+    component_not_found = correct_values.isna()
+    wrong_value = ~matches & ~component_not_found
+
+    # Set accuracy status
+    accuracy = ('ERROR: ' + names).where(~matches, 'SCS ' + names + ' OK')
+
+    # Set correct value column
+    correct_value_col = pd.Series('', index=relevant_indices, dtype=object)
+    correct_value_col[wrong_value] = correct_values[wrong_value]
+    correct_value_col[component_not_found] = 'Component Not Found in JSON'
+
+    # Update the DataFrame
+    df.loc[relevant_indices, 'Accuracy'] = accuracy
+    df.loc[relevant_indices, 'Correct Value'] = correct_value_col
+
+    return df
@@ -1,59 +1,102 @@
 import json
+import os
+
+import pandas as pd
 from config import SCS_PRODUCT_LINES_PATH
 
+# PL -> mandatory containers, loaded once per process: (mtime, DataFrame)
+_product_lines = (None, None)
 
-def pl_check(df):
-    
+
+def load_product_lines():
+    """
+    Returns the mandatory containers of every product line as an exploded
+    (PL, ContainerName) frame. The file is read once per process and only
+    reloaded when it changes.
+    """
+    global _product_lines
+    mtime = os.path.getmtime(SCS_PRODUCT_LINES_PATH)
+    if _product_lines[0] == mtime:
+        return _product_lines[1]
+
+    with open(SCS_PRODUCT_LINES_PATH, "r") as json_file:  # Server
+        # with open('app/core/data/product_lines.json', 'r') as json_file:  # Local
+        json_data = json.load(json_file)
+
+    required = pd.DataFrame(
+        [
+            (pl_info["PL"], container_name)
+            for pl_info in json_data["ProductLine"]
+            for container_name in pl_info["ContainerName"]
+        ],
+        columns=["PL", "ContainerName"]
+    ).drop_duplicates()
+
+    _product_lines = (mtime, required)
+    return required
+
+
+def _check_mandatory_containers(df, container_col, value_col):
+    """
+    Validates the mandatory containers of each SKU against its product line.
+
+    Rows of a mandatory container with an empty value get their value set to
+    "ERROR: Mandatory Container Value". Mandatory containers that a SKU does
+    not have at all are listed in the 'Additional Information' column of
+    every row of that SKU.
+    """
     # Validate required columns
-    required_columns = ['PL', 'ContainerValue']
+    required_columns = ['PL', container_col, value_col]
     missing_columns = [col for col in required_columns if col not in df.columns]
     if missing_columns:
         raise ValueError(f"Missing required columns in pl_check: {missing_columns}. Available columns: {df.columns.tolist()}")
-    
-    # Read JSON data
-    with open(SCS_PRODUCT_LINES_PATH, "r") as json_file:  # Server
-        # with open('app/core/data/product_lines.json', 'r') as json_file:  # Local
-        json_data = json.load(json_file)
 
-    # Iterate through each product line in the JSON
-    for pl_info in json_data["ProductLine"]:
-        pl = pl_info["PL"]
-        container_names = pl_info["ContainerName"]
+    required = load_product_lines()
+    if required.empty:
+        return df
 
-        # Check if the PL column in the DataFrame matches the current PL from the JSON
-        matching_rows = df[df["PL"] == pl]
+    # Empty values in mandatory containers
+    mandatory_pairs = pd.MultiIndex.from_frame(required)
+    row_pairs = pd.MultiIndex.from_arrays([df["PL"], df[container_col]])
+    empty_mandatory = row_pairs.isin(mandatory_pairs) & df[value_col].isna().to_numpy()
+    if empty_mandatory.any():
+        # A value column read without any value is float, which cannot hold the error text
+        if df[value_col].dtype != object:
+            df[value_col] = df[value_col].astype(object)
+        df.loc[empty_mandatory, value_col] = "ERROR: Mandatory Container Value"
 
-        # Iterate through ContainerName columns
-        for container_name in container_names:
-            # Check if the 'ContainerValue' column is empty in the matching rows
-            empty_container_rows = matching_rows[matching_rows["ContainerValue"].isna()]
-            
-            # Update the 'ContainerValue' column for empty container rows
-            df.loc[empty_container_rows.index, "ContainerValue"] = "ERROR: Mandatory Container Value"
+    if 'SKU' not in df.columns:
+        return df
 
-    return df
+    # Mandatory containers missing entirely from a SKU
+    skus = df[['SKU', 'PL']].dropna().drop_duplicates().astype(object)
+    if skus.empty:
+        return df
+    expected = skus.merge(required.astype(object), on='PL')
 
-def pl_check_granular(df):
-    
-    # Read JSON data
-    with open(SCS_PRODUCT_LINES_PATH, "r") as json_file:  # Server
-        # with open('app/core/data/product_lines.json', 'r') as json_file:  # Local
-        json_data = json.load(json_file)
+    present = df[['SKU', container_col]].dropna().drop_duplicates().astype(object)
+    present.columns = ['SKU', 'ContainerName']
+    expected = expected.merge(present, how='left', on=['SKU', 'ContainerName'], indicator=True)
+    missing = expected[expected['_merge'] == 'left_only']
+    if missing.empty:
+        return df
 
-    # Iterate through each product line in the JSON
-    for pl_info in json_data["ProductLine"]:
-        pl = pl_info["PL"]
-        container_names = pl_info["ContainerName"]
+    missing_containers = missing.groupby('SKU', sort=False)['ContainerName'].agg(
+        lambda names: 'Missing Mandatory Container: ' + ', '.join(dict.fromkeys(names)))
 
-        # Check if the PL column in the DataFrame matches the current PL from the JSON
-        matching_rows = df[df["PL"] == pl]
+    if 'Additional Information' not in df.columns:
+        df['Additional Information'] = ''
+    affected = df['SKU'].isin(missing_containers.index)
+    df.loc[affected, 'Additional Information'] = df.loc[affected, 'SKU'].map(missing_containers)
+
+    return df
+
+
+def pl_check(df):
+    """Flags missing or empty mandatory containers of a standard report."""
+    return _check_mandatory_containers(df, 'ContainerName', 'ContainerValue')
 
-        # Iterate through ContainerName columns
-        for container_name in container_names:
-            # Check if the 'ContainerValue' column is empty in the matching rows
-            empty_container_rows = matching_rows[matching_rows["ContainerValue"].isna()]
-            
-            # Update the 'ContainerValue' column for empty container rows
-            df.loc[empty_container_rows.index, "ContainerValue"] = "ERROR: Mandatory Container Value"
 
-    return df
\ No newline at end of file
+def pl_check_granular(df):
+    """Flags missing or empty mandatory containers of a granular report."""
+    return _check_mandatory_containers(df, 'Granular Container Tag', 'Granular Container Value')
@@ -2,86 +2,148 @@ import pandas as pd
 import json
 import os
 from config import *
-from io import BytesIO
 
 from app.routes.scs_tool.core.process_data import (
     process_data, 
     process_data_granular, 
     process_multiple_containers_parallel,
     process_multiple_containers_parallel_granular,
+    validate_containers,
     clear_json_cache
 )
-from app.routes.scs_tool.core.qa_av import av_check
-from app.routes.scs_tool.core.format_data import format_data, format_data_granular
+from app.routes.scs_tool.core.qa_av import av_check_workbook
+from app.routes.scs_tool.core.format_data import write_report
 from app.routes.scs_tool.core.product_line import pl_check
 from app.routes.scs_tool.core.check_missing_fields import check_missing_fields
 from app.routes.scs_tool.core.npu_check import npu_check
+from app.routes.scs_tool.core.workbook import ReportWorkbook
+from app.routes.scs_tool.core.sharded_validation import validate_containers_sharded
+from app.routes.scs_tool.core.component_groups import filter_component_groups
+from app.routes.scs_tool.core.stage_stats import StageStats, stage_stats, finish_stages, stats_sheets
 
+# Stages reported to the progress callback of each pipeline, in order
+REPORT_STAGES = ('parse', 'product lines', 'normalize', 'component groups', 'validation', 'npu check',
+                 'av check', 'write')
+GRANULAR_STAGES = ('parse', 'normalize', 'component groups', 'validation', 'missing fields', 'av check', 'write')
 
-def clean_report(file):
+
+def report_progress(progress, stages, stage, df=None):
+    """
+    Calls a progress(stage, step, total) callback, if any, with the position
+    of stage. A StageStats starts recording stage instead, with df as the
+    output of the previous stage and the input of this one.
+    """
+    if isinstance(progress, StageStats):
+        progress.start(stage, df)
+    elif progress is not None:
+        progress(stage, stages.index(stage), len(stages))
+
+
+def normalize_report(df):
+    """
+    Validates the required columns of a standard report, drops blank rows
+    and normalizes ContainerValue and PhwebDescription.
+    """
+    required_columns = ['ContainerValue', 'ContainerName', 'PhwebDescription', 'ComponentGroup']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {df.columns.tolist()}")
+
+    df = df[df['ContainerValue'] != '[BLANK]'].dropna(
+        subset=['ContainerValue', 'ContainerName'])
+    df.replace('\u00A0', ' ', regex=True, inplace=True)
+    df.loc[df['ContainerValue'].str.endswith(
+        ';', na=False), 'ContainerValue'] = df['ContainerValue'].str.slice(stop=-1)
+    df['PhwebDescription'] = df['PhwebDescription'].str.lstrip()
+    df['ContainerValue'] = df['ContainerValue'].astype(str)
+    return df
+
+
+def prepare_report(workbook):
+    """Reads the first sheet of a standard report and resets its result columns."""
+    df = workbook.sheet(0)
+
+    # Debug: Print actual columns in the Excel file
+    print(f"Columns found in Excel: {df.columns.tolist()}")
+
+    df = df.drop(SCS_COLS_TO_ADD, axis=1, errors='ignore')
+    df[SCS_COLS_TO_ADD] = ''
+    return df
+
+
+def process_report(df, progress=None):
+    """
+    Runs the product line, component group, container and NPU checks on a
+    frame returned by prepare_report.
+
+    Every check works on single rows or on the rows of one SKU, so any set
+    of whole SKUs can be processed on its own. The index of the kept rows
+    is preserved.
+    """
+    report_progress(progress, REPORT_STAGES, 'product lines', df)
+    pl_check(df)
+
+    # Basic data cleaning - with column validation
+    report_progress(progress, REPORT_STAGES, 'normalize', df)
+    df = normalize_report(df)
+
+    # --- Component Group Filtering ---
+    report_progress(progress, REPORT_STAGES, 'component groups', df)
+    df = filter_component_groups(df, SCS_COMPONENT_GROUPS_PATH)
+
+    # --- Main Data Processing (single pass over every container) ---
+    # Large reports are sharded across worker processes
+    report_progress(progress, REPORT_STAGES, 'validation', df)
+    df = validate_containers_sharded(df, SCS_JSON_PATH, container_col='ContainerName', value_col='ContainerValue')
+
+    # --- NPU Validation Step ---
+    report_progress(progress, REPORT_STAGES, 'npu check', df)
+    return npu_check(df, NPU_JSON_PATH)
+
+
+def save_report(workbook, df, output, progress=None, stages=REPORT_STAGES):
+    """
+    Writes the checked report, with the av_check 'duplicated' sheet when the
+    upload has an 'ms4' sheet, and the 'stats' sheet when enabled.
+    """
+    if workbook.has_sheet("ms4"):
+        report_progress(progress, stages, 'av check', df)
+        df_final = av_check_workbook(workbook)
+        report_progress(progress, stages, 'write', df)
+        sheets = [('qa', df), ('duplicated', df_final)]
+    else:
+        report_progress(progress, stages, 'write', df)
+        sheets = [('Sheet1', df)]
+    write_report(output, sheets + stats_sheets(progress))
+    finish_stages(progress, df)
+
+
+def clean_report(file, output=SCS_REGULAR_FILE_PATH, progress=None):
     """
     Processes a standard report using the new restructured JSON data.
-    Optimized with parallel processing.
+    Validated in a single vectorized pass. The upload is parsed once through a
+    ReportWorkbook and its sheets are shared with every stage.
+
+    Args:
+        file: Uploaded file
+        output: Path or binary file-like object the report is written to;
+            pass a per-request buffer so concurrent requests stay isolated
+        progress: Optional progress(stage, step, total) callback
     """
+    progress = stage_stats('regular', REPORT_STAGES, progress)
     try:
         # --- 1. Initial Setup & Cleaning ---
-        file_content = file.read()
-        file_buffer = BytesIO(file_content)
+        report_progress(progress, REPORT_STAGES, 'parse')
+        workbook = ReportWorkbook(file)
+        df = prepare_report(workbook)
 
-        df = pd.read_excel(file_buffer, engine='openpyxl')
-        
-        # Debug: Print actual columns in the Excel file
-        print(f"Columns found in Excel: {df.columns.tolist()}")
-        
-        df = df.drop(SCS_COLS_TO_ADD, axis=1, errors='ignore')
-        df[SCS_COLS_TO_ADD] = ''
-
-        pl_check(df)
-
-        # Basic data cleaning - with column validation
-        required_columns = ['ContainerValue', 'ContainerName', 'PhwebDescription', 'ComponentGroup']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {df.columns.tolist()}")
-        
-        df = df[df['ContainerValue'] != '[BLANK]'].dropna(
-            subset=['ContainerValue', 'ContainerName'])
-        df.replace('\u00A0', ' ', regex=True, inplace=True)
-        df.loc[df['ContainerValue'].str.endswith(
-            ';', na=False), 'ContainerValue'] = df['ContainerValue'].str.slice(stop=-1)
-        df['PhwebDescription'] = df['PhwebDescription'].str.lstrip()
-        df['ContainerValue'] = df['ContainerValue'].astype(str)
-
-        # --- 2. Component Group Filtering ---
-        with open(SCS_COMPONENT_GROUPS_PATH, 'r', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-        groups = json_data['Groups']
-
-        filtered_rows = df[df.apply(lambda row: any(row['ComponentGroup'] == group['ComponentGroup']
-                                    and row['ContainerName'] in group['ContainerName'] for group in groups), axis=1)]
-        df = filtered_rows.copy()
-
-        # --- 3. Main Data Processing Loop (PARALLEL) ---
-        # Use parallel processing instead of sequential loop
-        df = process_multiple_containers_parallel(df, SCS_JSON_PATH, container_col='ContainerName', max_workers=8)
-
-        # --- 4. NPU Validation Step ---
-        df = npu_check(df, NPU_JSON_PATH)
+        # --- 2-4. Product lines, component groups, containers and NPU ---
+        df = process_report(df, progress)
 
         # --- 5. Save Output ---
-        file_buffer.seek(0)
-        with pd.ExcelFile(file_buffer, engine='openpyxl') as excel_file:
-            if "ms4" in excel_file.sheet_names or "MS4" in excel_file.sheet_names:
-                file_buffer.seek(0)
-                df_final = av_check(file_buffer)
-                with pd.ExcelWriter(SCS_REGULAR_FILE_PATH) as writer:
-                    df.to_excel(writer, sheet_name='qa', index=False)
-                    df_final.to_excel(
-                        writer, sheet_name='duplicated', index=False)
-            else:
-                df.to_excel(SCS_REGULAR_FILE_PATH, index=False)
-
-        format_data()
+        # Header fill and error highlighting are applied while writing
+        save_report(workbook, df, output, progress)
+        workbook.close()
         
         # Clear cache after processing to free memory
         clear_json_cache()
@@ -90,21 +152,30 @@ def clean_report(file):
 
     except Exception as e:
         print(f"An error occurred in clean_report: {e}")
+        finish_stages(progress)
         clear_json_cache()
         return None
 
 
-async def clean_report_granular(file):
+async def clean_report_granular(file, output=SCS_GRANULAR_FILE_PATH, progress=None):
     """
     Processes a granular report asynchronously using the new restructured JSON data.
-    Optimized with parallel processing.
+    Validated in a single vectorized pass. The upload is parsed once through a
+    ReportWorkbook and its sheets are shared with every stage.
+
+    Args:
+        file: Uploaded file
+        output: Path or binary file-like object the report is written to;
+            pass a per-request buffer so concurrent requests stay isolated
+        progress: Optional progress(stage, step, total) callback
     """
+    progress = stage_stats('granular', GRANULAR_STAGES, progress)
     try:
         # --- 1. Initial Setup & Cleaning ---
-        file_content = file.read()
-        file_buffer = BytesIO(file_content)
+        report_progress(progress, GRANULAR_STAGES, 'parse')
+        workbook = ReportWorkbook(file)
 
-        df_g = pd.read_excel(file_buffer, engine='openpyxl')
+        df_g = workbook.sheet(0)
         
         # Debug: Print actual columns in the Excel file
         print(f"Columns found in Granular Excel: {df_g.columns.tolist()}")
@@ -118,6 +189,7 @@ async def clean_report_granular(file):
         if missing_columns:
             raise ValueError(f"Missing required columns: {missing_columns}. Available columns: {df_g.columns.tolist()}")
 
+        report_progress(progress, GRANULAR_STAGES, 'normalize', df_g)
         df_g = df_g.dropna(
             subset=['Granular Container Value', 'Granular Container Tag'])
         df_g.replace('\u00A0', ' ', regex=True, inplace=True)
@@ -127,39 +199,30 @@ async def clean_report_granular(file):
             str)
 
         # --- 2. Data Processing Loop (PARALLEL) ---
-        with open(SCS_GRANULAR_COMPONENT_GROUPS_PATH, 'r', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-        groups = json_data['Groups']
-
-        filtered_rows = df_g[df_g.apply(lambda row: any(row['SCSGroup'] == group['ComponentGroup']
-                                        and row['Granular Container Tag'] in group['ContainerName'] for group in groups), axis=1)]
-        df_g = filtered_rows.copy()
-
-        # Use parallel processing instead of sequential loop
-        df_g = process_multiple_containers_parallel_granular(
-            df_g, 
-            SCS_JSON_GRANULAR_PATH, 
-            container_col='Granular Container Tag', 
-            max_workers=8
+        report_progress(progress, GRANULAR_STAGES, 'component groups', df_g)
+        df_g = filter_component_groups(
+            df_g,
+            SCS_GRANULAR_COMPONENT_GROUPS_PATH,
+            group_col='SCSGroup',
+            container_col='Granular Container Tag'
+        )
+
+        # Validate every container in a single pass
+        report_progress(progress, GRANULAR_STAGES, 'validation', df_g)
+        df_g = validate_containers_sharded(
+            df_g,
+            SCS_JSON_GRANULAR_PATH,
+            container_col='Granular Container Tag',
+            value_col='Granular Container Value'
         )
 
         # --- 3. Final Checks and Save ---
+        report_progress(progress, GRANULAR_STAGES, 'missing fields', df_g)
         df_g = check_missing_fields(df_g, SCS_GRANULAR_COMPONENT_GROUPS_PATH)
 
-        file_buffer.seek(0)
-        with pd.ExcelFile(file_buffer, engine='openpyxl') as excel_file:
-            print(f"Available sheets: {excel_file.sheet_names}")
-            if "ms4" in excel_file.sheet_names:
-                file_buffer.seek(0)
-                df_final = av_check(file_buffer)
-                with pd.ExcelWriter(SCS_GRANULAR_FILE_PATH) as writer:
-                    df_g.to_excel(writer, sheet_name='qa', index=False)
-                    df_final.to_excel(
-                        writer, sheet_name='duplicated', index=False)
-            else:
-                df_g.to_excel(SCS_GRANULAR_FILE_PATH, index=False)
-
-        format_data_granular()
+        print(f"Available sheets: {workbook.sheet_names}")
+        save_report(workbook, df_g, output, progress, GRANULAR_STAGES)
+        workbook.close()
         
         # Clear cache after processing to free memory
         clear_json_cache()
@@ -168,5 +231,6 @@ async def clean_report_granular(file):
 
     except Exception as e:
         print(f"An error occurred in clean_report_granular: {e}")
+        finish_stages(progress)
         clear_json_cache()
         return None
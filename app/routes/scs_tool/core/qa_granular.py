@@ -1,54 +1,94 @@
 import json
 import os
 
+import numpy as np
 import pandas as pd
 
 from config import SCS_JSON_PATH, SCS_GRANULAR_FILE_PATH
+from app.routes.scs_tool.core.json_update import JOURNAL_SUFFIX, read_journal
 
-def clean_granular(file):
-    try:
-        
-        df = pd.read_excel(file.stream, engine='openpyxl') 
-        # Add a new column 'Comments' initially with 'ERROR'
-        df['Comments'] = 'ERROR'
+# Component -> ContainerValue index of a JSON folder: {json_dir: (signature, index)}
+_component_indexes = {}
+
+def _folder_signature(json_dir):
+    files = []
+    for entry in os.scandir(json_dir):
+        if entry.name.endswith(('.json', '.json' + JOURNAL_SUFFIX)) and entry.is_file():
+            stat = entry.stat()
+            files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(files))
 
-        # Path to the folder containing JSON files
-        json_folder_path = os.path.join(os.getcwd(), 'json')
+def load_component_index(json_dir=SCS_JSON_PATH):
+    """
+    Maps every Component of the container JSON files to its ContainerValue.
 
-        # Iterate over each row in the DataFrame
-        for index, row in df.iterrows():
-            component = row['Component']
-            container_value = row['Granular Container Value']
-            found = False  # Flag to track if Component is found
+    Files are read in directory order and only the list entries
+    ({'Component', 'ContainerValue'}) are indexed; when a component appears
+    several times the first entry wins, as with the former file-by-file scan.
+    Entries still in the journal of a file (see json_update) come after it.
+    The index is rebuilt only when a file of the folder or a journal changes.
+    """
+    signature = _folder_signature(json_dir)
+    cached = _component_indexes.get(json_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
 
-            # Check if container_value is "[BLANK]" and set 'Comments' to 'Verify'
-            if container_value == "[BLANK]":
-                df.at[index, 'Comments'] = 'Verify'
+    index = {}
+    for filename in os.listdir(json_dir):
+        if not filename.endswith('.json'):
+            continue
+        json_path = os.path.join(json_dir, filename)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # Iterate over all keys in the JSON
+        for value in list(data.values()) + [read_journal(json_path)]:
+            if not isinstance(value, list):
                 continue
+            for entry in value:
+                if isinstance(entry, dict) and 'Component' in entry:
+                    index.setdefault(entry['Component'], entry.get("ContainerValue", ""))
+
+    _component_indexes[json_dir] = (signature, index)
+    return index
+
+def clean_granular(file, output=SCS_GRANULAR_FILE_PATH):
+    """
+    Marks each row 'OK' when its Granular Container Value is contained in
+    the ContainerValue of its Component, 'Verify' when the value is
+    '[BLANK]' and 'ERROR' otherwise (including components not in any JSON).
+
+    Args:
+        file: Uploaded file
+        output: Path or binary file-like object the report is written to
+    """
+    try:
+
+        df = pd.read_excel(file.stream, engine='openpyxl')
+
+        # Component -> ContainerValue of every JSON file, built once
+        component_index = load_component_index(SCS_JSON_PATH)
+        expected = df['Component'].map(component_index)
+
+        # Substring check of each row against its own expected value, as
+        # one elementwise string search over the two aligned columns
+        values = df['Granular Container Value']
+        found = (expected.notna() & values.notna()).to_numpy()
+        contained = np.zeros(len(df), dtype=bool)
+        if found.any():
+            contained[found] = np.char.find(
+                expected[found].astype(str).to_numpy(dtype=str),
+                values[found].astype(str).to_numpy(dtype=str)
+            ) >= 0
+
+        # Add a new column 'Comments' initially with 'ERROR'
+        df['Comments'] = 'ERROR'
+        df.loc[contained, 'Comments'] = 'OK'
 
-            # Iterate over JSON files
-            for filename in os.listdir(SCS_JSON_PATH):
-                if filename.endswith('.json'):
-                    json_path = os.path.join(SCS_JSON_PATH, filename)
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        # Iterate over all keys in the JSON
-                        for key, value in data.items():
-                            if isinstance(value, list):
-                                for entry in value:
-                                    if 'Component' in entry and entry['Component'] == component:
-                                        # Check if Granular Container Value is contained in ContainerValue
-                                        if container_value in entry.get("ContainerValue", ""):
-                                            df.at[index, 'Comments'] = 'OK'
-                                        found = True  # Component found, stop searching
-                                        break
-                            if found:
-                                break
-                if found:
-                    break
+        # Check if container_value is "[BLANK]" and set 'Comments' to 'Verify'
+        df.loc[values == "[BLANK]", 'Comments'] = 'Verify'
 
         # Export DataFrame to Excel with the updated 'Comments' column
-        df.to_excel(SCS_GRANULAR_FILE_PATH, index=False)
+        df.to_excel(output, index=False)
 
     except Exception as e:
-        print(e)
\ No newline at end of file
+        print(e)
@@ -1,121 +1,113 @@
-from app.routes.scs_tool.core.process_data import process_data_av, process_data_granular
-from app.routes.scs_tool.core.format_data import format_data, format_data_granular
+from concurrent.futures import ThreadPoolExecutor
+
+from app.routes.scs_tool.core.format_data import write_report
 from app.routes.scs_tool.core.product_line import pl_check
-from app.routes.scs_tool.core.qa_av import av_check
+from app.routes.scs_tool.core.qa_av import av_check_workbook
+from app.routes.scs_tool.core.qa_data import normalize_report, report_progress
+from app.routes.scs_tool.core.workbook import ReportWorkbook
+from app.routes.scs_tool.core.component_groups import filter_component_groups
+from app.routes.scs_tool.core.sharded_validation import validate_containers_sharded
 from config import *
 
-import pandas as pd
-import json
-import os
-
-
-def omega_report(file):
-    
+# Stages reported to the progress callback, in order
+OMEGA_STAGES = ('parse', 'cleaning', 'validation', 'missing components', 'write')
+
+# Component groups left out of the missing components check
+OMEGA_MISSING_EXCLUDED_GROUPS = ['Operating System', 'Environment']
+OMEGA_MISSING_EXCLUDED_GROUPS_MS4 = ['Operating System', 'Environment', 'Power Supply', 'Security Software',
+                                     'Optional Port', 'Special Features']
+
+
+def prepare_sku_sheet(workbook):
+    """Reads and cleans the 'SKU Accuracy' sheet of an Omega report."""
+    df_s = workbook.sheet('SKU Accuracy').drop(SCS_COLS_TO_DROP, axis=1, errors='ignore')
+    df_s[SCS_COLS_TO_ADD] = ''
+
+    pl_check(df_s)
+    df_s = normalize_report(df_s)
+    df_s = df_s[df_s['ContainerName'] != '[BLANK]']
+    return filter_component_groups(df_s, SCS_COMPONENT_GROUPS_PATH)
+
+
+def prepare_granular_sheet(workbook):
+    """Reads and cleans the 'GranularContentReport' sheet of an Omega report."""
+    df_g = workbook.sheet('GranularContentReport').drop(SCS_COLS_TO_DROP_GRANULAR, axis=1, errors='ignore')
+    df_g[SCS_COLS_TO_ADD] = ''
+
+    df_g = df_g[(df_g['Granular Container Value'] != '[BLANK]') & (df_g['Granular Container Tag'] != '[BLANK]')]
+    df_g = df_g.dropna(subset=['Granular Container Value', 'Granular Container Tag'])
+    df_g.replace('\u00A0', ' ', regex=True, inplace=True)
+    df_g.loc[df_g['Granular Container Value'].str.endswith(
+        ';', na=False), 'Granular Container Value'] = df_g['Granular Container Value'].str.slice(stop=-1)
+    df_g['Granular Container Value'] = df_g['Granular Container Value'].astype(str)
+    return df_g
+
+
+def missing_components(df_s, df_g, excluded_groups):
+    """
+    Returns the SKU rows whose Component does not appear anywhere in the
+    granular report, leaving out excluded_groups, with one hash anti-join.
+    """
+    df_s_filtered = df_s[~df_s['ComponentGroup'].isin(excluded_groups)]
+    return df_s_filtered[~df_s_filtered['Component'].isin(df_g['Component'].unique())]
+
+
+def omega_report(file, output=SCS_REGULAR_FILE_PATH, progress=None):
+    """
+    Processes an Omega report: the 'SKU Accuracy' and 'GranularContentReport'
+    sheets are parsed once and validated side by side in worker threads
+    (each one sharded across processes when large), together with the
+    av_check of the 'ms4' sheet when present. The 'qa', 'granular',
+    'duplicated' and 'missing' sheets are written in a single pass.
+
+    Args:
+        file: Uploaded file
+        output: Path or binary file-like object the report is written to;
+            pass a per-request buffer so concurrent requests stay isolated
+        progress: Optional progress(stage, step, total) callback
+
+    Returns:
+        (df_s, df_g), or None if the report could not be processed
+    """
     try:
-        # Read excel file
-        df_s = pd.read_excel(file.stream, engine='openpyxl', sheet_name='SKU Accuracy')
-        df_g = pd.read_excel(file.stream, engine='openpyxl', sheet_name='GranularContentReport')
-
-        # Drop a list of columns
-        cols_to_drop_s = SCS_COLS_TO_DROP
-        cols_to_drop_g = SCS_COLS_TO_DROP_GRANULAR
-        
-        df_s = df_s.drop(cols_to_drop_s, axis=1)
-        df_g = df_g.drop(cols_to_drop_g, axis=1)
-
-        # Add a list of columns
-        df_s[SCS_COLS_TO_ADD] = ''
-        df_g[SCS_COLS_TO_ADD] = ''
-        
-        # Call the pl_check
-        pl_check(df_s)
-
-        # Filter out the rows where ContainerValue and ContainerName are '[BLANK]'
-        df_s = df_s[df_s['ContainerValue'] != '[BLANK]']
-        df_s = df_s[df_s['ContainerName'] != '[BLANK]']
-        
-        df_g = df_g[df_g['Granular Container Value'] != '[BLANK]']
-        df_g = df_g[df_g['Granular Container Tag'] != '[BLANK]']
-        
-        # Drop rows with NaN values
-        df_s = df_s.dropna(subset=['ContainerValue', 'ContainerName'])
-        df_g = df_g.dropna(subset=['Granular Container Value', 'Granular Container Tag'])
-
-        # Replace unicode character '\u00A0' with space
-        df_s.replace('\u00A0', ' ', regex=True, inplace=True)
-        df_g.replace('\u00A0', ' ', regex=True, inplace=True)
-        
-        # Removing ';' from end of ContainerValue
-        df_s.loc[df_s['ContainerValue'].str.endswith(';'), 'ContainerValue'] = df_s['ContainerValue'].str.slice(stop=-1)
-        df_g.loc[df_g['Granular Container Value'].str.endswith(';'), 'Granular Container Value'] = df_g['Granular Container Value'].str.slice(stop=-1)
-
-        # Stripping leading whitespaces from PhwebDescription
-        df_s['PhwebDescription'] = df_s['PhwebDescription'].str.lstrip()
-
-        # Converting ContainerValue column to string type
-        df_s['ContainerValue'] = df_s['ContainerValue'].astype(str)
-        df_g['Granular Container Value'] = df_g['Granular Container Value'].astype(str)
-        
-        # Load JSON data
-        with open(SCS_COMPONENT_GROUPS_PATH, 'r') as json_file:
-            json_data = json.load(json_file)
-        groups = json_data['Groups']
-        
-        # Filter rows based on criteria from JSON data
-        filtered_rows = df_s[df_s.apply(lambda row: any(row['ComponentGroup'] == group['ComponentGroup'] and row['ContainerName'] in group['ContainerName'] for group in groups), axis=1)]
-        rows_to_delete = df_s.index.difference(filtered_rows.index)
-        df_s = df_s.drop(rows_to_delete)
-
-        # Process JSON files
-        #for x in os.listdir(JSON_PATH_AV):
-        #    if x.endswith('.json'):
-        #        container_name = x.split('.')[0]
-        #        container_df_s = df_s[df_s['ContainerName'] == container_name]
-        #        process_data_av(os.path.join(JSON_PATH_AV, x), container_name, container_df_s, df_s)
-                       
-        # Process JSON files
-        #for x in os.listdir(JSON_GRANULAR_PATH):
-        #    if x.endswith('.json'):
-        #        container_name = x.split('.')[0]
-        #        container_df_g = df_g[df_g['Granular Container Tag'] == container_name]
-        #        process_data_granular(os.path.join(JSON_GRANULAR_PATH, x), container_name, container_df_g, df_g)
-
-        excel_file = pd.ExcelFile(file.stream, engine='openpyxl')
-
-        # Check if "ms4" sheet exists
-        if "ms4" in excel_file.sheet_names:
-            df_s_final = av_check(file)
-            
-            # Filter df_s to exclude rows where ComponentGroup is "Operating System"
-            df_s_filtered = df_s[~df_s['ComponentGroup'].isin(['Operating System', 'Environment','Power Supply','Security Software','Optional Port','Special Features'])]
-            
-            # Find missing components only in the filtered df_s
-            missing_components = set(df_s_filtered['Component']) - set(df_g['Component'])
-            df_m = df_s_filtered[df_s_filtered['Component'].isin(missing_components)]
-            
-            with pd.ExcelWriter(SCS_REGULAR_FILE_PATH) as writer:
-                df_s.to_excel(writer, sheet_name='qa', index=False)
-                df_g.to_excel(writer, sheet_name='granular', index=False)
-                df_s_final.to_excel(writer, sheet_name='duplicated', index=False)
-                df_m.to_excel(writer, sheet_name='missing', index=False)
-        else:
-            # Filter df_s to exclude rows where ComponentGroup is "Operating System"
-            df_s_filtered = df_s[~df_s['ComponentGroup'].isin(['Operating System', 'Environment'])]
-            
-            # Find missing components only in the filtered df_s
-            missing_components = set(df_s_filtered['Component']) - set(df_g['Component'])
-            df_m = df_s_filtered[df_s_filtered['Component'].isin(missing_components)]
-
-            with pd.ExcelWriter(SCS_REGULAR_FILE_PATH) as writer:
-                df_s.to_excel(writer, sheet_name='qa', index=False)
-                df_g.to_excel(writer, sheet_name='granular', index=False)
-                df_m.to_excel(writer, sheet_name='missing', index=False)
-
-                
-        #format_data()
-    except Exception as e:
-        print(e)
-
-    
+        report_progress(progress, OMEGA_STAGES, 'parse')
+        workbook = ReportWorkbook(file)
+        has_ms4 = workbook.has_sheet('ms4')
+
+        # Product lines, blank rows and component groups
+        report_progress(progress, OMEGA_STAGES, 'cleaning')
+        df_s = prepare_sku_sheet(workbook)
+        df_g = prepare_granular_sheet(workbook)
+
+        # Both sheets and the ms4 check are independent, run them side by side
+        report_progress(progress, OMEGA_STAGES, 'validation')
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            sku_future = executor.submit(
+                validate_containers_sharded, df_s, SCS_JSON_PATH_AV,
+                container_col='ContainerName', value_col='ContainerValue')
+            granular_future = executor.submit(
+                validate_containers_sharded, df_g, SCS_JSON_GRANULAR_PATH,
+                container_col='Granular Container Tag', value_col='Granular Container Value')
+            av_future = executor.submit(av_check_workbook, workbook) if has_ms4 else None
+
+            df_s = sku_future.result()
+            df_g = granular_future.result()
+            df_final = av_future.result() if av_future is not None else None
+
+        report_progress(progress, OMEGA_STAGES, 'missing components')
+        excluded_groups = OMEGA_MISSING_EXCLUDED_GROUPS_MS4 if has_ms4 else OMEGA_MISSING_EXCLUDED_GROUPS
+        df_m = missing_components(df_s, df_g, excluded_groups)
+
+        report_progress(progress, OMEGA_STAGES, 'write')
+        sheets = [('qa', df_s), ('granular', df_g)]
+        if df_final is not None:
+            sheets.append(('duplicated', df_final))
+        sheets.append(('missing', df_m))
+        write_report(output, sheets)
+        workbook.close()
+
+        return df_s, df_g
 
-    return
\ No newline at end of file
+    except Exception as e:
+        print(f"Error in omega_report: {e}")
+        return None
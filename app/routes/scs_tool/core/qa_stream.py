@@ -0,0 +1,248 @@
+import pandas as pd
+import openpyxl
+
+from config import (
+    SCS_COLS_TO_ADD,
+    SCS_JSON_PATH,
+    NPU_JSON_PATH,
+    SCS_COMPONENT_GROUPS_PATH,
+    SCS_REGULAR_FILE_PATH
+)
+from app.routes.scs_tool.core.process_data import validate_containers, clear_json_cache
+from app.routes.scs_tool.core.qa_data import normalize_report, report_progress
+from app.routes.scs_tool.core.component_groups import filter_component_groups
+from app.routes.scs_tool.core.qa_av import av_check
+from app.routes.scs_tool.core.product_line import pl_check
+from app.routes.scs_tool.core.npu_check import npu_check
+from app.routes.scs_tool.core.format_data import StyledReportWriter
+
+# Number of report rows held in memory at a time
+STREAM_CHUNK_ROWS = 50000
+
+# Uploads larger than this are processed with clean_report_streaming
+SCS_STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Stages reported to the progress callback of clean_report_streaming
+STREAMING_STAGES = ('parse', 'validation', 'av check', 'write')
+
+
+def _sheet_columns(header):
+    """Builds column names the same way pd.read_excel names the header row."""
+    return [f"Unnamed: {idx}" if value is None else value for idx, value in enumerate(header)]
+
+
+AV_COLUMNS = ['SKU', 'ComponentGroup', 'Component']
+
+
+def _report_row_filter(av_keys=None, keep_rows=True):
+    """
+    Returns a keep_row factory for iter_sheet_chunks that drops empty rows
+    while reading. Every other row is kept, '[BLANK]' values and rows
+    without a ContainerName included, since pl_check runs before
+    normalize_report drops them, as in process_report. With keep_rows off,
+    every row is dropped once collected.
+
+    If av_keys is a dict (used as an ordered set), the (SKU, ComponentGroup,
+    Component) triple of every row is added to it, for av_check. Like
+    pd.read_excel, empty rows are only counted when a non-empty row
+    follows them.
+    """
+    def factory(columns):
+        av_idx = None
+        if av_keys is not None and all(col in columns for col in AV_COLUMNS):
+            av_idx = [columns.index(col) for col in AV_COLUMNS]
+        pending_empty = False
+
+        def keep(row):
+            nonlocal pending_empty
+            if all(value is None for value in row):
+                pending_empty = True
+                return False
+            if av_idx is not None:
+                if pending_empty:
+                    av_keys[(None,) * len(AV_COLUMNS)] = None
+                av_keys[tuple(row[idx] for idx in av_idx)] = None
+            pending_empty = False
+            return keep_rows
+
+        return keep
+
+    return factory
+
+
+def _collect_av_keys(worksheet, av_keys):
+    """Adds the distinct (SKU, ComponentGroup, Component) rows of a worksheet to av_keys, chunk by chunk."""
+    for _ in iter_sheet_chunks(worksheet, keep_row=_report_row_filter(av_keys, keep_rows=False)):
+        pass
+
+
+def iter_sheet_chunks(worksheet, chunk_rows=STREAM_CHUNK_ROWS, keep_row=None):
+    """
+    Reads a read-only worksheet in DataFrames of at most chunk_rows rows.
+
+    Args:
+        worksheet: openpyxl worksheet opened with read_only=True
+        chunk_rows: Maximum number of rows per chunk
+        keep_row: Optional factory that receives the column names and returns
+            a predicate used to drop rows while reading
+
+    Yields:
+        pd.DataFrame
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+
+    columns = _sheet_columns(header)
+    width = len(columns)
+    keep = keep_row(columns) if keep_row else None
+
+    chunk = []
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if keep is not None and not keep(row):
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield pd.DataFrame(chunk, columns=columns)
+            chunk = []
+
+    if chunk:
+        yield pd.DataFrame(chunk, columns=columns)
+
+
+def read_sheet(worksheet):
+    """Reads a whole read-only worksheet into a single DataFrame."""
+    chunks = list(iter_sheet_chunks(worksheet))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _split_trailing_sku(df):
+    """
+    Splits off the rows of the last SKU in a chunk so that every SKU is
+    validated together (npu_check compares rows of the same SKU). Reports are
+    exported grouped by SKU, so the held back rows continue in the next chunk.
+    """
+    if 'SKU' not in df.columns or df.empty:
+        return df, None
+
+    last_sku = df['SKU'].iloc[-1]
+    trailing = (df['SKU'] == last_sku).to_numpy()
+    if trailing.all():
+        # A single SKU larger than the chunk budget is processed as it is
+        return df, None
+
+    first_trailing = len(df) - trailing[::-1].argmin()
+    return df.iloc[:first_trailing], df.iloc[first_trailing:]
+
+
+def _group_chunks_by_sku(chunks):
+    """Re-yields chunks so that the rows of a SKU are never split across two of them."""
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        chunk, carry = _split_trailing_sku(chunk)
+        yield chunk
+
+    if carry is not None:
+        yield carry
+
+
+def _process_chunk(df):
+    """Runs the clean_report stages on a single chunk."""
+    df = df.drop(SCS_COLS_TO_ADD, axis=1, errors='ignore')
+    df[SCS_COLS_TO_ADD] = ''
+
+    pl_check(df)
+    df = normalize_report(df)
+    df = filter_component_groups(df, SCS_COMPONENT_GROUPS_PATH)
+    df = validate_containers(df, SCS_JSON_PATH, container_col='ContainerName', value_col='ContainerValue')
+    return npu_check(df, NPU_JSON_PATH)
+
+
+def clean_report_streaming(file, output=SCS_REGULAR_FILE_PATH, chunk_rows=STREAM_CHUNK_ROWS, progress=None):
+    """
+    Processes a standard report in bounded memory.
+
+    The upload is opened with openpyxl in read-only mode and processed in
+    chunks of chunk_rows rows. Each chunk goes through the same cleaning,
+    component group filter, container validation and NPU check as
+    clean_report, and is appended to a streaming StyledReportWriter, so only
+    one chunk is held in memory at a time. For av_check only the distinct
+    (SKU, ComponentGroup, Component) rows of the 'SKU Accuracy' sheet are
+    kept, the sheet av_check_workbook reads.
+
+    Args:
+        file: Uploaded file (FileStorage) or any binary file-like object
+        output: Path or binary file-like object of the output workbook
+        chunk_rows: Row budget of each chunk
+        progress: Optional progress(stage, step, total) callback; the
+            'validation' stage is reported again after every chunk
+
+    Returns:
+        Number of rows written to the 'qa' sheet, or None on error.
+    """
+    source = getattr(file, 'stream', file)
+    workbook = None
+    try:
+        report_progress(progress, STREAMING_STAGES, 'parse')
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        ms4_sheet = next((name for name in workbook.sheetnames if name.lower() == 'ms4'), None)
+        sku_accuracy_sheet = next((name for name in workbook.sheetnames if name.lower() == 'sku accuracy'), None)
+        report_sheet = workbook.worksheets[0]
+
+        with StyledReportWriter(output) as writer:
+            qa_sheet = None
+            rows_written = 0
+            # The av_check triples are collected while streaming when the report is the 'SKU Accuracy' sheet
+            av_keys = {} if ms4_sheet and sku_accuracy_sheet else None
+            report_av_keys = av_keys if sku_accuracy_sheet == report_sheet.title else None
+
+            chunks = iter_sheet_chunks(report_sheet, chunk_rows=chunk_rows, keep_row=_report_row_filter(report_av_keys))
+            for chunk in _group_chunks_by_sku(chunks):
+                result = _process_chunk(chunk)
+                if qa_sheet is None:
+                    qa_sheet = writer.add_sheet('qa' if ms4_sheet else 'Sheet1', result.columns)
+                writer.append(qa_sheet, result.reindex(columns=qa_sheet['columns']))
+                rows_written += len(result)
+                report_progress(progress, STREAMING_STAGES, 'validation')
+
+            if ms4_sheet:
+                report_progress(progress, STREAMING_STAGES, 'av check')
+                if sku_accuracy_sheet is None:
+                    # Same message as av_check_workbook
+                    df_final = pd.DataFrame({"ERROR": [
+                        "Could not read the Excel file. Please ensure it contains 'SKU Accuracy' and 'ms4' sheets. "
+                        f"Original error: Worksheet named 'SKU Accuracy' not found. Available sheets: {workbook.sheetnames}"
+                    ]})
+                else:
+                    if report_av_keys is None:
+                        _collect_av_keys(workbook[sku_accuracy_sheet], av_keys)
+                    ms4_report = read_sheet(workbook[ms4_sheet])
+                    sku_accuracy = pd.DataFrame(list(av_keys), columns=AV_COLUMNS)
+                    try:
+                        df_final = av_check(sku_accuracy, ms4_report)
+                    except KeyError as e:
+                        df_final = pd.DataFrame({"ERROR": [f"Could not read the 'ms4' sheet. Original error: {e}"]})
+
+                writer.write_sheet('duplicated', df_final, styled=False)
+
+            report_progress(progress, STREAMING_STAGES, 'write')
+
+        # Clear cache after processing to free memory
+        clear_json_cache()
+
+        return rows_written
+
+    except Exception as e:
+        print(f"An error occurred in clean_report_streaming: {e}")
+        clear_json_cache()
+        return None
+
+    finally:
+        if workbook is not None:
+            workbook.close()
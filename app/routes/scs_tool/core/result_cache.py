@@ -0,0 +1,226 @@
+import hashlib
+import os
+import shutil
+import threading
+
+from config import (
+    SCS_APP_PATH,
+    SCS_JSON_PATH,
+    SCS_JSON_GRANULAR_PATH,
+    SCS_COMPONENT_GROUPS_PATH,
+    SCS_GRANULAR_COMPONENT_GROUPS_PATH,
+    SCS_PRODUCT_LINES_PATH,
+    NPU_JSON_PATH
+)
+from app.routes.scs_tool.core.rules_index import load_rules_index
+from app.routes.scs_tool.core import stage_stats
+from app.utils.metrics import inc
+
+# Finished reports, one '<key>.xlsx' file per distinct upload and rules version
+RESULT_CACHE_DIR = os.path.join(SCS_APP_PATH, 'cache', 'results')
+
+# Least recently used reports are evicted past this total size
+RESULT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Bump when a change to the pipeline changes its output for the same inputs
+RESULT_CACHE_FORMAT = 2
+
+# Rules each report mode depends on: (container JSON folder, other rule files)
+RESULT_CACHE_RULES = {
+    'regular': (SCS_JSON_PATH, (SCS_COMPONENT_GROUPS_PATH, SCS_PRODUCT_LINES_PATH, NPU_JSON_PATH)),
+    'granular': (SCS_JSON_GRANULAR_PATH, (SCS_GRANULAR_COMPONENT_GROUPS_PATH,)),
+}
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+# Hashes of the rule files: {path: ((mtime_ns, size), sha1)}
+_file_versions = {}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    inc('frame_result_cache_events_total', event=name)
+
+
+def _file_version(path):
+    """Returns the sha1 of a file, recomputed only when its mtime or size changes."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_versions.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _file_versions[path] = (signature, digest)
+    return digest
+
+
+def rules_version(mode):
+    """Returns a version string that changes whenever a rule used by mode changes."""
+    json_dir, rule_files = RESULT_CACHE_RULES[mode]
+    parts = [str(RESULT_CACHE_FORMAT), mode, load_rules_index(json_dir).version]
+    parts.extend(_file_version(path) for path in rule_files)
+    return hashlib.sha1(':'.join(parts).encode('utf-8')).hexdigest()
+
+
+def output_settings():
+    """
+    Returns the settings that change the output workbook for the same upload
+    and rules, read when the key is computed so runtime changes count.
+    """
+    stats_sheet = stage_stats.SCS_STAGE_STATS and stage_stats.SCS_STAGE_STATS_SHEET
+    return f"stats_sheet={int(bool(stats_sheet))}"
+
+
+def cache_key(file, mode, variant='full'):
+    """
+    Hashes an upload together with the rules version of a mode, the pipeline
+    variant and the output settings.
+
+    The upload is read in blocks and rewound, so it can still be processed.
+
+    Args:
+        file: Uploaded file (FileStorage) or any seekable binary file-like object
+        mode: 'regular' or 'granular'
+        variant: Pipeline that renders the report, e.g. 'full' or 'streaming';
+            variants whose workbooks differ must not share entries
+    """
+    source = getattr(file, 'stream', file)
+    source.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(HASH_BLOCK_BYTES), b''):
+        digest.update(block)
+    source.seek(0)
+    version = hashlib.sha1(f"{rules_version(mode)}:{variant}:{output_settings()}".encode('utf-8')).hexdigest()
+    return f"{digest.hexdigest()}_{version[:16]}"
+
+
+def _entry_path(key):
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.xlsx")
+
+
+def _copy(source, destination):
+    """Copies between paths and binary file-like objects."""
+    if isinstance(source, str) and isinstance(destination, str):
+        shutil.copyfile(source, destination)
+        return
+    source_file = open(source, 'rb') if isinstance(source, str) else source
+    destination_file = open(destination, 'wb') if isinstance(destination, str) else destination
+    try:
+        if source_file is source:
+            source_file.seek(0)
+        shutil.copyfileobj(source_file, destination_file)
+    finally:
+        if source_file is not source:
+            source_file.close()
+        if destination_file is not destination:
+            destination_file.close()
+
+
+def load_result(key, output):
+    """
+    Copies a cached report into output.
+
+    Returns:
+        True on a hit, False on a miss
+    """
+    path = _entry_path(key)
+    try:
+        # Mark the entry as recently used
+        os.utime(path)
+        _copy(path, output)
+    except OSError:
+        _count('misses')
+        return False
+    _count('hits')
+    return True
+
+
+def store_result(key, source):
+    """Adds a finished report (path or binary file-like object) to the cache."""
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        _copy(source, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache result {key}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+    _count('stores')
+    _evict()
+
+
+def _evict(max_bytes=None):
+    """Removes the least recently used reports until the cache fits in max_bytes."""
+    max_bytes = RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(RESULT_CACHE_DIR):
+            if entry.name.endswith('.xlsx') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            _count('evictions')
+
+
+def cached_report(file, mode, output, render, variant='full'):
+    """
+    Returns the cached report of an upload, or renders and caches it.
+
+    Args:
+        file: Uploaded file (FileStorage) or any seekable binary file-like object
+        mode: 'regular' or 'granular', selects the rules the key depends on
+        output: Path or binary file-like object the report is written to
+        render: render(file, output) runs the pipeline; it returns None on error
+        variant: Pipeline variant render runs, part of the key (see cache_key)
+
+    Returns:
+        True on a cache hit, otherwise the result of render
+    """
+    key = cache_key(file, mode, variant)
+    if load_result(key, output):
+        print(f"Result cache hit for {mode} report {key}")
+        return True
+
+    result = render(file, output)
+    if result is not None:
+        store_result(key, output)
+    return result
+
+
+def cache_stats():
+    """Returns the hit/miss counters of this process and the size of the cache."""
+    with _stats_lock:
+        stats = dict(_stats)
+    entries = 0
+    size = 0
+    if os.path.isdir(RESULT_CACHE_DIR):
+        for entry in os.scandir(RESULT_CACHE_DIR):
+            if entry.name.endswith('.xlsx') and entry.is_file():
+                entries += 1
+                size += entry.stat().st_size
+    stats['entries'] = entries
+    stats['bytes'] = size
+    return stats
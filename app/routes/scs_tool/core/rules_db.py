@@ -0,0 +1,425 @@
+"""
+Optional SQLite store for the SCS validation rules.
+
+The rules of a container JSON folder are imported into a single database
+with one row per rule, kept in file order, and (container, component) and
+(container, value) indexes, so a lookup or an edit is an index probe
+instead of a file parse and rewrite. The database can be exported back to
+the JSON layout.
+
+To validate from the database, pass its path wherever a JSON folder is
+expected (load_rules_index, validate_containers, validate_containers_sharded,
+or SCS_JSON_PATH / SCS_JSON_GRANULAR_PATH in config).
+
+Usage:
+    python -m app.routes.scs_tool.core.rules_db import <json_dir> <db_path>
+    python -m app.routes.scs_tool.core.rules_db export <db_path> <json_dir>
+"""
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import uuid
+
+from app.routes.scs_tool.core.json_update import read_journal
+from app.routes.scs_tool.core.rules_index import RulesIndex, _compile_with_journal
+
+RULES_DB_FORMAT = 2
+
+# Layouts of a container JSON file
+LAYOUT_VALUES = 'values'    # {container: {value: [components]}}
+LAYOUT_ENTRIES = 'entries'  # {container: [{key_field: component, 'ContainerValue': value}]}
+LAYOUT_INVALID = 'invalid'  # File that could not be read or parsed
+
+# Rules are kept in file order, duplicates included. Values, and the whole
+# entry of the 'entries' layout, are stored as JSON text so that nulls,
+# numbers and extra fields survive a round trip. An empty value of the
+# 'values' layout is stored with a NULL component.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS containers (
+    container TEXT PRIMARY KEY,
+    layout TEXT NOT NULL,
+    key_field TEXT
+);
+CREATE TABLE IF NOT EXISTS rules (
+    container TEXT NOT NULL REFERENCES containers(container) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    component TEXT,
+    value TEXT NOT NULL,
+    entry TEXT,
+    PRIMARY KEY (container, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rules_by_component ON rules (container, component);
+CREATE INDEX IF NOT EXISTS rules_by_value ON rules (container, value);
+CREATE TRIGGER IF NOT EXISTS rules_insert AFTER INSERT ON rules BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision';
+END;
+CREATE TRIGGER IF NOT EXISTS rules_update AFTER UPDATE ON rules BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision';
+END;
+CREATE TRIGGER IF NOT EXISTS rules_delete AFTER DELETE ON rules BEGIN
+    UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision';
+END;
+"""
+
+# Rules indexes built from databases: {db_path: (version, RulesIndex)}
+_db_indexes = {}
+_db_indexes_lock = threading.Lock()
+
+
+def connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute('PRAGMA foreign_keys = ON')
+    return connection
+
+
+def connect_read_only(db_path):
+    """
+    Opens an existing rules database for reading, without creating it or its
+    schema, so that reads take no write lock and work on read-only files.
+    Raises ValueError if the database is missing or of another format.
+    """
+    if not os.path.isfile(db_path):
+        raise ValueError(f"Rules database {db_path} does not exist; import it first")
+    connection = sqlite3.connect(f"{pathlib.Path(db_path).absolute().as_uri()}?mode=ro", uri=True, timeout=30)
+    try:
+        db_format = _db_format(connection)
+        if db_format is None:
+            raise ValueError(f"Rules database {db_path} is empty; import it first")
+        if db_format != RULES_DB_FORMAT:
+            raise ValueError(f"Rules database has format {db_format}, expected {RULES_DB_FORMAT}; re-import it")
+    except Exception:
+        connection.close()
+        raise
+    return connection
+
+
+def _db_format(connection):
+    """Returns the format of a database, None when it is empty and 0 when it has tables but no format."""
+    tables = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not tables:
+        return None
+    row = connection.execute("SELECT value FROM meta WHERE key = 'format'").fetchone() if 'meta' in tables else None
+    return int(row[0]) if row else 0
+
+
+def _init_db(connection, reset=False):
+    """
+    Creates the schema of an empty database. A database of an older format
+    is only rebuilt when reset is set (a full import); otherwise it is
+    rejected, since its rules cannot be read with the current schema.
+    """
+    db_format = _db_format(connection)
+    if db_format is not None and db_format != RULES_DB_FORMAT:
+        if not reset:
+            raise ValueError(f"Rules database has format {db_format}, expected {RULES_DB_FORMAT}; re-import it")
+        connection.executescript('DROP TABLE IF EXISTS rules; DROP TABLE IF EXISTS containers; DROP TABLE IF EXISTS meta;')
+
+    connection.executescript(_SCHEMA)
+    connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('format', ?)", (str(RULES_DB_FORMAT),))
+    connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', ?)", (uuid.uuid4().hex,))
+    connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', '0')")
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def db_version(connection):
+    """Changes with every import and every edit of the rules."""
+    meta = dict(connection.execute("SELECT key, value FROM meta WHERE key IN ('generation', 'revision')"))
+    return hashlib.sha1(f"{meta['generation']}:{meta['revision']}".encode('utf-8')).hexdigest()
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+def _read_source(json_path, container):
+    """
+    Reads a container JSON file with the entries of its journal not
+    compacted yet appended (see json_update), or None if it is not valid JSON.
+    """
+    json_data = _read_json(json_path)
+    journal = read_journal(json_path)
+    if journal and isinstance(json_data, dict):
+        json_data.setdefault(container, [])
+        if isinstance(json_data[container], list):
+            json_data[container].extend(journal)
+    return json_data
+
+
+def _read_container(json_path, container):
+    """
+    Reads a container JSON file as (layout, key_field, [(component, value, entry)])
+    in file order, duplicates included. entry is the original dict of the
+    'entries' layout, and None for the 'values' layout.
+    """
+    json_data = _read_source(json_path, container)
+    if json_data is None:
+        return LAYOUT_INVALID, None, []
+
+    container_data = json_data.get(container, {}) if isinstance(json_data, dict) else {}
+    if isinstance(container_data, list):
+        entries = [entry for entry in container_data if isinstance(entry, dict)]
+        key_field = next((field for field in ('Component', 'PhwebDescription') if any(field in entry for entry in entries)),
+                         'Component')
+        return LAYOUT_ENTRIES, key_field, [
+            (entry.get(key_field), entry.get('ContainerValue', ''), entry) for entry in entries
+        ]
+
+    rules = []
+    for value, components in container_data.items():
+        if not components:
+            rules.append((None, value, None))
+        rules.extend((component, value, None) for component in components)
+    return LAYOUT_VALUES, None, rules
+
+
+def import_json_folder(json_dir, db_path):
+    """
+    Imports every '<container>.json' file of a folder into a rules database,
+    replacing its previous content in a single transaction.
+
+    Every rule is kept in file order, including components listed more than
+    once; the compiled rules index still lets the last occurrence win.
+
+    Returns:
+        Number of rules imported
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            _init_db(connection, reset=True)
+            connection.execute('DELETE FROM containers')
+            connection.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (uuid.uuid4().hex,))
+
+            total = 0
+            for filename in sorted(os.listdir(json_dir)):
+                if not filename.endswith('.json'):
+                    continue
+                container = os.path.splitext(filename)[0]
+                layout, key_field, rules = _read_container(os.path.join(json_dir, filename), container)
+                connection.execute('INSERT INTO containers (container, layout, key_field) VALUES (?, ?, ?)',
+                                   (container, layout, key_field))
+                connection.executemany(
+                    'INSERT INTO rules (container, position, component, value, entry) VALUES (?, ?, ?, ?, ?)',
+                    ((container, position, component, _encode(value), None if entry is None else _encode(entry))
+                     for position, (component, value, entry) in enumerate(rules))
+                )
+                total += len(rules)
+    finally:
+        connection.close()
+    return total
+
+
+def export_json_folder(db_path, json_dir):
+    """
+    Writes every container of a rules database back to '<container>.json'
+    files in their original layout. Files are replaced atomically.
+
+    Returns:
+        Number of files written
+    """
+    connection = connect_read_only(db_path)
+    os.makedirs(json_dir, exist_ok=True)
+    written = 0
+    try:
+        containers = connection.execute(
+            'SELECT container, layout, key_field FROM containers WHERE layout != ? ORDER BY container', (LAYOUT_INVALID,)
+        ).fetchall()
+        for container, layout, key_field in containers:
+            rows = connection.execute(
+                'SELECT component, value, entry FROM rules WHERE container = ? ORDER BY position', (container,))
+            if layout == LAYOUT_ENTRIES:
+                data = [json.loads(entry) for _, _, entry in rows]
+            else:
+                data = {}
+                for component, value, _ in rows:
+                    components = data.setdefault(json.loads(value), [])
+                    if component is not None:
+                        components.append(component)
+
+            path = os.path.join(json_dir, f"{container}.json")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({container: data}, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            written += 1
+    finally:
+        connection.close()
+    return written
+
+
+def lookup(db_path, container, component):
+    """Returns the correct value of a component in a container (its last rule wins), or None."""
+    connection = connect_read_only(db_path)
+    try:
+        row = connection.execute(
+            'SELECT value FROM rules WHERE container = ? AND component = ? ORDER BY position DESC LIMIT 1',
+            (container, component)).fetchone()
+    finally:
+        connection.close()
+    return json.loads(row[0]) if row else None
+
+
+def components_with_value(db_path, container, value):
+    """Returns the components of a container whose correct value is value."""
+    connection = connect_read_only(db_path)
+    try:
+        rows = connection.execute(
+            'SELECT component FROM rules WHERE container = ? AND value = ? AND component IS NOT NULL '
+            'ORDER BY position', (container, _encode(value)))
+        return [component for component, in rows]
+    finally:
+        connection.close()
+
+
+def set_rules(db_path, container, rules, layout=LAYOUT_VALUES, key_field=None):
+    """
+    Adds or updates (component, value) rules of a container in one transaction.
+    Every existing rule of a component is updated; unknown components are
+    appended. The container is created if it does not exist yet.
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            _init_db(connection)
+            connection.execute('INSERT OR IGNORE INTO containers (container, layout, key_field) VALUES (?, ?, ?)',
+                               (container, layout, key_field))
+            layout, key_field = connection.execute(
+                'SELECT layout, key_field FROM containers WHERE container = ?', (container,)).fetchone()
+            next_position = connection.execute(
+                'SELECT COALESCE(MAX(position) + 1, 0) FROM rules WHERE container = ?', (container,)).fetchone()[0]
+
+            for component, value in rules:
+                existing = connection.execute(
+                    'SELECT position, entry FROM rules WHERE container = ? AND component = ?',
+                    (container, component)).fetchall()
+                if not existing:
+                    entry = None
+                    if layout == LAYOUT_ENTRIES:
+                        entry = _encode({key_field or 'Component': component, 'ContainerValue': value})
+                    connection.execute(
+                        'INSERT INTO rules (container, position, component, value, entry) VALUES (?, ?, ?, ?, ?)',
+                        (container, next_position, component, _encode(value), entry))
+                    next_position += 1
+                    continue
+
+                for position, entry in existing:
+                    if entry is not None:
+                        entry = json.loads(entry)
+                        entry['ContainerValue'] = value
+                        entry = _encode(entry)
+                    connection.execute('UPDATE rules SET value = ?, entry = ? WHERE container = ? AND position = ?',
+                                       (_encode(value), entry, container, position))
+    finally:
+        connection.close()
+
+
+def delete_rules(db_path, container, components):
+    """Removes every rule of the given components from a container in one transaction."""
+    connection = connect(db_path)
+    try:
+        with connection:
+            connection.executemany('DELETE FROM rules WHERE container = ? AND component = ?',
+                                   ((container, component) for component in components))
+    finally:
+        connection.close()
+
+
+def load_db_rules_index(db_path):
+    """
+    Returns a RulesIndex with the rules of a database, so the validation
+    engines can read from it like from a JSON folder. The index is rebuilt
+    only when the database changed.
+    """
+    with _db_indexes_lock:
+        connection = connect_read_only(db_path)
+        try:
+            version = db_version(connection)
+            cached = _db_indexes.get(db_path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            index = RulesIndex(db_path)
+            index.version = version
+            for container, layout in connection.execute('SELECT container, layout FROM containers'):
+                index.rules[container] = None if layout == LAYOUT_INVALID else {}
+            # Entry containers keyed by anything but 'Component' compile to no rules, as in rules_index
+            for container, component, value in connection.execute(
+                    "SELECT rules.container, component, value FROM rules JOIN containers USING (container) "
+                    "WHERE component IS NOT NULL AND (key_field IS NULL OR key_field = 'Component') "
+                    "ORDER BY rules.container, position"):
+                index.rules[container][component] = json.loads(value)
+        finally:
+            connection.close()
+
+        _db_indexes[db_path] = (version, index)
+        return index
+
+
+def verify_round_trip(json_dir, db_path):
+    """
+    Checks that a database holds exactly the rules of a JSON folder: every
+    container is exported to a temporary folder and compared, in order, with
+    its source file, and the compiled rules must match as well.
+
+    Returns:
+        List of containers whose rules differ
+    """
+    index = load_db_rules_index(db_path)
+    export_dir = tempfile.mkdtemp(prefix='rules_db_verify_')
+    try:
+        export_json_folder(db_path, export_dir)
+        differing = []
+        for filename in sorted(os.listdir(json_dir)):
+            if not filename.endswith('.json'):
+                continue
+            container = os.path.splitext(filename)[0]
+            source = _read_source(os.path.join(json_dir, filename), container)
+            # Invalid files are not exported
+            if source is not None and _encode(source) != _encode(_read_json(os.path.join(export_dir, filename))):
+                differing.append(container)
+            elif _compile_with_journal(os.path.join(json_dir, filename), container) != index.rules.get(container):
+                differing.append(container)
+        return differing
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def main(argv):
+    if len(argv) != 3 or argv[0] not in ('import', 'export'):
+        print(__doc__)
+        return 1
+
+    if argv[0] == 'import':
+        json_dir, db_path = argv[1:]
+        total = import_json_folder(json_dir, db_path)
+        differing = verify_round_trip(json_dir, db_path)
+        if differing:
+            print(f"Imported {total} rules from {json_dir} into {db_path}, but these containers do not "
+                  f"round-trip to their JSON file: {', '.join(differing)}")
+            return 1
+        print(f"Imported {total} rules from {json_dir} into {db_path}")
+    else:
+        db_path, json_dir = argv[1:]
+        print(f"Exported {export_json_folder(db_path, json_dir)} containers from {db_path} to {json_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
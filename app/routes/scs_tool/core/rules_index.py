@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from config import SCS_APP_PATH
+from app.routes.scs_tool.core.json_update import JOURNAL_SUFFIX, read_journal
+
+# Folder where compiled indexes are persisted between processes
+RULES_INDEX_DIR = os.path.join(SCS_APP_PATH, 'cache')
+
+# Bump when the pickled layout of RulesIndex changes
+RULES_INDEX_FORMAT = 2
+
+# Compiled indexes already loaded by this process: {json_dir: RulesIndex}
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class RulesIndex:
+    """
+    Compiled validation rules of a container JSON folder.
+
+    Every '<container>.json' file is compiled to a {component: value} map, so
+    the correct value of a component is a lookup by (container, component).
+    The index keeps a manifest of the source files (mtime, size and hash) so
+    it can be refreshed file by file when the folder changes. Entries still
+    in the journal of a file (see json_update) are part of its rules.
+    """
+
+    def __init__(self, json_dir):
+        self.json_dir = json_dir
+        self.format = RULES_INDEX_FORMAT
+        # {filename: ((mtime_ns, journal mtime_ns), (size, journal size), sha1)}
+        self.manifest = {}
+        # {container: {component: value}}; None when the file is not valid JSON
+        self.rules = {}
+        self.version = ''
+
+    @property
+    def containers(self):
+        """Containers whose JSON file was compiled successfully."""
+        return {container for container, rules in self.rules.items() if rules is not None}
+
+    @property
+    def invalid(self):
+        """Containers whose JSON file could not be read or parsed."""
+        return {container for container, rules in self.rules.items() if rules is None}
+
+    def container_rules(self, container):
+        """Returns the {component: value} map of a container, or None if its JSON is missing or invalid."""
+        return self.rules.get(container)
+
+    def lookup(self, container, component):
+        """Returns the correct value of a component in a container, or None."""
+        rules = self.rules.get(container)
+        if not rules:
+            return None
+        return rules.get(component)
+
+
+def _compile_container(json_path, container):
+    """
+    Compiles one container JSON file into a {component: value} map.
+
+    Supports the {container: {value: [components]}} layout of the SCS
+    database and the {container: [{'Component', 'ContainerValue'}]} entry
+    layout. If a component is listed under several values, the last one wins.
+    """
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            json_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+    container_data = json_data.get(container, {}) if isinstance(json_data, dict) else {}
+
+    if isinstance(container_data, list):
+        return {
+            entry['Component']: entry.get('ContainerValue', '')
+            for entry in container_data
+            if isinstance(entry, dict) and 'Component' in entry
+        }
+
+    return {
+        component: value
+        for value, components in container_data.items()
+        for component in components
+    }
+
+
+def _compile_with_journal(json_path, container):
+    """Compiles a container JSON file and the entries of its journal not compacted yet."""
+    rules = _compile_container(json_path, container)
+    if rules is not None:
+        for entry in read_journal(json_path):
+            if isinstance(entry, dict) and 'Component' in entry:
+                rules[entry['Component']] = entry.get('ContainerValue', '')
+    return rules
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    for part in (path, path + JOURNAL_SUFFIX):
+        try:
+            with open(part, 'rb') as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            pass
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _scan(json_dir):
+    """
+    Returns {filename: ((mtime_ns, journal mtime_ns), (size, journal size))}
+    for every JSON file in a folder; a missing journal counts as 0.
+    """
+    files = {}
+    journals = {}
+    for entry in os.scandir(json_dir):
+        if entry.name.endswith('.json') and entry.is_file():
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        elif entry.name.endswith('.json' + JOURNAL_SUFFIX) and entry.is_file():
+            stat = entry.stat()
+            journals[entry.name[:-len(JOURNAL_SUFFIX)]] = (stat.st_mtime_ns, stat.st_size)
+    return {
+        filename: ((mtime_ns, journals.get(filename, (0, 0))[0]), (size, journals.get(filename, (0, 0))[1]))
+        for filename, (mtime_ns, size) in files.items()
+    }
+
+
+def _index_path(json_dir):
+    digest = hashlib.sha1(os.path.abspath(json_dir).encode('utf-8')).hexdigest()[:12]
+    name = os.path.basename(os.path.normpath(json_dir))
+    return os.path.join(RULES_INDEX_DIR, f"rules_{name}_{digest}.pickle")
+
+
+def _read_index(json_dir):
+    try:
+        with open(_index_path(json_dir), 'rb') as f:
+            index = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+    if not isinstance(index, RulesIndex) or getattr(index, 'format', None) != RULES_INDEX_FORMAT:
+        return None
+    return index
+
+
+def _write_index(index):
+    """Persists the index atomically so concurrent workers never read a partial file."""
+    path = _index_path(index.json_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(RULES_INDEX_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not persist rules index for {index.json_dir}: {e}")
+
+
+def _refresh(index, files):
+    """
+    Brings an index up to date with the files currently in its folder.
+    Files whose mtime or size changed are re-hashed and only recompiled when
+    their content actually changed. The new maps are swapped in at the end,
+    so callers already holding the index keep a consistent view.
+
+    Returns:
+        True if the index was modified
+    """
+    manifest = {}
+    rules = {}
+    changed = set(index.manifest) != set(files)
+
+    for filename, (mtime_ns, size) in files.items():
+        container = os.path.splitext(filename)[0]
+        known = index.manifest.get(filename)
+        if known is not None and known[:2] == (mtime_ns, size):
+            manifest[filename] = known
+            rules[container] = index.rules.get(container)
+            continue
+
+        json_path = os.path.join(index.json_dir, filename)
+        digest = _file_hash(json_path)
+        manifest[filename] = (mtime_ns, size, digest)
+        changed = True
+
+        if known is not None and known[2] == digest:
+            # Touched but identical: only the manifest needs updating
+            rules[container] = index.rules.get(container)
+        else:
+            rules[container] = _compile_with_journal(json_path, container)
+
+    if changed:
+        content = ''.join(f"{name}:{manifest[name][2]};" for name in sorted(manifest))
+        index.version = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        index.manifest = manifest
+        index.rules = rules
+
+    return changed
+
+
+def load_rules_index(json_dir):
+    """
+    Returns the compiled rules index of a container JSON folder.
+
+    The index is kept in memory for the life of the process and persisted
+    as a pickle under RULES_INDEX_DIR. Each call only stats the source
+    files; files are re-hashed and recompiled only when they changed.
+
+    Args:
+        json_dir: Folder with one '<container>.json' file per container, or
+            a rules database created by rules_db.import_json_folder
+
+    Returns:
+        RulesIndex
+    """
+    if os.path.isfile(json_dir):
+        from app.routes.scs_tool.core.rules_db import load_db_rules_index
+        return load_db_rules_index(json_dir)
+
+    with _indexes_lock:
+        files = _scan(json_dir)
+
+        index = _indexes.get(json_dir)
+        if index is None:
+            index = _read_index(json_dir) or RulesIndex(json_dir)
+
+        if _refresh(index, files):
+            _write_index(index)
+        _indexes[json_dir] = index
+
+        return index
+
+
+def clear_rules_index():
+    """Drops the in-memory indexes. Persisted indexes are kept."""
+    with _indexes_lock:
+        _indexes.clear()
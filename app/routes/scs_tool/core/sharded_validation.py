@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.routes.scs_tool.core.process_data import validate_containers
+from app.routes.scs_tool.core.rules_index import load_rules_index
+
+# Number of worker processes used for large reports
+SCS_VALIDATION_WORKERS = os.cpu_count() or 1
+
+# Reports with fewer rows than this are validated in the calling process
+SCS_SHARDING_MIN_ROWS = 200000
+
+# Workers are started from a clean server process, never forked from the
+# threaded web process, so they cannot inherit a lock held by another thread
+SCS_VALIDATION_START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# Shared arrays are memory-mapped files, in RAM when /dev/shm is available
+SHARED_MEMORY_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# Result status of each row, written by the workers
+STATUS_UNTOUCHED = 0
+STATUS_OK = 1
+STATUS_WRONG_VALUE = 2
+STATUS_NOT_FOUND = 3
+STATUS_INVALID_JSON = 4
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+# Uniques loaded by a worker process for the current run: (path, uniques)
+_worker_uniques = (None, None)
+
+
+def _get_executor(workers):
+    """Returns a process pool kept alive between requests."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(SCS_VALIDATION_START_METHOD))
+            _executor_workers = workers
+        return _executor
+
+
+def _shared_array(folder, name, dtype, length, mode='r+'):
+    return np.memmap(os.path.join(folder, f"{name}.bin"), dtype=dtype, mode=mode, shape=(max(length, 1),))
+
+
+def _load_uniques(path):
+    global _worker_uniques
+    if _worker_uniques[0] != path:
+        with open(path, 'rb') as f:
+            _worker_uniques = (path, pickle.load(f))
+    return _worker_uniques[1]
+
+
+def _validate_shard(folder, length, json_dir, start, stop):
+    """
+    Validates the rows [start, stop) of a shared report.
+
+    The key columns are read from the shared arrays as factorized codes.
+    The status of every row and, for wrong values, a code into the returned
+    list of correct values are written back to the shared result arrays.
+
+    Returns:
+        List of correct values referenced by the shard's correct codes
+    """
+    uniques = _load_uniques(os.path.join(folder, 'uniques.pickle'))
+    container_uniques, component_uniques, value_uniques = uniques
+    # Loaded by path from the index persisted by the parent
+    rules_index = load_rules_index(json_dir)
+
+    containers = np.asarray(_shared_array(folder, 'container', np.int32, length, 'r')[start:stop], dtype=np.int64)
+    components = np.asarray(_shared_array(folder, 'component', np.int32, length, 'r')[start:stop], dtype=np.int64)
+    values = np.asarray(_shared_array(folder, 'value', np.int32, length, 'r')[start:stop], dtype=np.int64)
+
+    # Resolve each distinct (container, component) pair of the shard once
+    width = len(component_uniques) + 1
+    pairs, inverse = np.unique(containers * width + components + 1, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    value_codes = {value: code for code, value in enumerate(value_uniques)}
+    pair_status = np.full(len(pairs), STATUS_UNTOUCHED, dtype=np.int8)
+    pair_expected = np.full(len(pairs), -2, dtype=np.int64)
+    correct_values = []
+
+    for position, pair in enumerate(pairs):
+        container_code, component_code = divmod(int(pair), width)
+        if container_code < 0:
+            continue
+
+        rules = rules_index.container_rules(container_uniques[container_code])
+        if rules is None:
+            if container_uniques[container_code] in rules_index.rules:
+                pair_status[position] = STATUS_INVALID_JSON
+            continue
+
+        component = component_uniques[component_code - 1] if component_code > 0 else None
+        correct_value = rules.get(component) if component is not None else None
+        if correct_value is None:
+            pair_status[position] = STATUS_NOT_FOUND
+            continue
+
+        pair_status[position] = STATUS_WRONG_VALUE
+        pair_expected[position] = len(correct_values)
+        correct_values.append(correct_value)
+
+    # Per-row status: a known pair is OK when the row value is the correct one
+    expected_value_codes = np.array([value_codes.get(value, -2) for value in correct_values], dtype=np.int64)
+    row_status = pair_status[inverse]
+    row_correct = pair_expected[inverse]
+    wrong = row_status == STATUS_WRONG_VALUE
+    if wrong.any():
+        matches = np.zeros(len(row_status), dtype=bool)
+        matches[wrong] = values[wrong] == expected_value_codes[row_correct[wrong]]
+        row_status[matches] = STATUS_OK
+
+    status_out = _shared_array(folder, 'status', np.int8, length)
+    correct_out = _shared_array(folder, 'correct', np.int32, length)
+    status_out[start:stop] = row_status
+    correct_out[start:stop] = np.where(row_status == STATUS_WRONG_VALUE, row_correct, -1)
+    status_out.flush()
+    correct_out.flush()
+
+    return correct_values
+
+
+def validate_containers_sharded(df, json_dir, container_col='ContainerName', value_col='ContainerValue',
+                                workers=None, min_rows=SCS_SHARDING_MIN_ROWS):
+    """
+    Validates a report across several processes.
+
+    The container, component and value columns are factorized into integer
+    codes and placed in memory-mapped files shared with the workers, so no
+    DataFrame is pickled. The rows are split into contiguous shards (each row
+    is validated on its own, so any split gives the same result); every
+    worker validates its shard against the rules index and writes compact
+    status codes back, which are stitched into 'Accuracy' and
+    'Correct Value' in the original row order.
+
+    Below min_rows rows, or with a single worker, validate_containers runs
+    in the calling process.
+
+    Args:
+        df: DataFrame to process
+        json_dir: Directory containing JSON files
+        container_col: Column name for container identification
+        value_col: Column holding the value to validate
+        workers: Number of processes, defaults to SCS_VALIDATION_WORKERS
+        min_rows: Row threshold below which the report is not sharded
+
+    Returns:
+        Updated DataFrame
+    """
+    workers = workers or SCS_VALIDATION_WORKERS
+    length = len(df)
+    if workers <= 1 or length < min_rows:
+        return validate_containers(df, json_dir, container_col=container_col, value_col=value_col)
+
+    # Compile and persist the index before the workers load it
+    load_rules_index(json_dir)
+
+    container_codes, container_uniques = pd.factorize(df[container_col])
+    component_codes, component_uniques = pd.factorize(df['Component'])
+    value_codes, value_uniques = pd.factorize(df[value_col])
+    container_uniques = list(container_uniques)
+
+    folder = tempfile.mkdtemp(prefix='scs_shards_', dir=SHARED_MEMORY_DIR)
+    try:
+        for name, codes in (('container', container_codes), ('component', component_codes), ('value', value_codes)):
+            shared = _shared_array(folder, name, np.int32, length, 'w+')
+            shared[:length] = codes
+            shared.flush()
+            del shared
+        _shared_array(folder, 'status', np.int8, length, 'w+').flush()
+        _shared_array(folder, 'correct', np.int32, length, 'w+').flush()
+
+        with open(os.path.join(folder, 'uniques.pickle'), 'wb') as f:
+            pickle.dump((container_uniques, list(component_uniques), list(value_uniques)),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        bounds = np.linspace(0, length, workers + 1, dtype=np.int64)
+        executor = _get_executor(workers)
+        futures = [
+            (start, stop, executor.submit(_validate_shard, folder, length, json_dir, int(start), int(stop)))
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+
+        correct_values = np.empty(length, dtype=object)
+        for start, stop, future in futures:
+            shard_values = np.array(future.result() + [None], dtype=object)
+            shard_codes = np.asarray(_shared_array(folder, 'correct', np.int32, length, 'r')[start:stop])
+            correct_values[start:stop] = shard_values[shard_codes]
+
+        status = np.array(_shared_array(folder, 'status', np.int8, length, 'r')[:length])
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    # Build the labels once per container and take them by code
+    names = np.array([str(name) for name in container_uniques] + [''], dtype=object)
+    ok_labels = np.array(['SCS ' + name + ' OK' for name in names], dtype=object)[container_codes]
+    error_labels = np.array(['ERROR: ' + name for name in names], dtype=object)[container_codes]
+    invalid_labels = np.array(['ERROR: ' + name + ' JSON not found or invalid' for name in names],
+                              dtype=object)[container_codes]
+
+    accuracy = np.select(
+        [status == STATUS_OK, (status == STATUS_WRONG_VALUE) | (status == STATUS_NOT_FOUND), status == STATUS_INVALID_JSON],
+        [ok_labels, error_labels, invalid_labels],
+        default=None
+    )
+    correct_value_col = np.select(
+        [status == STATUS_OK, status == STATUS_WRONG_VALUE, status == STATUS_NOT_FOUND],
+        ['', correct_values, 'Component Not Found in JSON'],
+        default=None
+    )
+
+    touched = status != STATUS_UNTOUCHED
+    validated = touched & (status != STATUS_INVALID_JSON)
+    df.loc[df.index[touched], 'Accuracy'] = accuracy[touched]
+    df.loc[df.index[validated], 'Correct Value'] = correct_value_col[validated]
+
+    return df
@@ -0,0 +1,125 @@
+import json
+import time
+import uuid
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is then not recorded
+    resource = None
+
+# Record the wall time, CPU time, rows and memory of every pipeline stage
+SCS_STAGE_STATS = True
+
+# Append the recorded stages as a 'stats' sheet to the output workbook
+SCS_STAGE_STATS_SHEET = False
+
+# Count the Python strings of object columns in the frame memory. Exact,
+# but as slow as a pass over the data, so off by default
+SCS_STAGE_STATS_DEEP_MEMORY = False
+
+
+def _frame_memory_mb(df):
+    if df is None:
+        return None
+    return round(df.memory_usage(index=True, deep=SCS_STAGE_STATS_DEEP_MEMORY).sum() / (1024 * 1024), 2)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageStats:
+    """
+    Records the stages of one pipeline run.
+
+    Pass it as the progress argument of a pipeline: report_progress starts
+    a new stage at every stage boundary, closing the previous one, and
+    forwards the stage to the wrapped progress callback. The frame handed
+    over at a boundary is both the output of the previous stage and the
+    input of the next one. Each finished stage is printed as one JSON line.
+    """
+
+    def __init__(self, pipeline, stages, progress=None):
+        self.pipeline = pipeline
+        self.stages = stages
+        self.progress = progress
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._current = None
+
+    def start(self, stage, df=None):
+        """Closes the running stage, if any, and starts stage."""
+        self._close(df)
+        self._current = {
+            'stage': stage,
+            'rows_in': len(df) if df is not None else None,
+            'memory_in_mb': _frame_memory_mb(df),
+            'wall': time.perf_counter(),
+            'cpu': time.process_time()
+        }
+        if self.progress is not None:
+            self.progress(stage, self.stages.index(stage), len(self.stages))
+
+    def finish(self, df=None):
+        """Closes the last stage."""
+        self._close(df)
+
+    def _close(self, df):
+        current = self._current
+        if current is None:
+            return
+        self._current = None
+
+        record = {
+            'event': 'scs_stage',
+            'pipeline': self.pipeline,
+            'run': self.run_id,
+            'stage': current['stage'],
+            'wall_seconds': round(time.perf_counter() - current['wall'], 4),
+            'cpu_seconds': round(time.process_time() - current['cpu'], 4),
+            'rows_in': current['rows_in'],
+            'rows_out': len(df) if df is not None else None,
+            'memory_in_mb': current['memory_in_mb'],
+            'memory_out_mb': _frame_memory_mb(df),
+            'peak_rss_mb': _peak_rss_mb()
+        }
+        self.records.append(record)
+        print(json.dumps(record))
+
+    def frame(self):
+        """Returns the finished stages as a DataFrame, for the 'stats' sheet."""
+        columns = ['stage', 'wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out',
+                   'memory_in_mb', 'memory_out_mb', 'peak_rss_mb']
+        return pd.DataFrame(self.records, columns=columns)
+
+
+def stage_stats(pipeline, stages, progress=None):
+    """
+    Returns a StageStats wrapping progress when SCS_STAGE_STATS is on, or
+    progress unchanged otherwise. A StageStats passed as progress is used as
+    it is, so the caller can read its records (e.g. the benchmarks).
+    """
+    if not SCS_STAGE_STATS or isinstance(progress, StageStats):
+        return progress
+    return StageStats(pipeline, stages, progress)
+
+
+def finish_stages(progress, df=None):
+    """Closes the last stage of a StageStats; does nothing for other progress callbacks."""
+    if isinstance(progress, StageStats):
+        progress.finish(df)
+
+
+def stats_sheets(progress):
+    """
+    Returns [('stats', frame)] for the output workbook when progress is a
+    StageStats and SCS_STAGE_STATS_SHEET is on, else an empty list. The
+    sheet holds the stages finished before the write.
+    """
+    if SCS_STAGE_STATS_SHEET and isinstance(progress, StageStats):
+        return [('stats', progress.frame())]
+    return []
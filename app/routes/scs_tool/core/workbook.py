@@ -0,0 +1,76 @@
+import pandas as pd
+from io import BytesIO
+
+
+class ReportWorkbook:
+    """
+    Wraps an uploaded Excel report so that every sheet is parsed at most once.
+
+    The upload is read into memory a single time and opened with one
+    pd.ExcelFile. Parsed sheets are kept in a cache keyed by sheet name, so
+    clean_report, av_check and the writers all share the same DataFrames.
+
+    Cached frames are shared between callers: copy before mutating in place.
+    """
+
+    def __init__(self, file):
+        # Flask's FileStorage, a path or any binary file-like object
+        if isinstance(file, (bytes, bytearray)):
+            content = bytes(file)
+        elif hasattr(file, 'read'):
+            content = file.read()
+        else:
+            with open(file, 'rb') as f:
+                content = f.read()
+
+        self.buffer = BytesIO(content)
+        self.excel_file = pd.ExcelFile(self.buffer, engine='openpyxl')
+        self.sheet_names = self.excel_file.sheet_names
+        self.parse_count = 0
+        self._sheets = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the underlying workbook and the parsed sheets."""
+        self.excel_file.close()
+        self._sheets.clear()
+
+    def find_sheet(self, name):
+        """
+        Returns the actual name of a sheet, matched case-insensitively,
+        or None if the workbook has no such sheet.
+        """
+        for sheet_name in self.sheet_names:
+            if sheet_name.lower() == name.lower():
+                return sheet_name
+        return None
+
+    def has_sheet(self, name):
+        return self.find_sheet(name) is not None
+
+    def sheet(self, name=0):
+        """
+        Returns the DataFrame for a sheet, parsing it on first access only.
+
+        Args:
+            name: Sheet name (matched case-insensitively) or sheet position.
+
+        Returns:
+            pd.DataFrame
+        """
+        if isinstance(name, int):
+            sheet_name = self.sheet_names[name]
+        else:
+            sheet_name = self.find_sheet(name)
+            if sheet_name is None:
+                raise ValueError(f"Worksheet named '{name}' not found. Available sheets: {self.sheet_names}")
+
+        if sheet_name not in self._sheets:
+            self._sheets[sheet_name] = self.excel_file.parse(sheet_name)
+            self.parse_count += 1
+        return self._sheets[sheet_name]
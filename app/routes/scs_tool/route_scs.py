@@ -1,8 +1,16 @@
-from flask import Flask, request, render_template, send_from_directory
+from flask import Flask, request, render_template, send_file
 from app.routes.scs_tool.core.qa_data import clean_report, clean_report_granular
+from app.routes.scs_tool.core.qa_stream import clean_report_streaming, SCS_STREAMING_THRESHOLD_BYTES
+from app.routes.scs_tool.core.incremental import clean_report_incremental
+from app.routes.scs_tool.core.qa_omega import omega_report
+from app.routes.scs_tool.core.result_cache import cached_report
+from app.utils.job_queue import register_job_kind
+from app.utils.metrics import observe_rows
+from io import BytesIO
 import asyncio
+import os
+import tempfile
 import config
-from config import SCS_APP_PATH, SCS_GRANULAR_FILE_PATH
 
 # Create a Flask app
 app = Flask(__name__)
@@ -11,18 +19,103 @@ app.use_static_for = 'static'
 # Load config
 app.config.from_object(config)
 
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Streamed reports spill to a private temp file past this size
+SCS_SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
 # Validate extension
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['VALID_FILE_EXTENSIONS']
 
+def send_report(output, filename):
+    """Rewinds a per-request report buffer and sends it as a download."""
+    output.seek(0)
+    return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, attachment_filename=filename)
+
+def render_regular_report(file, output, streaming=False, progress=None, identity=None):
+    """
+    Renders a regular report, or copies it from the result cache if this upload was already processed.
+    With an identity, only the SKUs changed since the last run of that report are checked again.
+    """
+    def render(file, output):
+        if streaming:
+            # Very large exports are processed in bounded memory
+            return clean_report_streaming(file, output, progress=progress)
+        if identity:
+            return clean_report_incremental(file, identity, output, progress=progress)
+        return clean_report(file, output, progress=progress)
+    # The incremental run writes the same workbook as clean_report and shares its entries
+    result = cached_report(file, 'regular', output, render, variant='streaming' if streaming else 'full')
+    observe_rows('regular', result)
+    return result
+
+def render_granular_report(file, output, progress=None):
+    """Renders a granular report, or copies it from the result cache if this upload was already processed."""
+    def render(file, output):
+        return asyncio.run(clean_report_granular(file, output, progress=progress))
+    result = cached_report(file, 'granular', output, render)
+    observe_rows('granular', result)
+    return result
+
+def render_omega_report(file, output, progress=None):
+    """Renders an Omega report."""
+    result = omega_report(file, output, progress=progress)
+    observe_rows('omega', result)
+    return result
+
+def run_scs_regular_job(upload_path, filename, result_path, progress):
+    """Background job version of the regular SCS report."""
+    with open(upload_path, 'rb') as file:
+        streaming = os.path.getsize(upload_path) > SCS_STREAMING_THRESHOLD_BYTES
+        result = render_regular_report(file, result_path, streaming, progress=progress)
+    if result is None:
+        raise RuntimeError('The report could not be processed')
+
+def run_scs_incremental_job(upload_path, filename, result_path, progress):
+    """Background job version of the regular SCS report, checked against the last run of the same file name."""
+    with open(upload_path, 'rb') as file:
+        result = render_regular_report(file, result_path, progress=progress, identity=filename)
+    if result is None:
+        raise RuntimeError('The report could not be processed')
+
+def run_scs_granular_job(upload_path, filename, result_path, progress):
+    """Background job version of the granular SCS report."""
+    with open(upload_path, 'rb') as file:
+        result = render_granular_report(file, result_path, progress=progress)
+    if result is None:
+        raise RuntimeError('The report could not be processed')
+
+def run_scs_omega_job(upload_path, filename, result_path, progress):
+    """Background job version of the Omega report."""
+    with open(upload_path, 'rb') as file:
+        result = render_omega_report(file, result_path, progress=progress)
+    if result is None:
+        raise RuntimeError('The report could not be processed')
+
+register_job_kind('scs_regular', run_scs_regular_job, 'scs_qa.xlsx', XLSX_MIMETYPE)
+register_job_kind('scs_incremental', run_scs_incremental_job, 'scs_qa.xlsx', XLSX_MIMETYPE)
+register_job_kind('scs_granular', run_scs_granular_job, 'granular_qa.xlsx', XLSX_MIMETYPE)
+register_job_kind('scs_omega', run_scs_omega_job, 'omega_qa.xlsx', XLSX_MIMETYPE)
+
 def scs_tool():
     if request.method == 'POST':
         if 'scs_regular' in request.files:
             file = request.files['scs_regular']
             try:
                 if allowed_file(file.filename):
-                    clean_report(file)
-                    return send_from_directory(SCS_APP_PATH, filename='scs_qa.xlsx', as_attachment=True)
+                    streaming = bool(request.content_length and request.content_length > SCS_STREAMING_THRESHOLD_BYTES)
+                    if streaming:
+                        output = tempfile.SpooledTemporaryFile(max_size=SCS_SPOOL_MAX_BYTES)
+                    else:
+                        output = BytesIO()
+                    # Resubmissions of the same file can reuse its last run
+                    identity = file.filename if request.form.get('incremental') else None
+                    result = render_regular_report(file, output, streaming, identity=identity)
+                    if result is None:
+                        output.close()
+                        return render_template('error.html', error_message='The report could not be processed'), 500
+                    return send_report(output, 'scs_qa.xlsx')
                 else:
                     return render_template('error.html', error_message='Invalid file extension'), 400
             except Exception as e:
@@ -32,12 +125,27 @@ def scs_tool():
             file = request.files['scs_granular']
             try:
                 if allowed_file(file.filename):
+                    output = BytesIO()
+                    result = render_granular_report(file, output)
+                    if result is None:
+                        return render_template('error.html', error_message='The report could not be processed'), 500
 
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(clean_report_granular(file))
+                    return send_report(output, 'granular_qa.xlsx')
+                else:
+                    return render_template('error.html', error_message='Invalid file extension'), 400
+            except Exception as e:
+                return render_template('error.html', error_message=str(e)), 500
+
+        elif 'scs_omega' in request.files:
+            file = request.files['scs_omega']
+            try:
+                if allowed_file(file.filename):
+                    output = BytesIO()
+                    result = render_omega_report(file, output)
+                    if result is None:
+                        return render_template('error.html', error_message='The report could not be processed'), 500
 
-                    return send_from_directory(SCS_APP_PATH, filename='granular_qa.xlsx', as_attachment=True)
+                    return send_report(output, 'omega_qa.xlsx')
                 else:
                     return render_template('error.html', error_message='Invalid file extension'), 400
             except Exception as e:
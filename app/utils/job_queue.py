@@ -0,0 +1,331 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job uploads, results and the job database live here
+JOBS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jobs')
+JOBS_DB_PATH = os.path.join(JOBS_DIR, 'jobs.sqlite3')
+
+# Jobs run at the same time in each process
+JOB_WORKERS = 2
+
+# Submissions are refused while this many jobs are waiting or running
+JOB_QUEUE_LIMIT = 50
+
+# Finished jobs and their files are removed after this many seconds
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Registered job kinds: {kind: (function, result_filename, mimetype)}
+_job_kinds = {}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Identifies this process next to its pid, which the OS may hand out again
+_process_token = uuid.uuid4().hex
+
+
+class JobQueueFull(Exception):
+    """Raised by submit_job when JOB_QUEUE_LIMIT jobs are already pending."""
+
+
+def register_job_kind(kind, function, result_filename, mimetype):
+    """
+    Registers a kind of job.
+
+    Args:
+        kind: Name used to submit the job
+        function: function(upload_path, filename, result_path, progress) that
+            writes the result file; progress(stage, step, total) reports the
+            current stage. Raising marks the job as failed.
+        result_filename: File name of the downloaded result
+        mimetype: Mimetype of the downloaded result
+    """
+    _job_kinds[kind] = (function, result_filename, mimetype)
+
+
+def job_kinds():
+    return set(_job_kinds)
+
+
+def _connect():
+    connection = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _init_store():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    with _connect() as connection:
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' filename TEXT,'
+            ' status TEXT NOT NULL,'
+            ' stage TEXT,'
+            ' step INTEGER DEFAULT 0,'
+            ' total INTEGER DEFAULT 0,'
+            ' stages TEXT DEFAULT \'[]\','
+            ' error TEXT,'
+            ' pid INTEGER,'
+            ' token TEXT,'
+            ' pid_started INTEGER,'
+            ' created REAL,'
+            ' started REAL,'
+            ' finished REAL)'
+        )
+        # Stores created before the owner of a job was identified by more than its pid
+        columns = {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}
+        for column, kind in (('token', 'TEXT'), ('pid_started', 'INTEGER')):
+            if column not in columns:
+                connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def _upload_path(job_id):
+    return os.path.join(_job_dir(job_id), 'upload')
+
+
+def _result_path(job_id):
+    return os.path.join(_job_dir(job_id), 'result')
+
+
+def _update(job_id, **fields):
+    columns = ', '.join(f"{name} = ?" for name in fields)
+    with _connect() as connection:
+        connection.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _pid_started(pid):
+    """Returns the start time of a process in clock ticks since boot, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name in parentheses may contain spaces, the start time is the 20th field after it
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def _owner():
+    """Returns the columns identifying this process as the owner of a job."""
+    pid = os.getpid()
+    return {'pid': pid, 'token': _process_token, 'pid_started': _pid_started(pid)}
+
+
+def _orphaned(job):
+    """
+    Returns True if the process that owns a queued or running job is gone,
+    including when its pid now belongs to another process.
+    """
+    if job['pid'] == os.getpid():
+        return job['token'] != _process_token
+    if not _pid_alive(job['pid']):
+        return True
+    return job['pid_started'] is not None and _pid_started(job['pid']) != job['pid_started']
+
+
+def _get_executor():
+    """
+    Returns the worker pool of this process. On first use the job store is
+    created and jobs left behind by a process that no longer exists are
+    picked up again.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        # A pool inherited through fork has no threads in the child
+        if _executor is None or _executor_pid != os.getpid():
+            _init_store()
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+            _executor_pid = os.getpid()
+            _recover_jobs(_executor)
+        return _executor
+
+
+def recover_jobs():
+    """
+    Creates the job store and requeues the jobs of processes that no longer
+    exist. Called when the app starts, so jobs interrupted by a restart run
+    again without waiting for the next submission.
+    """
+    executor = _get_executor()
+    _recover_jobs(executor)
+
+
+def _recover_jobs(executor):
+    """Requeues the queued or running jobs whose owning process died."""
+    with _connect() as connection:
+        rows = connection.execute(
+            'SELECT id, kind, pid, token, pid_started FROM jobs WHERE status IN (?, ?)',
+            (STATUS_QUEUED, STATUS_RUNNING)
+        ).fetchall()
+
+    for row in rows:
+        if row['kind'] not in _job_kinds or not _orphaned(row):
+            continue
+        # Claim the job atomically, another process may be recovering it too
+        owner = _owner()
+        with _connect() as connection:
+            claimed = connection.execute(
+                'UPDATE jobs SET status = ?, pid = ?, token = ?, pid_started = ?, stage = NULL, step = 0'
+                ' WHERE id = ? AND pid IS ? AND token IS ?',
+                (STATUS_QUEUED, owner['pid'], owner['token'], owner['pid_started'],
+                 row['id'], row['pid'], row['token'])
+            ).rowcount
+        if claimed:
+            print(f"Requeued job {row['id']} left by process {row['pid']}")
+            executor.submit(_run_job, row['id'])
+
+
+def _purge_expired():
+    """Removes finished jobs older than JOB_RETENTION_SECONDS."""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _connect() as connection:
+        expired = [row['id'] for row in connection.execute(
+            'SELECT id FROM jobs WHERE status IN (?, ?) AND finished < ?', (STATUS_DONE, STATUS_FAILED, cutoff))]
+        connection.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+    for job_id in expired:
+        shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+
+
+def submit_job(kind, file):
+    """
+    Stores an upload and queues a job for it.
+
+    Args:
+        kind: Registered job kind
+        file: Uploaded file (FileStorage)
+
+    Returns:
+        Job id
+    """
+    if kind not in _job_kinds:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    executor = _get_executor()
+    # Jobs of a worker that died since this process started are picked up here
+    _recover_jobs(executor)
+    _purge_expired()
+
+    with _connect() as connection:
+        pending = connection.execute(
+            'SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (STATUS_QUEUED, STATUS_RUNNING)).fetchone()[0]
+    if pending >= JOB_QUEUE_LIMIT:
+        raise JobQueueFull(f"{pending} jobs are already waiting, try again later")
+
+    job_id = uuid.uuid4().hex
+    os.makedirs(_job_dir(job_id))
+    file.save(_upload_path(job_id))
+
+    owner = _owner()
+    with _connect() as connection:
+        connection.execute(
+            'INSERT INTO jobs (id, kind, filename, status, pid, token, pid_started, created)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, file.filename, STATUS_QUEUED, owner['pid'], owner['token'], owner['pid_started'],
+             time.time())
+        )
+
+    executor.submit(_run_job, job_id)
+    return job_id
+
+
+def _run_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return
+    function = _job_kinds[job['kind']][0]
+    stages = []
+
+    def progress(stage, step, total):
+        if not stages or stages[-1]['stage'] != stage:
+            stages.append({'stage': stage, 'started': time.time()})
+        _update(job_id, stage=stage, step=step, total=total, stages=json.dumps(stages))
+
+    _update(job_id, status=STATUS_RUNNING, started=time.time(), **_owner())
+    try:
+        function(_upload_path(job_id), job['filename'], _result_path(job_id), progress)
+    except Exception as e:
+        print(f"Job {job_id} ({job['kind']}) failed: {e}")
+        _update(job_id, status=STATUS_FAILED, error=str(e), finished=time.time())
+        return
+
+    _update(job_id, status=STATUS_DONE, step=len(stages), total=len(stages), finished=time.time())
+
+    # The upload is not needed once the result exists
+    try:
+        os.remove(_upload_path(job_id))
+    except OSError:
+        pass
+
+
+def get_job(job_id):
+    """
+    Returns the state of a job as a dict, or None if it does not exist.
+
+    'stage' is the stage currently running and 'progress' the fraction of
+    the job's stages already completed.
+    """
+    _get_executor()
+    with _connect() as connection:
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    job = dict(row)
+    job['stages'] = json.loads(job['stages'] or '[]')
+    job['progress'] = 1.0 if job['status'] == STATUS_DONE else (
+        job['step'] / job['total'] if job['total'] else 0.0)
+    return job
+
+
+def queue_depth():
+    """Returns the number of queued and running jobs of every process, by status."""
+    _init_store()
+    depth = {STATUS_QUEUED: 0, STATUS_RUNNING: 0}
+    with _connect() as connection:
+        for row in connection.execute(
+                'SELECT status, COUNT(*) AS jobs FROM jobs WHERE status IN (?, ?) GROUP BY status',
+                (STATUS_QUEUED, STATUS_RUNNING)):
+            depth[row['status']] = row['jobs']
+    return depth
+
+
+def job_result(job_id):
+    """
+    Returns (path, download filename, mimetype) of the result of a finished
+    job, or None if the job does not exist or has not finished successfully.
+    """
+    job = get_job(job_id)
+    if job is None or job['status'] != STATUS_DONE or job['kind'] not in _job_kinds:
+        return None
+    _, result_filename, mimetype = _job_kinds[job['kind']]
+    return _result_path(job_id), result_filename, mimetype
@@ -0,0 +1,365 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, folding then relies on the thread lock
+    fcntl = None
+
+# Each worker process writes its metrics to '<pid>.json' in this folder
+METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'metrics')
+
+# Metrics of exited processes are folded into this file
+METRICS_ARCHIVE = 'archive.json'
+
+# A process writes its metrics at most this often, and on every scrape
+METRICS_FLUSH_SECONDS = 5
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Metric definitions: {name: (type, help, histogram buckets)}
+METRICS = {
+    'frame_requests_total': (COUNTER, 'Requests by route, mode and status code.', None),
+    'frame_request_errors_total': (COUNTER, 'Requests that failed with a 5xx status or an exception.', None),
+    'frame_request_duration_seconds': (HISTOGRAM, 'Request latency by route and mode.',
+                                       (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)),
+    'frame_upload_bytes': (HISTOGRAM, 'Size of the uploaded files by route and mode.',
+                           (10e3, 100e3, 1e6, 5e6, 10e6, 50e6, 100e6, 500e6)),
+    'frame_report_rows': (HISTOGRAM, 'Rows of the processed reports by mode.',
+                          (100, 1e3, 10e3, 50e3, 100e3, 500e3, 1e6)),
+    'frame_requests_in_flight': (GAUGE, 'Requests being processed by route.', None),
+    'frame_result_cache_events_total': (COUNTER, 'SCS result cache hits, misses, stores and evictions.', None),
+    'frame_url_up': (GAUGE, '1 if a monitored URL answered 200 on its last check, else 0.', None),
+}
+
+# Gauges set to a state rather than counted up and down; processes are merged with max instead of sum
+STATE_GAUGES = {'frame_url_up'}
+
+# Upload fields of each route, mapped to the mode they select
+REQUEST_MODES = {
+    'scs_regular': 'regular',
+    'scs_granular': 'granular',
+    'scs_omega': 'omega',
+    'qs_file': 'qs',
+}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_counters = {}    # {(name, labels): value}
+_gauges = {}      # {(name, labels): value}
+_histograms = {}  # {(name, labels): [bucket counts..., sum, count]}
+_process_token = uuid.uuid4().hex
+_last_flush = 0.0
+_flushed_once = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Adds value to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _maybe_flush()
+
+
+def add_gauge(name, value, **labels):
+    """Adds value (possibly negative) to a gauge of this process."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + value
+    _maybe_flush()
+
+
+def set_gauge(name, value, **labels):
+    """Sets a gauge of this process."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    """Records value in a histogram."""
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    position = bisect.bisect_left(buckets, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(buckets) + 2)
+        if position < len(buckets):
+            histogram[position] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+    _maybe_flush()
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'token': _process_token,
+            'counters': [[name, labels, value] for (name, labels), value in _counters.items()],
+            'gauges': [[name, labels, value] for (name, labels), value in _gauges.items()],
+            'histograms': [[name, labels, list(values)] for (name, labels), values in _histograms.items()],
+        }
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _FoldLock:
+    """Exclusive lock on the metrics folder, held while files are folded into the archive."""
+
+    _thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self.handle = open(os.path.join(METRICS_DIR, '.lock'), 'a')
+            if fcntl is not None:
+                fcntl.flock(self.handle, fcntl.LOCK_EX)
+        except Exception:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        finally:
+            self._thread_lock.release()
+
+
+def _merge(totals, snapshot, with_gauges):
+    """Adds the counters, histograms and, optionally, gauges of a snapshot to totals."""
+    for name, labels, value in snapshot.get('counters', []):
+        key = (name, tuple(map(tuple, labels)))
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+    for name, labels, values in snapshot.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        current = totals['histograms'].get(key)
+        totals['histograms'][key] = values[:] if current is None else [a + b for a, b in zip(current, values)]
+    if with_gauges:
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(map(tuple, labels)))
+            if key not in totals['gauges']:
+                totals['gauges'][key] = value
+            elif name in STATE_GAUGES:
+                totals['gauges'][key] = max(totals['gauges'][key], value)
+            else:
+                totals['gauges'][key] += value
+
+
+def _fold(paths):
+    """Moves the counters and histograms of exited processes into the archive. Call with the fold lock held."""
+    archive_path = os.path.join(METRICS_DIR, METRICS_ARCHIVE)
+    totals = {'counters': {}, 'gauges': {}, 'histograms': {}}
+    _merge(totals, _read_json(archive_path) or {}, with_gauges=False)
+    for path in paths:
+        _merge(totals, _read_json(path) or {}, with_gauges=False)
+
+    _write_json(archive_path, {
+        'counters': [[name, labels, value] for (name, labels), value in totals['counters'].items()],
+        'histograms': [[name, labels, values] for (name, labels), values in totals['histograms'].items()],
+    })
+    for path in paths:
+        os.remove(path)
+
+
+def flush():
+    """Writes the metrics of this process to its file in METRICS_DIR."""
+    global _last_flush, _flushed_once
+    with _flush_lock:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+
+        if not _flushed_once:
+            # A file left by an exited process with the same pid is archived first
+            previous = _read_json(path)
+            if previous is not None and previous.get('token') != _process_token:
+                with _FoldLock():
+                    _fold([path])
+            _flushed_once = True
+
+        _write_json(path, _snapshot())
+        _last_flush = time.monotonic()
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= METRICS_FLUSH_SECONDS:
+        try:
+            flush()
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+
+
+def collect():
+    """
+    Aggregates the metrics of every worker process. Counters and
+    histograms are summed over live and exited processes, gauges over the
+    live ones only.
+    """
+    flush()
+    totals = {'counters': {}, 'gauges': {}, 'histograms': {}}
+    with _FoldLock():
+        dead = []
+        for entry in os.scandir(METRICS_DIR):
+            name, ext = os.path.splitext(entry.name)
+            if ext != '.json' or not name.isdigit():
+                continue
+            if _pid_alive(int(name)):
+                _merge(totals, _read_json(entry.path) or {}, with_gauges=True)
+            else:
+                dead.append(entry.path)
+        if dead:
+            _fold(dead)
+        _merge(totals, _read_json(os.path.join(METRICS_DIR, METRICS_ARCHIVE)) or {}, with_gauges=False)
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def gauge_lines(name, help_text, samples):
+    """Renders a gauge computed at scrape time from [(labels, value)] samples."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}" for labels, value in samples)
+    return lines
+
+
+def render(extra_lines=()):
+    """
+    Renders the aggregated metrics in the Prometheus text format, followed
+    by extra_lines (see gauge_lines).
+    """
+    totals = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == HISTOGRAM:
+            for (metric, labels), values in sorted(totals['histograms'].items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    le = labels + (('le', _format_value(float(bound))),)
+                    lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+        else:
+            samples = totals['counters'] if kind == COUNTER else totals['gauges']
+            for (metric, labels), value in sorted(samples.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def track_request(route):
+    """
+    Decorates a Flask view: counts the request, its errors and the requests
+    in flight, and records its latency and upload size, labelled with the
+    route and the mode selected by the uploaded field.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import request, make_response
+
+            mode = 'page'
+            if request.method == 'POST':
+                mode = next((REQUEST_MODES[field] for field in request.files if field in REQUEST_MODES), 'unknown')
+            start = time.perf_counter()
+            add_gauge('frame_requests_in_flight', 1, route=route)
+            status = 500
+            try:
+                response = make_response(view(*args, **kwargs))
+                status = response.status_code
+                return response
+            finally:
+                add_gauge('frame_requests_in_flight', -1, route=route)
+                observe('frame_request_duration_seconds', time.perf_counter() - start, route=route, mode=mode)
+                if request.content_length:
+                    observe('frame_upload_bytes', request.content_length, route=route, mode=mode)
+                inc('frame_requests_total', route=route, mode=mode, status=str(status))
+                if status >= 500:
+                    inc('frame_request_errors_total', route=route, mode=mode)
+        return wrapper
+    return decorator
+
+
+def observe_rows(mode, result):
+    """
+    Records the rows of a processed report: a DataFrame, a tuple of
+    DataFrames, the row count of a streamed report (int), or a cache hit
+    (True), which is not recorded.
+    """
+    if result is None or isinstance(result, bool):
+        return
+    if isinstance(result, int):
+        rows = result
+    else:
+        frames = result if isinstance(result, tuple) else (result,)
+        rows = sum(len(frame) for frame in frames)
+    observe('frame_report_rows', rows, mode=mode)
+
+
+def _flush_at_exit():
+    if _flushed_once:
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+atexit.register(_flush_at_exit)
@@ -5,6 +5,7 @@ import threading
 import json
 
 from config import TEAMS_WEBHOOK_URL, URLS_TO_MONITOR
+from app.utils.metrics import set_gauge
 
 CHECK_INTERVAL_SECONDS = 300
 TIMEOUT_SECONDS = 10
@@ -75,6 +76,7 @@ def monitor_urls_background_task():
         for url in URLS_TO_MONITOR:
             is_up, message = check_url_status(url)
             url_statuses[url] = {"is_up": is_up, "message": message, "last_checked": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            set_gauge('frame_url_up', int(is_up), url=url)
             if not is_up:
                 # print(f"[{datetime.now()}] Initial check: {url} is {message}") # Debug print
                 subject = f"Initial Alert: URL DOWN - {url}"
@@ -114,6 +116,7 @@ def monitor_urls_background_task():
 
                 # Update the shared status
                 url_statuses[url] = current_statuses[url]
+                set_gauge('frame_url_up', int(is_up), url=url)
 
             # print(f"[{datetime.now()}] {url} is {current_statuses[url]['message']}") # Debug print
 
@@ -0,0 +1,83 @@
+"""
+Compares the per-container thread fan-out (process_multiple_containers_parallel)
+with the single-pass validate_containers engine on a synthetic report.
+
+Usage:
+    python -m benchmarks.bench_accuracy_engine [rows] [containers]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from app.routes.scs_tool.core.process_data import (
+    process_multiple_containers_parallel,
+    validate_containers
+)
+from app.routes.scs_tool.core.rules_index import load_rules_index
+
+
+def build_rules(json_dir, containers, components_per_container, values_per_container, seed=0):
+    """Writes one '<container>.json' rules file per container in the SCS database layout."""
+    rng = random.Random(seed)
+    for c in range(containers):
+        container_name = f"container_{c:03d}"
+        values = {f"value {c}-{v}": [] for v in range(values_per_container)}
+        for component in range(components_per_container):
+            values[f"value {c}-{rng.randrange(values_per_container)}"].append(f"AV{component:06d}")
+        with open(os.path.join(json_dir, f"{container_name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({container_name: values}, f)
+
+
+def build_report(rows, containers, components_per_container, values_per_container, seed=0):
+    """Builds a report where roughly 80% of the values are correct."""
+    rng = random.Random(seed)
+    container_names = [f"container_{rng.randrange(containers):03d}" for _ in range(rows)]
+    components = [f"AV{rng.randrange(int(components_per_container * 1.1)):06d}" for _ in range(rows)]
+    values = [
+        f"value {name.split('_')[1].lstrip('0') or '0'}-{rng.randrange(values_per_container)}"
+        for name in container_names
+    ]
+    return pd.DataFrame({
+        'ContainerName': container_names,
+        'Component': components,
+        'ContainerValue': values,
+        'Accuracy': '',
+        'Correct Value': ''
+    })
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(rows=200000, containers=150):
+    with tempfile.TemporaryDirectory() as json_dir:
+        build_rules(json_dir, containers, components_per_container=2000, values_per_container=20)
+        df = build_report(rows, containers, components_per_container=2000, values_per_container=20)
+
+        # Compile the index up front so both engines are timed on validation only
+        load_rules_index(json_dir)
+
+        legacy, legacy_time = time_call(
+            process_multiple_containers_parallel, df.copy(), json_dir, container_col='ContainerName', max_workers=8)
+        engine, engine_time = time_call(
+            validate_containers, df.copy(), json_dir, container_col='ContainerName', value_col='ContainerValue')
+
+        same = legacy[['Accuracy', 'Correct Value']].equals(engine[['Accuracy', 'Correct Value']])
+
+        print(f"Rows: {rows}, containers: {containers}")
+        print(f"process_multiple_containers_parallel: {legacy_time:.3f}s")
+        print(f"validate_containers:                  {engine_time:.3f}s")
+        print(f"Speedup: {legacy_time / engine_time:.1f}x")
+        print(f"Identical labels: {same}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
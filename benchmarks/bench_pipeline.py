@@ -0,0 +1,246 @@
+"""
+Times every stage of the regular and granular SCS pipelines on synthetic
+workloads (see scs_workloads) and records the peak RSS of each run.
+
+The real entry points, clean_report and clean_report_granular, are run with
+a StageStats progress (see stage_stats), so the stages are the ones the
+pipelines report, from the parse of the upload to the write of the report.
+They read their rules from a config module pointed at the workload.
+
+Each row count runs in its own process, so peak RSS is not inflated by the
+previous run. Results are written as JSON and can be compared with the
+results of another commit.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--rows 1000 10000 100000] [--repeat N]
+                                        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.scs_workloads import get_workload
+
+RESULTS_FORMAT = 2
+
+# Default row counts, from a small upload to a very large export
+DEFAULT_ROWS = [1000, 10000, 100000]
+
+# A stage slower than its baseline by more than this ratio is a regression
+REGRESSION_THRESHOLD = 1.2
+
+# Stages shorter than this are too noisy to be compared
+MIN_COMPARED_SECONDS = 0.01
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is in KB on Linux)."""
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def workload_config(paths, app_dir):
+    """
+    Builds the 'config' module the pipeline runs with: the deployment config
+    when there is one, with the rule files pointed at the workload and
+    everything written (rules index, outputs) sent to app_dir.
+    """
+    config = types.ModuleType('config')
+    try:
+        import config as deployment_config
+        config.__dict__.update({name: value for name, value in vars(deployment_config).items() if name.isupper()})
+    except ImportError:
+        config.SCS_COLS_TO_ADD = ['Accuracy', 'Correct Value', 'Additional Information']
+        config.SCS_COLS_TO_DROP = []
+        config.SCS_COLS_TO_DROP_GRANULAR = []
+
+    config.SCS_APP_PATH = app_dir + os.sep
+    config.SCS_REGULAR_FILE_PATH = os.path.join(app_dir, 'scs_qa.xlsx')
+    config.SCS_GRANULAR_FILE_PATH = os.path.join(app_dir, 'granular_qa.xlsx')
+    config.SCS_JSON_PATH = paths['json_dir']
+    config.SCS_JSON_PATH_AV = paths['json_dir']
+    config.SCS_JSON_GRANULAR_PATH = paths['json_granular_dir']
+    config.NPU_JSON_PATH = paths['npu_json']
+    config.SCS_COMPONENT_GROUPS_PATH = paths['component_groups']
+    config.SCS_GRANULAR_COMPONENT_GROUPS_PATH = paths['granular_component_groups']
+    config.SCS_PRODUCT_LINES_PATH = paths['product_lines']
+    config.__all__ = [name for name in vars(config) if name.isupper()]
+    return config
+
+
+def run_pipelines(paths):
+    """
+    Runs clean_report and clean_report_granular on a workload, each with a
+    StageStats progress recording its stages.
+
+    Returns:
+        (records, counts) where records are the StageStats records of both
+        pipelines, stage names prefixed with 'regular.' or 'granular.'
+    """
+    # Imported here so the parent process does not load the pipeline
+    from app.routes.scs_tool.core.qa_data import REPORT_STAGES, GRANULAR_STAGES, clean_report, clean_report_granular
+    from app.routes.scs_tool.core.stage_stats import StageStats
+
+    records = []
+    counts = {}
+    for pipeline, stages, workbook in (('regular', REPORT_STAGES, paths['workbook']),
+                                       ('granular', GRANULAR_STAGES, paths['granular_workbook'])):
+        stats = StageStats(pipeline, stages)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        with open(workbook, 'rb') as f:
+            if pipeline == 'regular':
+                result = clean_report(f, BytesIO(), progress=stats)
+            else:
+                result = asyncio.run(clean_report_granular(f, BytesIO(), progress=stats))
+        if result is None:
+            raise RuntimeError(f"The {pipeline} pipeline failed, see its output above")
+
+        records.extend(dict(record, stage=f"{pipeline}.{record['stage'].replace(' ', '_')}") for record in stats.records)
+        records.append({
+            'stage': f"{pipeline}.total",
+            'wall_seconds': time.perf_counter() - wall,
+            'cpu_seconds': time.process_time() - cpu,
+            'peak_rss_mb': peak_rss_mb()
+        })
+        counts[f"{pipeline}_rows_in"] = next(
+            (record['rows_in'] for record in stats.records if record['rows_in'] is not None), None)
+        counts[f"{pipeline}_rows_out"] = len(result)
+    return records, counts
+
+
+def run_single(rows, seed, repeat):
+    """Benchmarks one row count in the current process."""
+    paths = get_workload(rows, seed)
+    # Must be in place before the pipeline is imported
+    sys.modules['config'] = workload_config(paths, tempfile.mkdtemp(prefix='scs_bench_app_'))
+
+    stages = {}
+    for _ in range(repeat):
+        records, counts = run_pipelines(paths)
+        for record in records:
+            # Repeated stages keep their fastest run
+            stage = stages.get(record['stage'])
+            if stage is None or record['wall_seconds'] < stage['seconds']:
+                stages[record['stage']] = {
+                    'seconds': round(record['wall_seconds'], 4),
+                    'cpu_seconds': round(record['cpu_seconds'], 4),
+                    'peak_rss_mb': record['peak_rss_mb']
+                }
+
+    return {
+        'rows': rows,
+        'seed': seed,
+        'repeat': repeat,
+        **counts,
+        'total_seconds': round(sum(stage['seconds'] for name, stage in stages.items() if name.endswith('.total')), 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'children_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'stages': stages
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(row_counts, seed, repeat):
+    """Benchmarks every row count in a child process and collects the results."""
+    runs = []
+    for rows in row_counts:
+        with tempfile.NamedTemporaryFile(suffix='.json') as result_file:
+            subprocess.run([sys.executable, '-m', 'benchmarks.bench_pipeline', '--child', result_file.name,
+                            '--rows', str(rows), '--seed', str(seed), '--repeat', str(repeat)], check=True)
+            with open(result_file.name, 'r', encoding='utf-8') as f:
+                run = json.load(f)
+        print(f"{rows} rows: {run['total_seconds']:.3f}s, peak RSS {run['peak_rss_mb']} MB")
+        runs.append(run)
+
+    return {
+        'format': RESULTS_FORMAT,
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'runs': runs
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints the ratio of every stage time to the baseline.
+
+    Returns:
+        List of (rows, stage, ratio) slower than the threshold
+    """
+    baseline_runs = {run['rows']: run for run in baseline['runs']}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for run in results['runs']:
+        base = baseline_runs.get(run['rows'])
+        if base is None:
+            continue
+        for name, stage in run['stages'].items():
+            base_stage = base['stages'].get(name)
+            if base_stage is None or base_stage['seconds'] < MIN_COMPARED_SECONDS:
+                continue
+            ratio = stage['seconds'] / base_stage['seconds']
+            flag = ' REGRESSION' if ratio > threshold else ''
+            print(f"  {run['rows']:>8} {name:<28} {base_stage['seconds']:>9.4f}s -> {stage['seconds']:>9.4f}s"
+                  f"  x{ratio:.2f}{flag}")
+            if ratio > threshold:
+                regressions.append((run['rows'], name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SCS pipeline stages on synthetic workloads.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Row counts to benchmark")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the generated workloads")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per row count, the fastest time is kept")
+    parser.add_argument('--output', help="File the JSON results are written to")
+    parser.add_argument('--compare', help="Results of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="Regression ratio")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        with open(args.child, 'w', encoding='utf-8') as f:
+            json.dump(run_single(args.rows[0], args.seed, args.repeat), f)
+        return 0
+
+    results = run_all(args.rows, args.seed, args.repeat)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
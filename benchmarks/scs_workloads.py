@@ -0,0 +1,201 @@
+"""
+Deterministic synthetic workloads for the SCS pipeline benchmarks.
+
+A workload is a regular report upload ('SKU Accuracy' first, then
+'GranularContentReport' and 'ms4'), a granular report upload with the same
+sheets but 'GranularContentReport' first, and the rules they are checked
+against: a regular and a granular container JSON folder and an NPU file. Containers, component
+groups and product lines are taken from the rules files of the repository,
+so every stage of the pipeline does real work on the generated rows.
+
+The same (rows, seed) always produces the same files. Workloads are kept
+under WORKLOADS_DIR and only generated once.
+"""
+import json
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'app', 'routes', 'scs_tool', 'data')
+COMPONENT_GROUPS_PATH = os.path.join(DATA_DIR, 'component_groups.json')
+GRANULAR_COMPONENT_GROUPS_PATH = os.path.join(DATA_DIR, 'component_groups_granular.json')
+PRODUCT_LINES_PATH = os.path.join(DATA_DIR, 'product_lines.json')
+
+WORKLOADS_DIR = os.path.join(tempfile.gettempdir(), 'scs_benchmarks')
+
+# Bump when the generated files change for the same (rows, seed)
+WORKLOAD_FORMAT = 2
+
+# Rows of an Excel sheet, header excluded
+MAX_SHEET_ROWS = 1048575
+
+# Shape of the generated data
+ROWS_PER_SKU = 40
+COMPONENTS_PER_CONTAINER = 400
+VALUES_PER_CONTAINER = 12
+AVS_PER_SKU = 6
+ERROR_RATE = 0.1
+NPU_ROWS_PER_SKU = 3
+NPU_PROCESSORS = ['Intel Core Ultra 5 125H', 'Intel Core Ultra 7 155H', 'AMD Ryzen 7 8840U', 'Intel Core i5-1335U']
+
+
+def _groups(path):
+    """Returns the (group, container) pairs of a component groups file, in file order."""
+    with open(path, 'r', encoding='utf-8') as f:
+        groups = json.load(f)['Groups']
+    return list(dict.fromkeys(
+        (group['ComponentGroup'], container) for group in groups for container in group['ContainerName']))
+
+
+def _product_lines():
+    with open(PRODUCT_LINES_PATH, 'r', encoding='utf-8') as f:
+        return [pl_info['PL'] for pl_info in json.load(f)['ProductLine']]
+
+
+def _write_rules(json_dir, containers, layout):
+    """
+    Writes one rules file per container and returns its {component: value} map.
+
+    Args:
+        layout: 'values' for {container: {value: [components]}} or 'entries'
+            for {container: [{'Component', 'ContainerValue'}]}
+    """
+    os.makedirs(json_dir, exist_ok=True)
+    rules = {}
+    for position, container in enumerate(containers):
+        rng = random.Random(f"{container}:{position}")
+        values = [f"{container} value {v}" for v in range(VALUES_PER_CONTAINER)]
+        container_rules = {
+            f"AV{position:03d}{c:04d}": rng.choice(values) for c in range(COMPONENTS_PER_CONTAINER)
+        }
+        rules[container] = container_rules
+
+        if layout == 'entries':
+            data = [{'Component': component, 'ContainerValue': value} for component, value in container_rules.items()]
+        else:
+            data = {}
+            for component, value in container_rules.items():
+                data.setdefault(value, []).append(component)
+        with open(os.path.join(json_dir, f"{container}.json"), 'w', encoding='utf-8') as f:
+            json.dump({container: data}, f)
+    return rules
+
+
+def _rows(rng, skus, pairs, rules, group_col, container_col, value_col):
+    """Builds ROWS_PER_SKU rows per SKU, with ERROR_RATE wrong values and a few unknown components."""
+    records = []
+    for sku in skus:
+        for group, container in rng.sample(pairs, min(ROWS_PER_SKU, len(pairs))):
+            components = list(rules[container])
+            component = rng.choice(components)
+            value = rules[container][component]
+            roll = rng.random()
+            if roll < ERROR_RATE:
+                value = f"{value} (wrong)"
+            elif roll < ERROR_RATE * 1.2:
+                component = f"{component}X"
+            records.append((sku, group, container, value, component))
+    return pd.DataFrame(records, columns=['SKU', group_col, container_col, value_col, 'Component'])
+
+
+def generate(folder, rows, seed=0):
+    """
+    Writes a workload of about rows 'SKU Accuracy' rows (and as many
+    granular rows) to folder, as a regular and a granular upload.
+
+    Returns:
+        Dict with the paths of the workbook and of every rules file
+    """
+    if rows > MAX_SHEET_ROWS:
+        raise ValueError(f"An Excel sheet holds at most {MAX_SHEET_ROWS} rows, got {rows}")
+
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+
+    regular_pairs = _groups(COMPONENT_GROUPS_PATH)
+    granular_pairs = _groups(GRANULAR_COMPONENT_GROUPS_PATH)
+    product_lines = _product_lines()
+
+    json_dir = os.path.join(folder, 'db')
+    json_granular_dir = os.path.join(folder, 'db_granular')
+    rules = _write_rules(json_dir, list(dict.fromkeys(container for _, container in regular_pairs)), 'values')
+    granular_rules = _write_rules(
+        json_granular_dir, list(dict.fromkeys(container for _, container in granular_pairs)), 'entries')
+
+    skus = [f"{rng.randrange(16**6):06X}{n:06d}" for n in range(max(1, rows // (ROWS_PER_SKU + NPU_ROWS_PER_SKU)))]
+    sku_pl = {sku: rng.choice(product_lines) for sku in skus}
+
+    df_s = _rows(rng, skus, regular_pairs, rules, 'ComponentGroup', 'ContainerName', 'ContainerValue')
+    df_s.insert(1, 'PL', df_s['SKU'].map(sku_pl))
+    df_s['PhwebDescription'] = '  ' + df_s['Component'] + ' description'
+    blank = [rng.random() < 0.02 for _ in range(len(df_s))]
+    df_s.loc[blank, 'ContainerValue'] = '[BLANK]'
+
+    # One NPU triple per SKU, mostly consistent with the NPU rules
+    npu_rows = []
+    for sku in skus:
+        processor = rng.choice(NPU_PROCESSORS)
+        npu_rows.append((sku, 'Processor', 'processorname', processor))
+        npu_rows.append((sku, 'Processor', 'npu', 'Intel AI Boost' if rng.random() > ERROR_RATE else 'None'))
+        npu_rows.append((sku, 'Processor', 'a_processor_nputops', '11 TOPS'))
+    npu_df = pd.DataFrame(npu_rows, columns=['SKU', 'ComponentGroup', 'ContainerName', 'ContainerValue'])
+    npu_df.insert(1, 'PL', npu_df['SKU'].map(sku_pl))
+    npu_df['Component'] = 'NPU'
+    npu_df['PhwebDescription'] = 'NPU'
+    df_s = pd.concat([df_s, npu_df], ignore_index=True)
+
+    df_g = _rows(rng, skus, granular_pairs, granular_rules, 'SCSGroup', 'Granular Container Tag',
+                 'Granular Container Value')
+
+    # BOM with a few AVs per SKU, some of them not in the report
+    sku_components = df_s.groupby('SKU')['Component'].unique()
+    ms4_rows = []
+    for sku in skus:
+        for component in rng.sample(list(sku_components[sku]), min(AVS_PER_SKU, len(sku_components[sku]))):
+            ms4_rows.append((f"{sku}#ABA ", f"{component}#ABA"))
+        ms4_rows.append((f"{sku}#ABA ", f"ZZ{rng.randrange(10**6):06d}#ABA"))
+    ms4 = pd.DataFrame(ms4_rows, columns=['SKU'.ljust(40), 'SKU AV'.ljust(40)])
+
+    npu_path = os.path.join(folder, 'npu.json')
+    with open(npu_path, 'w', encoding='utf-8') as f:
+        json.dump({'processor': {'Intel AI Boost': [
+            {'processorname': processor, 'a_processor_nputops': '11 TOPS'} for processor in NPU_PROCESSORS
+        ]}}, f)
+
+    # The pipelines read the first sheet of an upload
+    paths = workload_paths(folder)
+    sheets = {'SKU Accuracy': df_s, 'GranularContentReport': df_g, 'ms4': ms4}
+    for key, order in (('granular_workbook', ['GranularContentReport', 'SKU Accuracy', 'ms4']),
+                       ('workbook', ['SKU Accuracy', 'GranularContentReport', 'ms4'])):
+        tmp_path = f"{os.path.splitext(paths[key])[0]}.{os.getpid()}.tmp.xlsx"
+        with pd.ExcelWriter(tmp_path, engine='xlsxwriter') as writer:
+            for sheet_name in order:
+                sheets[sheet_name].to_excel(writer, sheet_name=sheet_name, index=False)
+        os.replace(tmp_path, paths[key])
+
+    return paths
+
+
+def workload_paths(folder):
+    return {
+        'workbook': os.path.join(folder, 'report.xlsx'),
+        'granular_workbook': os.path.join(folder, 'report_granular.xlsx'),
+        'json_dir': os.path.join(folder, 'db'),
+        'json_granular_dir': os.path.join(folder, 'db_granular'),
+        'npu_json': os.path.join(folder, 'npu.json'),
+        'component_groups': COMPONENT_GROUPS_PATH,
+        'granular_component_groups': GRANULAR_COMPONENT_GROUPS_PATH,
+        'product_lines': PRODUCT_LINES_PATH,
+    }
+
+
+def get_workload(rows, seed=0):
+    """Returns the paths of a workload, generating it on first use."""
+    folder = os.path.join(WORKLOADS_DIR, f"v{WORKLOAD_FORMAT}_{rows}_{seed}")
+    paths = workload_paths(folder)
+    if not os.path.exists(paths['workbook']):
+        generate(folder, rows, seed)
+    return paths
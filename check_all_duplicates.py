@@ -1,6 +1,22 @@
-import re
-from collections import defaultdict
+"""
+Finds and merges duplicate keys in the SCS rules JSON files.
+
+A container file maps every value to its list of components. When the same
+value appears twice in a file, json.load silently keeps only the last list;
+this tool merges the component lists of duplicated values instead.
+
+Files are parsed with an object_pairs_hook, so only real duplicate keys are
+reported, and checked in parallel. A manifest of file hashes lets files that
+did not change since their last clean check be skipped.
+
+Usage:
+    python check_all_duplicates.py [--dry-run] [--full] [--workers N] [folder ...]
+"""
+import argparse
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Define paths
@@ -8,107 +24,202 @@ BASE_DIR = Path(__file__).resolve().parent
 DB_FOLDER = BASE_DIR / "app" / "routes" / "scs_tool" / "data" / "db"
 DB_GRANULAR_FOLDER = BASE_DIR / "app" / "routes" / "scs_tool" / "data" / "db_granular"
 
-def check_and_fix_file(file_path):
-    """Check a single file for duplicate keys and fix if found."""
-    with open(file_path, 'r', encoding='utf-8') as f:
+# Hashes of the files found clean: {path: [mtime_ns, size, sha1]}
+MANIFEST_PATH = BASE_DIR / "app" / "routes" / "scs_tool" / "cache" / "duplicates_manifest.json"
+
+
+class _DuplicateCollector:
+    """object_pairs_hook that merges duplicate keys and records them."""
+
+    def __init__(self):
+        # {key: [value of every occurrence]}
+        self.duplicates = {}
+
+    def __call__(self, pairs):
+        obj = {}
+        merged = set()
+        for key, value in pairs:
+            if key not in obj:
+                obj[key] = value
+                continue
+            occurrences = self.duplicates.setdefault(key, [obj[key]])
+            occurrences.append(value)
+            merged.add(key)
+            if isinstance(obj[key], list) and isinstance(value, list):
+                obj[key] = obj[key] + value
+            else:
+                obj[key] = value  # Not a component list, the last one wins as with json.load
+
+        if merged:
+            # Components of the object are deduplicated and sorted, as the former fix did
+            for key, value in obj.items():
+                if isinstance(value, list) and all(isinstance(item, str) for item in value):
+                    obj[key] = sorted(dict.fromkeys(value))
+        return obj
+
+
+def _file_hash(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def check_and_fix_file(file_path, dry_run=False):
+    """
+    Check a single file for duplicate keys and fix it if found.
+
+    Returns:
+        (file_path, sha1 of the file as left on disk, result) where result
+        is None for a clean file, or a dict with the duplicate keys
+    """
+    with open(file_path, 'rb') as f:
         content = f.read()
-    
-    # Find all key-value pairs
-    pattern = r'"([^"]+)":\s*\[((?:[^\[\]]*|\[[^\]]*\])*)\]'
-    matches = re.findall(pattern, content, re.DOTALL)
-    
-    if not matches:
-        return None
-    
-    # Get the main key (first match should be the top-level key)
-    main_key = matches[0][0] if matches else None
-    
-    # Group by key
-    key_groups = defaultdict(list)
-    for key, value_str in matches:
-        if key == main_key:
-            continue
-        components = re.findall(r'"([^"]+)"', value_str)
-        key_groups[key].append(components)
-    
-    # Find duplicates
-    duplicates = {k: v for k, v in key_groups.items() if len(v) > 1}
-    
-    if not duplicates:
-        return None
-    
-    # Merge and create clean JSON
-    merged_data = {main_key: {}}
-    for key, component_lists in key_groups.items():
-        # Combine all components and remove duplicates while preserving order
-        all_components = []
-        seen = set()
-        for comp_list in component_lists:
-            for comp in comp_list:
-                if comp not in seen:
-                    seen.add(comp)
-                    all_components.append(comp)
-        merged_data[main_key][key] = sorted(all_components)
-    
-    # Save the fixed file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, indent=4, ensure_ascii=False)
-    
-    return {
-        'file': file_path.name,
-        'duplicate_keys': len(duplicates),
-        'details': duplicates
+
+    collector = _DuplicateCollector()
+    try:
+        data = json.loads(content.decode('utf-8'), object_pairs_hook=collector)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return str(file_path), None, {'file': Path(file_path).name, 'error': str(e), 'duplicate_keys': 0, 'details': {}}
+
+    if not collector.duplicates:
+        return str(file_path), _file_hash(content), None
+
+    result = {
+        'file': Path(file_path).name,
+        'duplicate_keys': len(collector.duplicates),
+        'details': collector.duplicates
     }
+    if dry_run:
+        return str(file_path), None, result
+
+    # Save the fixed file atomically
+    fixed = json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(fixed)
+    os.replace(tmp_path, file_path)
+    return str(file_path), _file_hash(fixed), result
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _unchanged(json_file, manifest):
+    """True if the file is known clean: same mtime and size, or same content."""
+    known = manifest.get(str(json_file))
+    if known is None:
+        return False
+    stat = json_file.stat()
+    if known[:2] == [stat.st_mtime_ns, stat.st_size]:
+        return True
+    with open(json_file, 'rb') as f:
+        if _file_hash(f.read()) == known[2]:
+            known[:2] = [stat.st_mtime_ns, stat.st_size]
+            return True
+    return False
+
 
-def process_folder(folder_path):
-    """Process all JSON files in a folder."""
+def process_folder(folder_path, manifest, executor, workers, dry_run=False):
+    """Process all changed JSON files of a folder in parallel."""
     print(f"\n{'='*80}")
     print(f"Checking folder: {folder_path.name}")
     print(f"{'='*80}")
-    
-    json_files = sorted(folder_path.glob("*.json"))
-    print(f"Found {len(json_files)} JSON files")
-    
+
+    json_files = sorted(folder_path.resolve().glob("*.json"))
+    to_check = [json_file for json_file in json_files if not _unchanged(json_file, manifest)]
+    print(f"Found {len(json_files)} JSON files, {len(to_check)} changed since the last check")
+
     files_with_duplicates = []
-    
-    for json_file in json_files:
-        result = check_and_fix_file(json_file)
-        if result:
-            files_with_duplicates.append(result)
-            print(f"\n⚠️  {result['file']}: {result['duplicate_keys']} duplicate keys")
-            
-            # Show first few examples
-            for key, occurrences in list(result['details'].items())[:5]:
-                total = sum(len(occ) for occ in occurrences)
-                print(f"    - '{key[:70]}{'...' if len(key) > 70 else ''}': {len(occurrences)}x, {total} components")
-            
-            if len(result['details']) > 5:
-                print(f"    ... and {len(result['details']) - 5} more duplicate keys")
-    
+    chunksize = max(1, len(to_check) // (4 * workers))
+    checked = executor.map(check_and_fix_file, to_check, [dry_run] * len(to_check), chunksize=chunksize)
+
+    for path, digest, result in checked:
+        if digest is not None:
+            stat = os.stat(path)
+            manifest[path] = [stat.st_mtime_ns, stat.st_size, digest]
+        else:
+            manifest.pop(path, None)
+
+        if not result:
+            continue
+        files_with_duplicates.append(result)
+        if 'error' in result:
+            print(f"\n✗  {result['file']}: could not be parsed ({result['error']})")
+            continue
+
+        print(f"\n⚠️  {result['file']}: {result['duplicate_keys']} duplicate keys")
+
+        # Show first few examples
+        for key, occurrences in list(result['details'].items())[:5]:
+            total = sum(len(occ) if isinstance(occ, list) else 1 for occ in occurrences)
+            print(f"    - '{key[:70]}{'...' if len(key) > 70 else ''}': {len(occurrences)}x, {total} components")
+
+        if len(result['details']) > 5:
+            print(f"    ... and {len(result['details']) - 5} more duplicate keys")
+
     return files_with_duplicates
 
-print("="*80)
-print("CHECKING ALL JSON FILES FOR DUPLICATE KEYS")
-print("="*80)
-
-# Process both folders
-db_results = process_folder(DB_FOLDER)
-db_granular_results = process_folder(DB_GRANULAR_FOLDER)
-
-# Summary
-total_files = len(db_results) + len(db_granular_results)
-total_keys = sum(r['duplicate_keys'] for r in db_results + db_granular_results)
-
-print(f"\n{'='*80}")
-print("FINAL SUMMARY")
-print(f"{'='*80}")
-print(f"Files with duplicate keys (db): {len(db_results)}")
-print(f"Files with duplicate keys (db_granular): {len(db_granular_results)}")
-print(f"Total files fixed: {total_files}")
-print(f"Total duplicate keys merged: {total_keys}")
-print(f"{'='*80}")
-
-if total_files > 0:
-    print("\n✓ All files have been fixed and saved!")
-else:
-    print("\n✓ No duplicate keys found in any files!")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and merge duplicate keys in the SCS rules JSON files.")
+    parser.add_argument('folders', nargs='*', type=Path, help="Folders to check (default: data/db and data/db_granular)")
+    parser.add_argument('--dry-run', action='store_true', help="Report duplicate keys without rewriting any file")
+    parser.add_argument('--full', action='store_true', help="Check every file, ignoring the manifest")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    folders = args.folders or [DB_FOLDER, DB_GRANULAR_FOLDER]
+    manifest = {} if args.full else load_manifest()
+
+    print("="*80)
+    print(f"CHECKING ALL JSON FILES FOR DUPLICATE KEYS{' (DRY RUN)' if args.dry_run else ''}")
+    print("="*80)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for folder in folders:
+            if not folder.is_dir():
+                print(f"\nSkipping {folder}: not a folder")
+                continue
+            results[folder.name] = process_folder(folder, manifest, executor, args.workers, dry_run=args.dry_run)
+
+    save_manifest(manifest)
+
+    # Summary
+    all_results = [result for folder_results in results.values() for result in folder_results]
+    duplicated = [result for result in all_results if 'error' not in result]
+    total_keys = sum(result['duplicate_keys'] for result in duplicated)
+
+    print(f"\n{'='*80}")
+    print("FINAL SUMMARY")
+    print(f"{'='*80}")
+    for name, folder_results in results.items():
+        print(f"Files with duplicate keys ({name}): {sum('error' not in result for result in folder_results)}")
+    print(f"Files that could not be parsed: {len(all_results) - len(duplicated)}")
+    print(f"Total files {'with duplicates' if args.dry_run else 'fixed'}: {len(duplicated)}")
+    print(f"Total duplicate keys {'found' if args.dry_run else 'merged'}: {total_keys}")
+    print(f"{'='*80}")
+
+    if duplicated and args.dry_run:
+        print("\n✗ Duplicate keys found, run without --dry-run to merge them.")
+    elif duplicated:
+        print("\n✓ All files have been fixed and saved!")
+    else:
+        print("\n✓ No duplicate keys found in any files!")
+
+    return 1 if duplicated and args.dry_run else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
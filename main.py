@@ -2,6 +2,10 @@ from flask import Flask, render_template
 
 from app.routes.scs_tool.route_scs import scs_tool
 from app.routes.qs_tool.route_qs import qs_tool
+from app.routes.jobs.route_jobs import job_submit, job_status, job_download
+from app.routes.metrics.route_metrics import metrics
+from app.utils.metrics import track_request
+from app.utils.job_queue import recover_jobs
 
 import config
 
@@ -9,21 +13,46 @@ app = Flask(__name__)
 app.static_folder = 'static'
 app.config.from_object(config)
 
+# Requeue the jobs interrupted by the last restart, once the job kinds are registered
+recover_jobs()
+
 @app.route('/main')
 def index():
     """Homepage"""
     return render_template('index.html')
 
 @app.route('/scs_tool', methods=['GET', 'POST'])
+@track_request('scs_tool')
 def scs_tool_route():
     """SCS Tool page"""
     return scs_tool()
 
 @app.route('/qs_tool', methods=['GET', 'POST'])
+@track_request('qs_tool')
 def qs_tool_route():
     """QS Tool page"""
     return qs_tool()
 
+@app.route('/jobs/<kind>', methods=['POST'])
+def job_submit_route(kind):
+    """Queue a background SCS or QS job"""
+    return job_submit(kind)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Background job status"""
+    return job_status(job_id)
+
+@app.route('/jobs/<job_id>/download', methods=['GET'])
+def job_download_route(job_id):
+    """Background job result"""
+    return job_download(job_id)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Operational metrics in the Prometheus text format"""
+    return metrics()
+
 @app.route('/faq', methods=['GET', 'POST'])
 def faq_route():
     """FAQ page"""
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR, 'app', 'routes', 'scs_tool', 'data')
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+def _write_test_config():
+    """
+    Writes the 'config' module of a deployment for the tests to a temporary
+    folder and puts it on sys.path, where the worker processes of the sharded
+    validation find it too. Rule files come from the repository data folder,
+    everything written goes to the temporary folder.
+    """
+    root = tempfile.mkdtemp(prefix='frame_tests_')
+    json_dir = os.path.join(root, 'json')
+    os.makedirs(json_dir)
+    npu_path = os.path.join(root, 'npu.json')
+    with open(npu_path, 'w', encoding='utf-8') as f:
+        json.dump({'processor': {}}, f)
+
+    settings = {
+        'SCS_APP_PATH': root + os.sep,
+        'SCS_REGULAR_FILE_PATH': os.path.join(root, 'scs_qa.xlsx'),
+        'SCS_GRANULAR_FILE_PATH': os.path.join(root, 'granular_qa.xlsx'),
+        'SCS_BATTERY_FILE_PATH': os.path.join(root, 'battery_life_qa.xlsx'),
+        'SCS_COMPONENT_GROUPS_PATH': os.path.join(DATA_DIR, 'component_groups.json'),
+        'SCS_GRANULAR_COMPONENT_GROUPS_PATH': os.path.join(DATA_DIR, 'component_groups_granular.json'),
+        'SCS_PRODUCT_LINES_PATH': os.path.join(DATA_DIR, 'product_lines.json'),
+        'SCS_JSON_PATH': json_dir,
+        'SCS_JSON_GRANULAR_PATH': json_dir,
+        'SCS_JSON_PATH_AV': json_dir,
+        'NPU_JSON_PATH': npu_path,
+        'SCS_COLS_TO_ADD': ['Accuracy', 'Correct Value', 'Additional Information'],
+        'SCS_COLS_TO_DROP': [],
+        'SCS_COLS_TO_DROP_GRANULAR': [],
+        'VALID_FILE_EXTENSIONS': {'xlsx'},
+        'TEAMS_WEBHOOK_URL': '',
+        'URLS_TO_MONITOR': [],
+    }
+    with open(os.path.join(root, 'config.py'), 'w', encoding='utf-8') as f:
+        for name, value in settings.items():
+            f.write(f"{name} = {value!r}\n")
+    sys.path.insert(0, root)
+
+
+# config.py is written per deployment and is not part of the repository.
+# The tests always run with their own, so they never write to the rule
+# folders of a deployment
+sys.modules.pop('config', None)
+_write_test_config()
+import config  # noqa: E402
+
+
+@pytest.fixture
+def scs_config():
+    """The config module the app runs with in the tests."""
+    return config
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    """Keeps the per-process metrics files of every test in its own folder."""
+    from app.utils import metrics
+    folder = tmp_path / 'metrics'
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(folder))
+    return folder
+
+
+# Container rules of the tests, in both layouts of the container JSON files
+RULES = {
+    'processorname': {'processorname': {'Intel Core i5': ['AV1'], 'Intel Core i7': ['AV3', 'AV5']}},
+    'memstdes_01': {'memstdes_01': [
+        {'Component': 'AV2', 'ContainerValue': '16 GB'},
+        {'Component': 'AV4', 'ContainerValue': '16 GB'},
+    ]},
+}
+
+
+def write_rules(folder):
+    """Writes RULES to '<container>.json' files in folder."""
+    os.makedirs(folder, exist_ok=True)
+    for container, data in RULES.items():
+        with open(os.path.join(folder, f'{container}.json'), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    return str(folder)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    """A container JSON folder with RULES."""
+    return write_rules(tmp_path / 'rules')
+
+
+@pytest.fixture(scope='session')
+def scs_rules():
+    """Puts RULES in the container JSON folder the pipelines read (SCS_JSON_PATH)."""
+    return write_rules(config.SCS_JSON_PATH)
+
+
+def report_frame():
+    """A small standard report: two SKUs of PL '1M' with a wrong, a '[BLANK]' and a ';'-terminated value."""
+    return pd.DataFrame({
+        'SKU': ['SKU1', 'SKU1', 'SKU2', 'SKU2'],
+        'PL': ['1M', '1M', '1M', '1M'],
+        'ComponentGroup': ['Processor', 'Memory', 'Processor', 'Memory'],
+        'ContainerName': ['processorname', 'memstdes_01', 'processorname', 'memstdes_01'],
+        'ContainerValue': ['Intel Core i5', '16 GB;', '[BLANK]', '8 GB'],
+        'Component': ['AV1', 'AV2', 'AV3', 'AV4'],
+        'PhwebDescription': [' cpu', ' memory', ' cpu', ' memory'],
+    })
+
+
+@pytest.fixture
+def report_upload():
+    """
+    Returns a function building an upload in memory from {sheet name: DataFrame},
+    by default report_frame() as 'SKU Accuracy', with an 'ms4' sheet if with_ms4.
+    """
+    def build(sheets=None, with_ms4=False):
+        sheets = dict(sheets or {'SKU Accuracy': report_frame()})
+        if with_ms4:
+            sheets['ms4'] = pd.DataFrame({'SKU': ['SKU1#ABA', 'SKU2#ABA'], 'SKU AV': ['AV1#ABA', 'AV3#ABA']})
+        upload = BytesIO()
+        with pd.ExcelWriter(upload, engine='openpyxl') as writer:
+            for name, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=name, index=False)
+        upload.seek(0)
+        return upload
+
+    return build
@@ -0,0 +1,44 @@
+import json
+
+import pandas as pd
+
+from app.routes.scs_tool.core.check_missing_fields import check_missing_fields
+
+
+def _rules(tmp_path):
+    path = tmp_path / 'component_groups_granular.json'
+    path.write_text(json.dumps({'Groups': [
+        {'ComponentGroup': 'Memory', 'ContainerName': ['memsize', 'memtype', 'memspeed', 'memtype']},
+        {'ComponentGroup': 'Display', 'ContainerName': ['dispsize']},
+    ]}), encoding='utf-8')
+    return str(path)
+
+
+def test_check_missing_fields_lists_missing_tags_in_rules_order(tmp_path):
+    df = pd.DataFrame([
+        ('AV1', 'Memory', 'memsize', '16 GB'),
+        ('AV1', 'Memory', 'memtype', 'DDR5'),
+        ('AV1', 'Memory', 'memspeed', '[BLANK]'),
+        ('AV2', 'Memory', 'memtype', 'DDR4'),
+        ('AV3', 'Display', 'dispres', '1920x1080'),
+        ('AV4', 'Keyboard', 'kbdlayout', 'US'),
+        ('AV5', None, 'memsize', '8 GB'),
+    ], columns=['Component', 'SCSGroup', 'Granular Container Tag', 'Granular Container Value'])
+
+    df = check_missing_fields(df, _rules(tmp_path))
+
+    assert df['Missing Fields'].tolist() == [
+        'OK', 'OK', 'OK',
+        'memsize, memspeed',
+        'dispsize',
+        'OK',
+        'OK',
+    ]
+
+
+def test_check_missing_fields_without_rules_file(tmp_path):
+    df = pd.DataFrame({'Component': ['AV1'], 'SCSGroup': ['Memory'], 'Granular Container Tag': ['memsize']})
+
+    df = check_missing_fields(df, str(tmp_path / 'missing.json'))
+
+    assert df['Missing Fields'].tolist() == ['Rules file not found']
@@ -0,0 +1,85 @@
+import os
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from app.routes.scs_tool.core import incremental
+from app.routes.scs_tool.core.qa_data import clean_report
+from conftest import report_frame
+
+
+@pytest.fixture
+def runs_dir(tmp_path, monkeypatch):
+    folder = tmp_path / 'runs'
+    monkeypatch.setattr(incremental, 'INCREMENTAL_DIR', str(folder))
+    return folder
+
+
+def _report(skus):
+    frames = []
+    for number in range(1, skus + 1):
+        frame = report_frame().iloc[:2].copy()
+        frame['SKU'] = f'SKU{number}'
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_diff_report_finds_changed_skus():
+    previous = _report(4)
+    current = previous.copy()
+    current.loc[2, 'ContainerValue'] = 'Intel Core i7'             # SKU2 modified
+    current = current.drop(index=7)                                 # SKU4 lost a row
+    current = pd.concat([current, _report(5).tail(2)])              # SKU5 added
+    current.index = range(10, 10 + len(current))
+
+    changed_skus, reused = incremental.diff_report(
+        incremental.row_signatures(previous), incremental.row_signatures(current))
+
+    assert changed_skus == {'SKU2', 'SKU4', 'SKU5'}
+    assert reused.sort_index().to_dict() == {10: 0, 11: 1, 14: 4, 15: 5}
+
+
+def test_incremental_run_matches_clean_report(report_upload, runs_dir, scs_rules, monkeypatch):
+    processed = []
+    process_report = incremental.process_report
+
+    def recording_process_report(df, progress=None):
+        processed.append(sorted(set(df['SKU'])))
+        return process_report(df, progress)
+
+    monkeypatch.setattr(incremental, 'process_report', recording_process_report)
+    report = _report(4)
+    changed = report.copy()
+    changed.loc[0, 'ContainerValue'] = 'Intel Core i7'
+
+    incremental.clean_report_incremental(report_upload({'SKU Accuracy': report}), 'report.xlsx', BytesIO())
+    result = incremental.clean_report_incremental(report_upload({'SKU Accuracy': changed}), 'report.xlsx', BytesIO())
+
+    assert processed == [['SKU1', 'SKU2', 'SKU3', 'SKU4'], ['SKU1']]
+    pd.testing.assert_frame_equal(result, clean_report(report_upload({'SKU Accuracy': changed}), BytesIO()))
+
+
+def test_evict_snapshots_by_age_and_size(runs_dir):
+    os.makedirs(runs_dir)
+    now = time.time()
+    for name, age in [('fresh', 0), ('recent', 10), ('older', 20), ('stale', 100)]:
+        path = runs_dir / f'run_{name}.pickle'
+        path.write_bytes(b'x' * 10)
+        os.utime(path, (now - age, now - age))
+
+    incremental._evict_snapshots(max_bytes=100, max_age=50)
+    assert sorted(os.listdir(runs_dir)) == ['run_fresh.pickle', 'run_older.pickle', 'run_recent.pickle']
+
+    incremental._evict_snapshots(max_bytes=20, max_age=50)
+    assert sorted(os.listdir(runs_dir)) == ['run_fresh.pickle', 'run_recent.pickle']
+
+
+def test_snapshots_round_trip(runs_dir):
+    snapshot = {'format': incremental.INCREMENTAL_FORMAT, 'output': pd.DataFrame({'a': [1]})}
+
+    incremental.save_snapshot('report.xlsx', snapshot)
+
+    assert incremental.load_snapshot('report.xlsx')['output'].equals(snapshot['output'])
+    assert incremental.load_snapshot('other.xlsx') is None
@@ -0,0 +1,78 @@
+import os
+import time
+
+import pytest
+
+from app.utils import job_queue
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    """A job store in tmp_path with a 'copy' job kind and a fresh worker pool."""
+    monkeypatch.setattr(job_queue, 'JOBS_DIR', str(tmp_path))
+    monkeypatch.setattr(job_queue, 'JOBS_DB_PATH', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(job_queue, '_executor', None)
+    monkeypatch.setitem(job_queue._job_kinds, 'copy', (_copy, 'result.txt', 'text/plain'))
+    job_queue._init_store()
+    yield job_queue
+    if job_queue._executor is not None:
+        job_queue._executor.shutdown(wait=True)
+
+
+def _copy(upload_path, filename, result_path, progress):
+    progress('copy', 0, 1)
+    with open(upload_path) as source, open(result_path, 'w') as result:
+        result.write(source.read())
+
+
+def _insert(job_queue, job_id, status, pid, token, pid_started):
+    os.makedirs(job_queue._job_dir(job_id))
+    with open(job_queue._upload_path(job_id), 'w') as f:
+        f.write(job_id)
+    with job_queue._connect() as connection:
+        connection.execute(
+            'INSERT INTO jobs (id, kind, filename, status, pid, token, pid_started, created)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, 'copy', 'upload.txt', status, pid, token, pid_started, time.time()))
+
+
+def test_recover_jobs_requeues_jobs_of_gone_processes(jobs):
+    own = jobs._owner()
+    parent = os.getppid()
+    # This pid, handed to the process before this one
+    _insert(jobs, 'reused_pid', jobs.STATUS_RUNNING, own['pid'], 'old token', own['pid_started'])
+    # A live pid that started after the job's owner
+    _insert(jobs, 'restarted', jobs.STATUS_QUEUED, parent, 'token', -1)
+    # Still owned by a live process
+    _insert(jobs, 'own', jobs.STATUS_RUNNING, own['pid'], own['token'], own['pid_started'])
+    _insert(jobs, 'parent', jobs.STATUS_RUNNING, parent, 'token', jobs._pid_started(parent))
+
+    jobs.recover_jobs()
+    jobs._executor.shutdown(wait=True)
+
+    status = {job_id: jobs.get_job(job_id)['status'] for job_id in ('reused_pid', 'restarted', 'own', 'parent')}
+    assert status == {'reused_pid': jobs.STATUS_DONE, 'restarted': jobs.STATUS_DONE,
+                      'own': jobs.STATUS_RUNNING, 'parent': jobs.STATUS_RUNNING}
+    path, _, _ = jobs.job_result('reused_pid')
+    with open(path) as f:
+        assert f.read() == 'reused_pid'
+    assert jobs.get_job('reused_pid')['token'] == own['token']
+
+
+def test_init_store_adds_owner_columns_to_old_stores(jobs):
+    with jobs._connect() as connection:
+        connection.execute('DROP TABLE jobs')
+        connection.execute('CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, filename TEXT,'
+                           ' status TEXT NOT NULL, stage TEXT, step INTEGER DEFAULT 0, total INTEGER DEFAULT 0,'
+                           ' stages TEXT DEFAULT \'[]\', error TEXT, pid INTEGER, created REAL, started REAL,'
+                           ' finished REAL)')
+        connection.execute('INSERT INTO jobs (id, kind, status, pid) VALUES (?, ?, ?, ?)',
+                           ('old', 'copy', jobs.STATUS_RUNNING, os.getpid()))
+    os.makedirs(jobs._job_dir('old'))
+    with open(jobs._upload_path('old'), 'w') as f:
+        f.write('old')
+
+    jobs.recover_jobs()
+    jobs._executor.shutdown(wait=True)
+
+    assert jobs.get_job('old')['status'] == jobs.STATUS_DONE
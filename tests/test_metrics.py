@@ -0,0 +1,40 @@
+from io import BytesIO
+
+import pytest
+
+from app.routes.scs_tool.core.qa_stream import clean_report_streaming
+from app.utils import metrics
+
+
+def _report_rows(mode):
+    """Returns (count, sum) of the frame_report_rows histogram of a mode."""
+    totals = metrics.collect()
+    values = totals['histograms'].get(('frame_report_rows', (('mode', mode),)))
+    return (values[-1], values[-2]) if values else (0, 0)
+
+
+def test_observe_rows_accepts_every_pipeline_result(report_upload):
+    import pandas as pd
+
+    rows = clean_report_streaming(report_upload(), BytesIO())
+    assert isinstance(rows, int)
+
+    metrics.observe_rows('regular', rows)
+    metrics.observe_rows('regular', pd.DataFrame({'a': [1, 2]}))
+    metrics.observe_rows('omega', (pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [1, 2]})))
+    # Cache hits and failures are not recorded
+    metrics.observe_rows('regular', True)
+    metrics.observe_rows('regular', None)
+
+    assert _report_rows('regular') == (2, rows + 2)
+    assert _report_rows('omega') == (1, 3)
+
+
+def test_render_regular_report_streaming_branch(report_upload):
+    pytest.importorskip('flask')
+    from app.routes.scs_tool.route_scs import render_regular_report
+
+    result = render_regular_report(report_upload(), BytesIO(), streaming=True)
+
+    assert isinstance(result, int) and result > 0
+    assert _report_rows('regular') == (1, result)
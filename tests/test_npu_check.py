@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+
+from app.routes.scs_tool.core.npu_check import npu_check
+
+
+def _npu_json(tmp_path):
+    path = tmp_path / 'npu.json'
+    path.write_text(json.dumps({'processor': {
+        'Intel AI Boost': [{'processorname': 'Intel Core Ultra 7', 'a_processor_nputops': '13 TOPS'}],
+        'AMD Ryzen AI': [{'processorname': 'AMD Ryzen AI 9', 'a_processor_nputops': '50 TOPS'}],
+    }}), encoding='utf-8')
+    return str(path)
+
+
+def _report():
+    rows = [
+        ('SKU1', 'processorname', 'Intel Core Ultra 7 '),
+        ('SKU1', 'npu', 'Intel AI Boost'),
+        ('SKU1', 'a_processor_nputops', '13 TOPS'),
+        ('SKU1', 'memstdes_01', '16 GB'),
+        ('SKU2', 'processorname', 'AMD Ryzen AI 9'),
+        ('SKU2', 'npu', 'AMD Ryzen AI'),
+        ('SKU2', 'a_processor_nputops', '40 TOPS'),
+        # Processor not in the validation list
+        ('SKU3', 'processorname', 'Intel Core i5'),
+        ('SKU3', 'npu', 'None'),
+        # No processorname row
+        ('SKU4', 'npu', 'Intel AI Boost'),
+        (None, 'processorname', 'Intel Core Ultra 7'),
+    ]
+    df = pd.DataFrame(rows, columns=['SKU', 'ContainerName', 'ContainerValue'])
+    df['Accuracy'] = ''
+    df['Additional Information'] = ''
+    return df
+
+
+def test_npu_check_validates_each_sku(tmp_path):
+    df = npu_check(_report(), _npu_json(tmp_path))
+
+    assert df['Accuracy'].tolist() == [
+        'NPU OK', 'NPU OK', 'NPU OK', '',
+        'ERROR: NPU', 'ERROR: NPU', 'ERROR: NPU',
+        '', '',
+        '',
+        '',
+    ]
+
+
+def test_npu_check_without_processorname_rows(tmp_path):
+    report = _report()
+    df = npu_check(report[report['ContainerName'] != 'processorname'].copy(), _npu_json(tmp_path))
+
+    assert (df['Accuracy'] == '').all()
+
+
+def test_npu_check_flags_unreadable_json(tmp_path):
+    path = tmp_path / 'npu.json'
+    path.write_text('{', encoding='utf-8')
+
+    df = npu_check(_report(), str(path))
+
+    npu_rows = df['ContainerName'] != 'memstdes_01'
+    assert (df.loc[npu_rows, 'Additional Information'] == 'NPU FAIL - JSON Error').all()
+    assert (df.loc[~npu_rows, 'Additional Information'] == '').all()
@@ -0,0 +1,68 @@
+import json
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes.scs_tool.core import product_line
+from app.routes.scs_tool.core.qa_data import clean_report
+from conftest import report_frame
+
+
+@pytest.fixture
+def product_lines(tmp_path, monkeypatch):
+    path = tmp_path / 'product_lines.json'
+    path.write_text(json.dumps({'ProductLine': [
+        {'PL': '1M', 'ContainerName': ['memstdes_01', 'osinstalled']},
+        {'PL': '2C', 'ContainerName': ['processorname']},
+    ]}), encoding='utf-8')
+    monkeypatch.setattr(product_line, 'SCS_PRODUCT_LINES_PATH', str(path))
+    monkeypatch.setattr(product_line, '_product_lines', (None, None))
+    return path
+
+
+def test_pl_check_flags_empty_and_missing_mandatory_containers(product_lines):
+    df = pd.DataFrame([
+        ('SKU1', '1M', 'memstdes_01', np.nan),
+        ('SKU1', '1M', 'processorname', np.nan),
+        ('SKU1', '1M', 'osinstalled', 'Windows 11'),
+        ('SKU2', '1M', 'memstdes_01', '8 GB'),
+        ('SKU3', '2C', 'processorname', np.nan),
+        ('SKU4', '9Z', 'memstdes_01', np.nan),
+    ], columns=['SKU', 'PL', 'ContainerName', 'ContainerValue'])
+
+    df = product_line.pl_check(df)
+
+    # Only empty values of a container mandatory for the row's PL are errors
+    assert df['ContainerValue'].fillna('').tolist() == [
+        'ERROR: Mandatory Container Value', '', 'Windows 11', '8 GB', 'ERROR: Mandatory Container Value', '']
+    assert df['Additional Information'].tolist() == [
+        '', '', '', 'Missing Mandatory Container: osinstalled', '', '']
+
+
+def test_pl_check_granular_uses_the_granular_columns(product_lines):
+    df = pd.DataFrame({
+        'SKU': ['SKU1', 'SKU1'],
+        'PL': ['2C', '2C'],
+        'Granular Container Tag': ['processorname', 'memsize'],
+        'Granular Container Value': [np.nan, np.nan],
+    })
+
+    df = product_line.pl_check_granular(df)
+
+    assert df['Granular Container Value'].fillna('').tolist() == ['ERROR: Mandatory Container Value', '']
+
+
+def test_clean_report_drops_empty_non_mandatory_containers(product_lines, report_upload):
+    report = report_frame()
+    # memstdes_01 is mandatory for '1M', processorname is not
+    report.loc[1, 'ContainerValue'] = np.nan
+    report.loc[0, 'ContainerValue'] = np.nan
+
+    df = clean_report(report_upload({'SKU Accuracy': report}), BytesIO())
+
+    # Row 0 is dropped as an empty value, row 2 as '[BLANK]'
+    assert df.index.tolist() == [1, 3]
+    assert df.loc[1, 'ContainerValue'] == 'ERROR: Mandatory Container Value'
+    assert df['Additional Information'].tolist() == ['Missing Mandatory Container: osinstalled'] * 2
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from app.routes.scs_tool.core.qa_av import av_check, av_check_workbook
+from app.routes.scs_tool.core.workbook import ReportWorkbook
+from conftest import report_frame
+
+
+def _ms4(rows):
+    """An MS4 export, whose headers and values are padded and carry region suffixes."""
+    return pd.DataFrame(rows, columns=[' SKU ', ' SKU AV '])
+
+
+def test_av_check_lists_avs_missing_from_the_bom():
+    sku_accuracy = pd.DataFrame({
+        'SKU': ['SKU1', 'SKU1', 'SKU1', 'SKU2', 'SKU2'],
+        'ComponentGroup': ['Processor', 'Memory', 'Memory', 'Processor', 'Memory'],
+        'Component': ['AV1', ' AV2', 'AV2', 'AV3', 'AV4'],
+    })
+    ms4 = _ms4([('SKU1#ABA ', 'AV1#ABA '), ('SKU2#ABA', 'AV3 #ABA'), ('SKU2#ABA', 'AV9#ABA')])
+
+    result = av_check(sku_accuracy, ms4)
+
+    assert result.to_dict('records') == [
+        {'SCS_SKU': 'SKU1', 'ComponentGroup': 'Memory', 'Component_SCS': 'AV2'},
+        {'SCS_SKU': 'SKU2', 'ComponentGroup': 'Memory', 'Component_SCS': 'AV4'},
+    ]
+    # The inputs are not modified
+    assert sku_accuracy['Component'].tolist() == ['AV1', ' AV2', 'AV2', 'AV3', 'AV4']
+
+
+def test_av_check_reports_sku_lists_that_differ():
+    sku_accuracy = pd.DataFrame({'SKU': ['SKU1', 'SKU2'], 'ComponentGroup': ['Memory'] * 2, 'Component': ['AV1'] * 2})
+    ms4 = _ms4([('SKU1#ABA', 'AV1#ABA'), ('SKU3#ABA', 'AV1#ABA'), ('SKU4#ABA', 'AV1#ABA')])
+
+    error = av_check(sku_accuracy, ms4)['ERROR'][0]
+
+    assert "SKUs in 'SKU Accuracy' but MISSING from 'ms4': [SKU2]" in error
+    assert "SKUs in 'ms4' but MISSING from 'SKU Accuracy': [SKU3, SKU4]" in error
+
+
+def test_av_check_workbook_reports_missing_sheets(report_upload):
+    workbook = ReportWorkbook(report_upload())
+
+    result = av_check_workbook(workbook)
+
+    assert result['ERROR'][0].startswith("Could not read the Excel file.")
+
+
+def test_av_check_workbook_reads_both_sheets(report_upload):
+    workbook = ReportWorkbook(report_upload({
+        'SKU Accuracy': report_frame(),
+        'ms4': _ms4([('SKU1#ABA', 'AV1#ABA'), ('SKU1#ABA', 'AV2#ABA'), ('SKU2#ABA', 'AV3#ABA')]),
+    }))
+
+    result = av_check_workbook(workbook)
+
+    assert result['Component_SCS'].tolist() == ['AV4']
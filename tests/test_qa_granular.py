@@ -0,0 +1,42 @@
+import json
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes.scs_tool.core import qa_granular
+
+
+class Upload:
+    """The part of a FileStorage clean_granular reads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+
+@pytest.fixture
+def component_rules(tmp_path, monkeypatch):
+    folder = tmp_path / 'json'
+    folder.mkdir()
+    (folder / 'memstdes_01.json').write_text(json.dumps({'memstdes_01': [
+        {'Component': 'AV1', 'ContainerValue': '16 GB DDR5 memory'},
+        {'Component': 'AV2', 'ContainerValue': 1.5},
+        {'Component': 'AV1', 'ContainerValue': 'ignored, the first entry wins'},
+    ]}), encoding='utf-8')
+    monkeypatch.setattr(qa_granular, 'SCS_JSON_PATH', str(folder))
+    return folder
+
+
+def test_clean_granular_comments(component_rules, report_upload):
+    report = pd.DataFrame({
+        'Component': ['AV1', 'AV1', 'AV1', 'AV2', 'AV2', 'AV9', 'AV1', 'AV1'],
+        'Granular Container Value': ['16 GB', 'DDR4', '[BLANK]', 1.5, '1.', 'x', np.nan, ''],
+    })
+    output = BytesIO()
+
+    qa_granular.clean_granular(Upload(report_upload({'Sheet1': report})), output)
+
+    output.seek(0)
+    comments = pd.read_excel(output)['Comments'].tolist()
+    assert comments == ['OK', 'ERROR', 'Verify', 'OK', 'OK', 'ERROR', 'ERROR', 'ERROR']
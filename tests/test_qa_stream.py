@@ -0,0 +1,42 @@
+from io import BytesIO
+
+import pandas as pd
+
+from app.routes.scs_tool.core.qa_data import clean_report
+from app.routes.scs_tool.core.qa_stream import clean_report_streaming
+from conftest import report_frame
+
+
+def _large_report():
+    """report_frame() for five SKUs, so that a SKU spans several chunks."""
+    frames = []
+    for number in range(1, 6):
+        frame = report_frame()
+        frame['SKU'] = frame['SKU'].str.replace('SKU', f'SKU{number}_')
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _sheets(output):
+    output.seek(0)
+    return pd.read_excel(output, sheet_name=None)
+
+
+def test_streaming_matches_clean_report(report_upload, scs_rules):
+    report = _large_report()
+    # AV2 is on no BOM, so the 'duplicated' sheet lists it
+    ms4 = pd.DataFrame({'SKU': report['SKU'] + '#ABA', 'SKU AV': report['Component'].replace('AV2', 'AV9') + '#ABA'})
+    full_output = BytesIO()
+    streamed_output = BytesIO()
+
+    full = clean_report(report_upload({'SKU Accuracy': report, 'ms4': ms4}), full_output)
+    rows = clean_report_streaming(report_upload({'SKU Accuracy': report, 'ms4': ms4}), streamed_output, chunk_rows=3)
+
+    assert rows == len(full)
+    full_sheets = _sheets(full_output)
+    streamed_sheets = _sheets(streamed_output)
+    assert list(streamed_sheets) == list(full_sheets) == ['qa', 'duplicated']
+    for name in full_sheets:
+        pd.testing.assert_frame_equal(streamed_sheets[name], full_sheets[name])
+    assert 'SCS processorname OK' in set(full_sheets['qa']['Accuracy'])
+    assert set(full_sheets['duplicated']['Component_SCS']) == {'AV2'}
@@ -0,0 +1,73 @@
+import json
+import os
+from io import BytesIO
+
+import pytest
+
+from app.routes.scs_tool.core import result_cache, stage_stats
+
+
+@pytest.fixture
+def cache(tmp_path, rules_dir, monkeypatch):
+    """A result cache in tmp_path whose 'regular' mode depends on rules_dir and one rule file."""
+    rule_file = tmp_path / 'product_lines.json'
+    rule_file.write_text('{}', encoding='utf-8')
+    monkeypatch.setattr(result_cache, 'RESULT_CACHE_DIR', str(tmp_path / 'results'))
+    monkeypatch.setitem(result_cache.RESULT_CACHE_RULES, 'regular', (rules_dir, (str(rule_file),)))
+    monkeypatch.setattr(stage_stats, 'SCS_STAGE_STATS', False)
+    return rule_file
+
+
+def test_cache_key_depends_on_upload_rules_variant_and_settings(cache, rules_dir, monkeypatch):
+    upload = BytesIO(b'report')
+    key = result_cache.cache_key(upload, 'regular')
+
+    assert upload.tell() == 0
+    assert result_cache.cache_key(BytesIO(b'report'), 'regular') == key
+    assert result_cache.cache_key(BytesIO(b'other report'), 'regular') != key
+    assert result_cache.cache_key(upload, 'regular', variant='streaming') != key
+
+    monkeypatch.setattr(stage_stats, 'SCS_STAGE_STATS', True)
+    monkeypatch.setattr(stage_stats, 'SCS_STAGE_STATS_SHEET', True)
+    assert result_cache.cache_key(upload, 'regular') != key
+    monkeypatch.setattr(stage_stats, 'SCS_STAGE_STATS', False)
+    assert result_cache.cache_key(upload, 'regular') == key
+
+    cache.write_text('{"ProductLine": []}', encoding='utf-8')
+    changed_file = result_cache.cache_key(upload, 'regular')
+    assert changed_file != key
+
+    with open(os.path.join(rules_dir, 'processorname.json'), 'w', encoding='utf-8') as f:
+        json.dump({'processorname': {'Intel Core i9': ['AV1']}}, f)
+    assert result_cache.cache_key(upload, 'regular') != changed_file
+
+
+def test_cached_report_renders_once(cache):
+    renders = []
+
+    def render(file, output):
+        renders.append(file.read())
+        output.write(b'workbook')
+        return 'result'
+
+    first = BytesIO()
+    second = BytesIO()
+    assert result_cache.cached_report(BytesIO(b'report'), 'regular', first, render) == 'result'
+    assert result_cache.cached_report(BytesIO(b'report'), 'regular', second, render) is True
+    assert result_cache.cached_report(BytesIO(b'report'), 'regular', BytesIO(), render, variant='streaming') == 'result'
+
+    assert renders == [b'report', b'report']
+    assert second.getvalue() == first.getvalue() == b'workbook'
+
+
+def test_evict_removes_least_recently_used_reports(cache):
+    os.makedirs(result_cache.RESULT_CACHE_DIR)
+    for age, name in enumerate(['new', 'middle', 'old']):
+        path = os.path.join(result_cache.RESULT_CACHE_DIR, f'{name}.xlsx')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    result_cache._evict(max_bytes=20)
+
+    assert sorted(os.listdir(result_cache.RESULT_CACHE_DIR)) == ['middle.xlsx', 'new.xlsx']
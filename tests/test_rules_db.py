@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from app.routes.scs_tool.core import rules_db
+from app.routes.scs_tool.core.rules_index import load_rules_index
+
+
+@pytest.fixture
+def json_dir(tmp_path):
+    """A container JSON folder with each layout the rules can be stored in."""
+    folder = tmp_path / 'json'
+    folder.mkdir()
+    containers = {
+        'processorname': {'processorname': {'Intel Core i5': ['AV1', 'AV3'], 'AMD Ryzen 5': ['AV5'], '': []}},
+        'memstdes_01': {'memstdes_01': [
+            {'Component': 'AV2', 'ContainerValue': '16 GB', 'Note': 'extra'},
+            {'Component': 'AV4', 'ContainerValue': None},
+            {'Component': 'AV2', 'ContainerValue': '32 GB'},
+        ]},
+        'osdesc': {'osdesc': [{'SKU': 'SKU1', 'ContainerValue': 'Windows 11'}]},
+    }
+    for container, data in containers.items():
+        (folder / f'{container}.json').write_text(json.dumps(data), encoding='utf-8')
+    (folder / 'broken.json').write_text('{', encoding='utf-8')
+    return folder
+
+
+def test_import_export_round_trip(json_dir, tmp_path):
+    db_path = str(tmp_path / 'rules.sqlite3')
+    rules_db.import_json_folder(str(json_dir), db_path)
+
+    assert rules_db.verify_round_trip(str(json_dir), db_path) == []
+    assert rules_db.lookup(db_path, 'memstdes_01', 'AV2') == '32 GB'
+    assert rules_db.components_with_value(db_path, 'processorname', 'Intel Core i5') == ['AV1', 'AV3']
+
+    index = load_rules_index(db_path)
+    assert index.rules['processorname'] == {'AV1': 'Intel Core i5', 'AV3': 'Intel Core i5', 'AV5': 'AMD Ryzen 5'}
+    assert index.rules['osdesc'] == {}
+    assert index.rules['broken'] is None
+
+    export_dir = tmp_path / 'export'
+    rules_db.export_json_folder(db_path, str(export_dir))
+    for container in ('processorname', 'memstdes_01', 'osdesc'):
+        exported = json.loads((export_dir / f'{container}.json').read_text(encoding='utf-8'))
+        assert exported == json.loads((json_dir / f'{container}.json').read_text(encoding='utf-8'))
+    assert not (export_dir / 'broken.json').exists()
+
+
+def test_edits_rebuild_the_index(json_dir, tmp_path):
+    db_path = str(tmp_path / 'rules.sqlite3')
+    rules_db.import_json_folder(str(json_dir), db_path)
+    before = load_rules_index(db_path)
+
+    rules_db.set_rules(db_path, 'processorname', [('AV1', 'Intel Core i7'), ('AV9', 'Intel Core i3')])
+    rules_db.delete_rules(db_path, 'processorname', ['AV5'])
+
+    after = load_rules_index(db_path)
+    assert after.version != before.version
+    assert after.rules['processorname'] == {'AV1': 'Intel Core i7', 'AV3': 'Intel Core i5', 'AV9': 'Intel Core i3'}
+
+
+def test_reads_take_no_write_lock(json_dir, tmp_path):
+    db_path = str(tmp_path / 'rules.sqlite3')
+    rules_db.import_json_folder(str(json_dir), db_path)
+
+    # Another connection holding the write lock must not block readers
+    writer = sqlite3.connect(db_path, timeout=0)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        assert rules_db.load_db_rules_index(db_path).rules['memstdes_01'] == {'AV2': '32 GB', 'AV4': None}
+        assert rules_db.lookup(db_path, 'processorname', 'AV5') == 'AMD Ryzen 5'
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_missing_or_old_databases_are_rejected(tmp_path):
+    missing = str(tmp_path / 'missing.sqlite3')
+    with pytest.raises(ValueError, match='does not exist'):
+        rules_db.load_db_rules_index(missing)
+    assert not os.path.exists(missing)
+
+    old = str(tmp_path / 'old.sqlite3')
+    with sqlite3.connect(old) as connection:
+        connection.execute('CREATE TABLE rules (container TEXT, component TEXT, value TEXT)')
+    connection.close()
+    with pytest.raises(ValueError, match='expected 2; re-import it'):
+        rules_db.load_db_rules_index(old)
+    with pytest.raises(ValueError, match='expected 2; re-import it'):
+        rules_db.export_json_folder(old, str(tmp_path / 'export'))
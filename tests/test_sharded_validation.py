@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+
+from app.routes.scs_tool.core.process_data import validate_containers
+from app.routes.scs_tool.core.sharded_validation import validate_containers_sharded
+
+
+def _report(rows):
+    """A report whose rows cycle through right, wrong, unknown and unlisted rules."""
+    cases = [
+        ('processorname', 'AV1', 'Intel Core i5'),
+        ('processorname', 'AV3', 'Intel Core i5'),
+        ('processorname', 'AV9', 'Intel Core i5'),
+        ('memstdes_01', 'AV2', '16 GB'),
+        ('memstdes_01', 'AV4', '8 GB'),
+        ('memstdes_01', None, '8 GB'),
+        ('broken', 'AV1', 'x'),
+        ('osdesc', 'AV1', 'Windows 11'),
+        (None, 'AV1', 'x'),
+    ]
+    df = pd.DataFrame([cases[row % len(cases)] for row in range(rows)],
+                      columns=['ContainerName', 'Component', 'ContainerValue'])
+    df['Accuracy'] = ''
+    df['Correct Value'] = ''
+    return df
+
+
+def test_sharded_validation_matches_single_pass(rules_dir):
+    with open(os.path.join(rules_dir, 'broken.json'), 'w') as f:
+        f.write('{')
+    df = _report(1000)
+
+    sharded = validate_containers_sharded(df.copy(), rules_dir, workers=3, min_rows=0)
+    single = validate_containers(df.copy(), rules_dir)
+
+    pd.testing.assert_frame_equal(sharded, single)
+    # Every outcome of a row is covered
+    assert sharded['Accuracy'].head(9).tolist() == [
+        'SCS processorname OK', 'ERROR: processorname', 'ERROR: processorname',
+        'SCS memstdes_01 OK', 'ERROR: memstdes_01', 'ERROR: memstdes_01',
+        'ERROR: broken JSON not found or invalid', '', '']
+    assert sharded['Correct Value'].head(6).tolist() == [
+        '', 'Intel Core i7', 'Component Not Found in JSON', '', '16 GB', 'Component Not Found in JSON']
+
+
+def test_small_reports_are_not_sharded(rules_dir, monkeypatch):
+    from app.routes.scs_tool.core import sharded_validation
+
+    def no_pool(workers):
+        raise AssertionError('a worker pool was started')
+
+    monkeypatch.setattr(sharded_validation, '_get_executor', no_pool)
+    df = _report(10)
+
+    result = validate_containers_sharded(df.copy(), rules_dir, workers=3, min_rows=100)
+
+    pd.testing.assert_frame_equal(result, validate_containers(df.copy(), rules_dir))
@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from app.routes.scs_tool.core import qa_data
+from app.routes.scs_tool.core.workbook import ReportWorkbook
+
+
+def _run_clean_report(monkeypatch, upload):
+    """Runs clean_report and returns its result, the workbook it opened and the parses of every sheet."""
+    workbooks = []
+    parses = []
+
+    class RecordingWorkbook(ReportWorkbook):
+        def __init__(self, file):
+            super().__init__(file)
+            workbooks.append(self)
+            parse = self.excel_file.parse
+
+            def counting_parse(sheet_name, *args, **kwargs):
+                parses.append(sheet_name)
+                return parse(sheet_name, *args, **kwargs)
+
+            self.excel_file.parse = counting_parse
+
+    monkeypatch.setattr(qa_data, 'ReportWorkbook', RecordingWorkbook)
+    result = qa_data.clean_report(upload, BytesIO())
+    return result, workbooks, parses
+
+
+def test_clean_report_parses_upload_once(monkeypatch, report_upload):
+    result, workbooks, parses = _run_clean_report(monkeypatch, report_upload())
+
+    assert result is not None
+    assert len(workbooks) == 1
+    assert workbooks[0].parse_count == 1
+    assert parses == ['SKU Accuracy']
+
+
+def test_clean_report_shares_report_sheet_with_av_check(monkeypatch, report_upload):
+    result, workbooks, parses = _run_clean_report(monkeypatch, report_upload(with_ms4=True))
+
+    assert result is not None
+    assert len(workbooks) == 1
+    # av_check reads 'SKU Accuracy' from the cache instead of parsing it again
+    assert workbooks[0].parse_count == 2
+    assert sorted(parses) == ['SKU Accuracy', 'ms4']